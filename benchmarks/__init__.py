@@ -0,0 +1,4 @@
+"""
+Benchmarks for qtgmc_modern.\n
+Each module is runnable with `python -m benchmarks.<name>` from the repository root and writes its results as JSON.
+"""
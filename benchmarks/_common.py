@@ -0,0 +1,157 @@
+"""
+Shared helpers of the benchmarks
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'RESOLUTIONS', 'FORMATS',
+    'synthetic_source', 'measure', 'peak_rss_mb', 'environment', 'write_json'
+]
+
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Mapping, Tuple
+
+import vapoursynth as vs
+
+core = vs.core
+
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    'sd': (720, 480),
+    '1080i': (1920, 1080),
+    '2160i': (3840, 2160),
+}
+
+# name: (color family, sample type, bits, subsampling w, subsampling h)
+FORMATS: Dict[str, Tuple[vs.ColorFamily, vs.SampleType, int, int, int]] = {
+    'yuv420p8': (vs.YUV, vs.INTEGER, 8, 1, 1),
+    'yuv444p8': (vs.YUV, vs.INTEGER, 8, 0, 0),
+    'gray8': (vs.GRAY, vs.INTEGER, 8, 0, 0),
+    'yuv420p10': (vs.YUV, vs.INTEGER, 10, 1, 1),
+    'yuv444p10': (vs.YUV, vs.INTEGER, 10, 0, 0),
+    'gray10': (vs.GRAY, vs.INTEGER, 10, 0, 0),
+    'yuv420p16': (vs.YUV, vs.INTEGER, 16, 1, 1),
+    'yuv444p16': (vs.YUV, vs.INTEGER, 16, 0, 0),
+    'gray16': (vs.GRAY, vs.INTEGER, 16, 0, 0),
+    'yuv420ps': (vs.YUV, vs.FLOAT, 32, 1, 1),
+    'yuv444ps': (vs.YUV, vs.FLOAT, 32, 0, 0),
+    'grays': (vs.GRAY, vs.FLOAT, 32, 0, 0),
+}
+
+
+def synthetic_source(width: int, height: int, fmt: str, length: int = 240, tff: bool = True) -> vs.VideoNode:
+    """
+    Interlaced moving pattern. Each field is sampled at its own time, like a real interlaced camera,
+    so the frames comb wherever the pattern moves.
+    """
+    family, sample_type, bits, ssw, ssh = FORMATS[fmt]
+    blank = core.std.BlankClip(width=width, height=height, format=vs.GRAYS, length=length, fpsnum=30000, fpsden=1001)
+    # Time of the line's field: even lines are the first field if tff
+    field_time = 'Y 2 %' if tff else 'Y 2 % 1 - abs'
+    pattern = core.std.Expr(
+        blank, f'X N 2 * {field_time} + 3 * + 23 / sin Y N 2 * {field_time} + + 17 / cos * 0.4 * 0.5 +'
+    )
+    if family == vs.YUV:
+        chroma = core.std.Expr(pattern, 'x 0.5 - 0.5 *')
+        pattern = core.std.ShufflePlanes([pattern, chroma, chroma], [0, 0, 0], vs.YUV)
+    out_format = core.query_video_format(family, sample_type, bits, ssw, ssh)
+    clip = core.resize.Bicubic(pattern, format=out_format.id, dither_type='error_diffusion')
+    return core.std.SetFieldBased(clip, 2 if tff else 1)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def measure(clip: vs.VideoNode, num_frames: int, build_start: float, window: int = 0) -> Dict[str, float]:
+    """
+    Render `num_frames` frames with `window` requests in flight.
+
+    :param build_start:     `time.perf_counter()` taken before building the graph, for the time-to-first-frame
+    :param window:          Requests in flight. Defaults to the number of threads of the core
+    :return:                fps, time to first frame and per-frame latencies in seconds
+    """
+    num_frames = min(num_frames, clip.num_frames)
+    window = window or core.num_threads
+
+    with clip.get_frame(0):
+        ttff = time.perf_counter() - build_start
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+    done = threading.Event()
+    pending: Deque[int] = deque(range(1, num_frames))
+    errors: List[BaseException] = []
+    remaining = [num_frames - 1]
+
+    def _request() -> None:
+        with lock:
+            if not pending:
+                return
+            n = pending.popleft()
+        requested = time.perf_counter()
+        fut: Future[vs.VideoFrame] = clip.get_frame_async(n)
+
+        def _done(f: Future[vs.VideoFrame]) -> None:
+            elapsed = time.perf_counter() - requested
+            try:
+                f.result().close()
+            except BaseException as err:  # noqa: B902
+                errors.append(err)
+            with lock:
+                latencies.append(elapsed)
+                remaining[0] -= 1
+                finished = remaining[0] <= 0
+            if finished:
+                done.set()
+            else:
+                _request()
+        fut.add_done_callback(_done)
+
+    start = time.perf_counter()
+    if num_frames > 1:
+        for _ in range(min(window, num_frames - 1)):
+            _request()
+        done.wait()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    return dict(
+        fps=(num_frames - 1) / elapsed if elapsed > 0 else float('nan'),
+        time_to_first_frame=ttff,
+        latency_p50=_percentile(latencies, 50),
+        latency_p99=_percentile(latencies, 99),
+    )
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+
+def environment() -> Dict[str, Any]:
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpu_count=os.cpu_count(),
+        vapoursynth=str(vs.__version__),
+        threads=core.num_threads,
+    )
+
+
+def write_json(path: str, payload: Mapping[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, default=str)
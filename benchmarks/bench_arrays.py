@@ -0,0 +1,104 @@
+"""
+Throughput of the NumPy frame access.\n
+`views` iterates with `qtgmc_modern.frames.iter_arrays`, i.e. prefetched, zero-copy views.
+`naive` is the usual loop, one `get_frame` at a time and `np.array(frame[p])` per plane.
+The source is either the synthetic clip itself, to measure the frame access alone, or a QTGMC preset.
+
+    python -m benchmarks.bench_arrays --resolutions 1080i --format yuv420p16 --frames 500
+    python -m benchmarks.bench_arrays --preset faster --frames 200 --work mean
+"""
+
+from __future__ import annotations
+
+__all__ = ['MODES', 'run_naive', 'run_views', 'main']
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import vapoursynth as vs
+
+from ._common import FORMATS, RESOLUTIONS, environment, synthetic_source, write_json
+
+core = vs.core
+
+_WORK: Dict[str, Callable[[np.ndarray], Any]] = {
+    'none': lambda a: None,
+    'mean': lambda a: a.mean(),
+}
+
+
+def run_naive(clip: vs.VideoNode, num_frames: int, work: Callable[[np.ndarray], Any]) -> float:
+    start = time.perf_counter()
+    for n in range(num_frames):
+        with clip.get_frame(n) as frame:
+            for plane in range(frame.format.num_planes):
+                work(np.array(frame[plane]))
+    return time.perf_counter() - start
+
+
+def run_views(clip: vs.VideoNode, num_frames: int, work: Callable[[np.ndarray], Any],
+              window: Optional[int] = None) -> float:
+    from qtgmc_modern.frames import iter_arrays
+
+    start = time.perf_counter()
+    for arrays in iter_arrays(clip, range(num_frames), window):
+        for array in arrays.planes:
+            work(array)
+    return time.perf_counter() - start
+
+
+MODES: Dict[str, Callable[..., float]] = {
+    'naive': run_naive,
+    'views': run_views,
+}
+
+
+def _frame_bytes(clip: vs.VideoNode) -> int:
+    assert clip.format
+    fmt = clip.format
+    chroma = (clip.width >> fmt.subsampling_w) * (clip.height >> fmt.subsampling_h)
+    return (clip.width * clip.height + (fmt.num_planes - 1) * chroma) * fmt.bytes_per_sample
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern import QTGMC
+    from qtgmc_modern.settings import Preset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=[p.name.lower() for p in Preset], default=None,
+                        help='Measure the output of this QTGMC preset instead of the source')
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=['1080i'])
+    parser.add_argument('--format', choices=list(FORMATS), default='yuv420p8')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--work', choices=list(_WORK), default='none', help='Per plane work done by the consumer')
+    parser.add_argument('--window', type=int, default=None, help='Prefetch window of `views`')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--output', '-o', default='bench_arrays.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+
+        for mode in args.modes:
+            # Graph built again for every mode so none benefits from the frame cache of another
+            source = synthetic_source(width, height, args.format, length=args.frames + 16)
+            if args.preset:
+                source = QTGMC(source, Preset[args.preset.upper()], log_info=False).process()
+            num_frames = min(args.frames, source.num_frames)
+            kwargs = dict(window=args.window) if mode == 'views' else {}
+            elapsed = MODES[mode](source, num_frames, _WORK[args.work], **kwargs)
+            fps = num_frames / elapsed
+            results.append(dict(
+                resolution=resolution, format=args.format, preset=args.preset, mode=mode, work=args.work,
+                frames=num_frames, fps=fps, mb_per_second=fps * _frame_bytes(source) / (1 << 20),
+            ))
+            print(f'{resolution:>6} {mode:>6}  {fps:9.2f} fps  {results[-1]["mb_per_second"]:9.1f} MB/s')
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
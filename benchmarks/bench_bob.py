@@ -0,0 +1,74 @@
+"""
+Speed of the zimg and fmtc implementations of `Bob`.\n
+Both are rendered on the same synthetic source, so the synthetic source cost is included in both.
+Also reports the largest absolute difference between them in code values,
+and whether the automatic selection picks the zimg one for the format.
+
+    python -m benchmarks.bench_bob --resolutions 1080i 2160i --formats yuv420p8 yuv420p16 yuv444ps
+"""
+
+from __future__ import annotations
+
+__all__ = ['max_diff', 'main']
+
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import vapoursynth as vs
+
+from ._common import FORMATS, RESOLUTIONS, environment, measure, synthetic_source, write_json
+
+core = vs.core
+
+
+def max_diff(a: vs.VideoNode, b: vs.VideoNode, num_frames: int) -> float:
+    """Largest absolute difference over every plane, in code values, or in float units for float clips"""
+    assert a.format
+    diff = core.std.Expr([a[:num_frames], b[:num_frames]], 'x y - abs')
+    worst = 0.0
+    for plane in range(a.format.num_planes):
+        for f in core.std.PlaneStats(diff, plane=plane).frames(close=True):
+            worst = max(worst, float(f.props['PlaneStatsMax']))
+    return worst
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern.filters import Bob
+    from qtgmc_modern.filters._deinterlacers import _zimg_bob_equivalent
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=['1080i', '2160i'])
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=['yuv420p8', 'yuv420p16'])
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--output', '-o', default='bench_bob.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for fmt in args.formats:
+            outputs: Dict[str, vs.VideoNode] = {}
+            for name, fast in (('fmtc', False), ('zimg', True)):
+                source = synthetic_source(width, height, fmt, length=args.frames // 2 + 1)
+                build_start = time.perf_counter()
+                outputs[name] = Bob(0, 0.5, fast=fast)(source, 3)
+                result: Dict[str, Any] = dict(resolution=resolution, format=fmt, implementation=name)
+                result.update(measure(outputs[name], args.frames, build_start))
+                results.append(result)
+
+            diff = max_diff(outputs['fmtc'], outputs['zimg'], min(args.frames, 50))
+            selected = 'zimg' if _zimg_bob_equivalent(source, True, 0, 0.5) else 'fmtc'
+            fmtc, zimg = results[-2], results[-1]
+            for result in (fmtc, zimg):
+                result.update(max_diff=diff, auto=selected)
+            print(
+                f'{resolution:>6} {fmt:>10}  fmtc {fmtc["fps"]:8.2f} fps  zimg {zimg["fps"]:8.2f} fps  '
+                f'x{zimg["fps"] / fmtc["fps"]:.2f}  max diff {diff:g}  auto: {selected}'
+            )
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
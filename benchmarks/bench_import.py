@@ -0,0 +1,69 @@
+"""
+Import time of qtgmc_modern.\n
+Every sample imports the package in a fresh interpreter, after VapourSynth itself so only the cost
+of the package is measured, and records which heavy modules came along with it.
+
+    python -m benchmarks.bench_import --runs 20
+"""
+
+from __future__ import annotations
+
+__all__ = ['sample', 'main']
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+from ._common import write_json
+
+_SAMPLE = '''
+import json, sys, time
+import vapoursynth
+start = time.perf_counter()
+import qtgmc_modern
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(
+    seconds=elapsed,
+    modules=len(sys.modules),
+    yaml='yaml' in sys.modules,
+    numpy='numpy' in sys.modules,
+)))
+'''
+
+
+def sample() -> Dict[str, Any]:
+    """Import the package once in a fresh interpreter"""
+    out = subprocess.run([sys.executable, '-c', _SAMPLE], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--output', '-o', default='bench_import.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    samples: List[Dict[str, Any]] = [sample() for _ in range(args.runs)]
+    times = [s['seconds'] for s in samples]
+    summary = dict(
+        runs=args.runs,
+        median_ms=statistics.median(times) * 1000,
+        min_ms=min(times) * 1000,
+        max_ms=max(times) * 1000,
+        modules=samples[-1]['modules'],
+        yaml_imported=samples[-1]['yaml'],
+        numpy_imported=samples[-1]['numpy'],
+    )
+    print(
+        f'import qtgmc_modern: median {summary["median_ms"]:.1f}ms '
+        f'(min {summary["min_ms"]:.1f}ms, max {summary["max_ms"]:.1f}ms), '
+        f'yaml imported: {summary["yaml_imported"]}, numpy imported: {summary["numpy_imported"]}'
+    )
+    write_json(args.output, dict(summary=summary, samples=samples))
+
+
+if __name__ == '__main__':
+    main()
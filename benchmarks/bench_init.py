@@ -0,0 +1,58 @@
+"""
+Cost of `QTGMC.__init__` per preset.\n
+The first construction of a preset loads it, the following ones hit the preset cache.
+
+    python -m benchmarks.bench_init --runs 1000
+"""
+
+from __future__ import annotations
+
+__all__ = ['main']
+
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from ._common import environment, synthetic_source, write_json
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern import QTGMC
+    from qtgmc_modern.settings import Preset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=1000, help='Constructions per preset')
+    parser.add_argument('--output', '-o', default='bench_init.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    clip = synthetic_source(720, 480, 'yuv420p8', length=10)
+    results: List[Dict[str, Any]] = []
+    for preset in Preset:
+        start = time.perf_counter()
+        QTGMC(clip, preset, log_info=False)
+        first = time.perf_counter() - start
+
+        times: List[float] = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            QTGMC(clip, preset, log_info=False)
+            times.append(time.perf_counter() - start)
+
+        result = dict(
+            preset=preset.name,
+            first_us=first * 1e6,
+            median_us=statistics.median(times) * 1e6,
+            mean_us=statistics.fmean(times) * 1e6,
+        )
+        results.append(result)
+        print(
+            f'{preset.name:>10}  first {result["first_us"]:10.1f}us  '
+            f'median {result["median_us"]:8.1f}us  mean {result["mean_us"]:8.1f}us'
+        )
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
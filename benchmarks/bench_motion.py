@@ -0,0 +1,88 @@
+"""
+Speed and quality of the reduced-precision motion search.\n
+Every mode is rendered on the same synthetic source and compared with the full depth search.
+Quality is the PSNR and the mean absolute difference of the output against that reference.
+
+    python -m benchmarks.bench_motion --preset slower --resolutions 1080i 2160i --format yuv420p16
+"""
+
+from __future__ import annotations
+
+__all__ = ['MODES', 'compare', 'main']
+
+import argparse
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import vapoursynth as vs
+
+from ._common import FORMATS, RESOLUTIONS, environment, measure, synthetic_source, write_json
+
+core = vs.core
+
+MODES: Dict[str, Dict[str, Any]] = {
+    'full': dict(precision=0),
+    'precision8': dict(precision=8),
+}
+
+
+def compare(clip: vs.VideoNode, reference: vs.VideoNode, num_frames: int) -> Dict[str, float]:
+    """PSNR and mean absolute difference of the luma, both computed in float"""
+    a = core.resize.Point(clip[:num_frames], format=vs.GRAYS)
+    b = core.resize.Point(reference[:num_frames], format=vs.GRAYS)
+    squared = core.std.PlaneStats(core.std.Expr([a, b], 'x y - dup *'))
+    absolute = core.std.PlaneStats(a, b)
+    mse = [float(f.props['PlaneStatsAverage']) for f in squared.frames(close=True)]
+    mad = [float(f.props['PlaneStatsDiff']) for f in absolute.frames(close=True)]
+    avg_mse = sum(mse) / len(mse)
+    return dict(
+        psnr=10 * math.log10(1 / avg_mse) if avg_mse > 0 else float('inf'),
+        mean_abs_diff=sum(mad) / len(mad),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern import QTGMC
+    from qtgmc_modern.settings import Preset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=[p.name.lower() for p in Preset], default='slower')
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=['1080i', '2160i'])
+    parser.add_argument('--format', choices=list(FORMATS), default='yuv420p16')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--output', '-o', default='bench_motion.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        source = synthetic_source(width, height, args.format, length=args.frames + 16)
+
+        outputs: Dict[str, vs.VideoNode] = {}
+        for mode in args.modes:
+            build_start = time.perf_counter()
+            qtgmc = QTGMC(source, Preset[args.preset.upper()], log_info=False)
+            qtgmc.set_motion_analysis(**MODES[mode])
+            outputs[mode] = qtgmc.process()
+            result: Dict[str, Any] = dict(resolution=resolution, format=args.format, preset=args.preset, mode=mode)
+            result.update(measure(outputs[mode], args.frames, build_start))
+            results.append(result)
+
+        if 'full' in outputs:
+            reference = outputs['full']
+        else:
+            reference = QTGMC(source, Preset[args.preset.upper()], log_info=False).process()
+        for result in results[-len(args.modes):]:
+            result.update(compare(outputs[result['mode']], reference, args.frames))
+            print(
+                f'{resolution:>6} {result["mode"]:>10}  {result["fps"]:8.2f} fps  '
+                f'PSNR {result["psnr"]:7.2f}dB  MAD {result["mean_abs_diff"]:.5f}'
+            )
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
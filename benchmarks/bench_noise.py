@@ -0,0 +1,52 @@
+"""
+Speed of `NoiseGenerate` with fresh `grain.Add` noise and with a precomputed noise bank.\n
+The noise deinterlacer is rendered alone on the difference between the synthetic source and a blurred copy,
+which stands in for the noise extracted by the denoiser. The first frames pay for drawing the bank.
+
+    python -m benchmarks.bench_noise --resolutions 1080i 2160i --formats yuv420p8 yuv420p16 --banks 0 16 64
+"""
+
+from __future__ import annotations
+
+__all__ = ['main']
+
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from ._common import FORMATS, RESOLUTIONS, environment, measure, synthetic_source, write_json
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern.filters import NoiseGenerate
+    from qtgmc_modern.graph import core
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=['1080i'])
+    parser.add_argument('--formats', nargs='+', choices=[f for f in FORMATS if not f.endswith('s')],
+                        default=['yuv420p8', 'yuv420p16'])
+    parser.add_argument('--banks', nargs='+', type=int, default=[0, 16, 64],
+                        help='Bank sizes, 0 is grain.Add')
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--output', '-o', default='bench_noise.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for fmt in args.formats:
+            for bank in args.banks:
+                source = synthetic_source(width, height, fmt, length=args.frames)
+                build_start = time.perf_counter()
+                diff = core.std.MakeDiff(source, core.std.BoxBlur(source, hradius=2, vradius=2))
+                output = NoiseGenerate(bank)(diff, True, interleaved_clip=source, chroma=True)
+                result: Dict[str, Any] = dict(resolution=resolution, format=fmt, bank=bank)
+                result.update(measure(output, args.frames, build_start))
+                results.append(result)
+                print(f'{resolution:>6} {fmt:>10}  bank {bank:>4}  {result["fps"]:8.2f} fps')
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
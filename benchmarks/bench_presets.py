@@ -0,0 +1,74 @@
+"""
+Throughput of every preset on synthetic interlaced sources.\n
+Every configuration is built and rendered in a fresh process so its peak RSS is its own.
+
+    python -m benchmarks.bench_presets --resolutions sd 1080i --formats yuv420p8 --frames 100
+"""
+
+from __future__ import annotations
+
+__all__ = ['run_one', 'main']
+
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Sequence
+
+from ._common import FORMATS, RESOLUTIONS, environment, measure, peak_rss_mb, synthetic_source, write_json
+
+
+def run_one(preset: str, resolution: str, fmt: str, frames: int) -> Dict[str, Any]:
+    """Build and render one configuration. Meant to run in its own process"""
+    from qtgmc_modern import QTGMC
+    from qtgmc_modern.settings import Preset
+
+    result: Dict[str, Any] = dict(preset=preset, resolution=resolution, format=fmt, frames=frames)
+    try:
+        width, height = RESOLUTIONS[resolution]
+        # The source has to be long enough for the lookahead of the slowest presets
+        source = synthetic_source(width, height, fmt, length=frames + 16)
+        build_start = time.perf_counter()
+        clip = QTGMC(source, Preset[preset.upper()], log_info=False).process()
+        result['build_time'] = time.perf_counter() - build_start
+        result.update(measure(clip, frames, build_start))
+    except Exception as err:
+        result['error'] = f'{err.__class__.__name__}: {err}'
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from qtgmc_modern.settings import Preset
+
+    presets = [p.name.lower() for p in Preset]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--presets', nargs='+', choices=presets, default=presets)
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--frames', type=int, default=200, help='Frames rendered per configuration')
+    parser.add_argument('--output', '-o', default='bench_presets.json', help='Path of the JSON results')
+    args = parser.parse_args(argv)
+
+    results: List[Dict[str, Any]] = []
+    for preset, resolution, fmt in itertools.product(args.presets, args.resolutions, args.formats):
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(run_one, preset, resolution, fmt, args.frames).result()
+        results.append(result)
+        if 'error' in result:
+            print(f'{preset:>10} {resolution:>6} {fmt:>10}  {result["error"]}')
+        else:
+            print(
+                f'{preset:>10} {resolution:>6} {fmt:>10}  {result["fps"]:8.2f} fps  '
+                f'ttff {result["time_to_first_frame"]:6.2f}s  '
+                f'p50 {result["latency_p50"] * 1000:8.1f}ms  p99 {result["latency_p99"] * 1000:8.1f}ms  '
+                f'rss {result["peak_rss_mb"]:8.1f}MB'
+            )
+
+    write_json(args.output, dict(environment=environment(), results=results))
+
+
+if __name__ == '__main__':
+    main()
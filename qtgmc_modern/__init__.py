@@ -1 +1,5 @@
 from .qtgmc import QTGMC
+from .graph import GraphBuilder, StageProfiler
+from .chunked import ChunkedRenderer
+from .tiling import TiledRenderer
+from .writer import FrameWriter
@@ -0,0 +1,146 @@
+"""
+One-pass pre-analysis.\n
+Scene changes, motion and combing statistics are measured once at reduced resolution
+and stored in a NumPy sidecar so every later stage (or render) can reuse them.
+NumPy is only needed when this module is actually used.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'FrameAnalysis',
+    'analyse_clip', 'load_analysis'
+]
+
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple
+
+import vapoursynth as vs
+
+from .filters import mv_analyse, mv_mask
+from .graph import core
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+_VERSION = 1
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as import_err:
+        raise ImportError('qtgmc_modern.analysis requires numpy') from import_err
+    return numpy
+
+
+class FrameAnalysis(NamedTuple):
+    scene_change: NDArray[np.bool_]
+    """True if the frame starts a new scene"""
+    sad: NDArray[np.float32]
+    """Average block SAD of the backward delta 1 vectors, normalised to 0-1"""
+    combing: NDArray[np.float32]
+    """Average absolute vertical [1, -2, 1] response, normalised to 0-1. High on combed frames"""
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.scene_change)
+
+    def scene_cuts(self) -> List[int]:
+        """Frames starting a new scene, first frame excluded"""
+        return [int(n) for n in _numpy().flatnonzero(self.scene_change) if n]
+
+    def trim(self, start: int, end: int) -> FrameAnalysis:
+        """Analysis of the frames [start, end), matching `std.Trim(clip, start, end - 1)`"""
+        return FrameAnalysis(self.scene_change[start:end], self.sad[start:end], self.combing[start:end])
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        _numpy().savez_compressed(
+            path, version=_VERSION, scene_change=self.scene_change, sad=self.sad, combing=self.combing
+        )
+
+    def apply(self, clip: vs.VideoNode, rate: int = 1) -> vs.VideoNode:
+        """
+        Attach the analysis as frame props.
+        `_SceneChangePrev` and `_SceneChangeNext` are set like `misc.SCDetect` does,
+        `QTGMC_SAD` and `QTGMC_Combing` hold the statistics.
+
+        :param clip:    Clip to attach the props to
+        :param rate:    Number of frames of `clip` per analysed frame, e.g. 2 for a bobbed clip
+        """
+        if clip.num_frames > self.num_frames * rate:
+            raise ValueError(f'{self.__class__.__name__}: clip is longer than the analysed clip')
+
+        # Plain lists are much faster to index than numpy arrays in the frame callback
+        scene_change: List[bool] = self.scene_change.tolist()
+        sad: List[float] = self.sad.tolist()
+        combing: List[float] = self.combing.tolist()
+        last = self.num_frames - 1
+
+        def _attach(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+            i, field = divmod(n, rate)
+            fout = f.copy()
+            fout.props['_SceneChangePrev'] = int(field == 0 and scene_change[i])
+            fout.props['_SceneChangeNext'] = int(field == rate - 1 and i < last and scene_change[i + 1])
+            fout.props['QTGMC_SAD'] = sad[i]
+            fout.props['QTGMC_Combing'] = combing[i]
+            return fout
+        return core.std.ModifyFrame(clip, clip, _attach)
+
+
+def analyse_clip(clip: vs.VideoNode, path: str | os.PathLike[str] | None = None,
+                 scale: int = 4, sc_threshold: float = 28 / 255) -> FrameAnalysis:
+    """
+    Render the pre-analysis pass.
+
+    :param clip:            Source clip
+    :param path:            Where to save the `.npz` sidecar. Not saved if not specified
+    :param scale:           Downscaling factor of the analysis. Combing is measured at full height
+    :param sc_threshold:    misc.SCDetect threshold
+    :return:                Analysis
+    """
+    np = _numpy()
+
+    width = max(clip.width // scale // 8 * 8, 32)
+    height = max(clip.height // scale // 8 * 8, 32)
+    small = core.misc.SCDetect(core.resize.Bilinear(clip, width, height, format=vs.GRAY8), sc_threshold)
+
+    # Cheap vector search on the small clip
+    super_clip = core.mv.Super(small, pel=1, hpad=8, vpad=8)
+    bvec = mv_analyse(super_clip, isb=True, delta=1, blksize=8, overlap=0, search=3, searchparam=1)
+    sad = core.std.PlaneStats(mv_mask(small, vectors=bvec, kind=1, ml=255), prop='SAD')
+
+    # Combing shows up as a strong vertical [1, -2, 1] response, so only the width is reduced
+    narrow = core.resize.Bilinear(clip, width, clip.height, format=vs.GRAY8)
+    comb = core.std.PlaneStats(core.std.Convolution(narrow, [1, -2, 1], mode='v', saturate=False), prop='Comb')
+
+    def _gather(n: int, f: List[vs.VideoFrame]) -> vs.VideoFrame:
+        fout = f[0].copy()
+        fout.props['SADAverage'] = f[1].props['SADAverage']
+        fout.props['CombAverage'] = f[2].props['CombAverage']
+        return fout
+    gathered = core.std.ModifyFrame(small, [small, sad, comb], _gather)
+
+    scene_change = np.zeros(clip.num_frames, dtype=np.bool_)
+    sads = np.zeros(clip.num_frames, dtype=np.float32)
+    combing = np.zeros(clip.num_frames, dtype=np.float32)
+    for n, f in enumerate(gathered.frames(close=True)):
+        scene_change[n] = n == 0 or bool(f.props['_SceneChangePrev'])
+        sads[n] = f.props['SADAverage']
+        combing[n] = f.props['CombAverage']
+
+    analysis = FrameAnalysis(scene_change, sads, combing)
+    if path is not None:
+        analysis.save(path)
+    return analysis
+
+
+def load_analysis(path: str | os.PathLike[str]) -> FrameAnalysis:
+    """Load a sidecar written by `analyse_clip` or `FrameAnalysis.save`"""
+    with _numpy().load(path) as data:
+        arrays: Dict[str, Any] = dict(data)
+    if int(arrays.get('version', 0)) != _VERSION:
+        raise ValueError(f'load_analysis: unsupported sidecar version in "{path}"')
+    return FrameAnalysis(arrays['scene_change'], arrays['sad'], arrays['combing'])
+
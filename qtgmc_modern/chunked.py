@@ -0,0 +1,211 @@
+"""
+Scene-aligned chunked rendering.\n
+The source is split in chunks rendered by independent VapourSynth graphs in a process pool.
+Each chunk is padded with the temporal reach of the configured graph, so its frames are
+bit-identical to the ones of a single-graph render, with one exception: noise generated by `grain.Add`,
+i.e. `NoiseGenerate` without a bank or on float clips, depends on the frame number within the chunk.
+Use `NoiseGenerate(bank=...)` on integer clips for bit-identical noise.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'Chunk', 'ChunkedRenderer',
+    'detect_scene_cuts', 'split_chunks'
+]
+
+import os
+import shutil
+import tempfile
+from math import gcd
+from pathlib import Path
+from typing import BinaryIO, Callable, List, NamedTuple, Optional, Sequence
+
+import vapoursynth as vs
+
+from .graph import core
+from .helper import number_frames
+from .qtgmc import QTGMC
+from .settings import InputType
+from .writer import FrameWriter
+
+SourceFactory = Callable[[], vs.VideoNode]
+"""Picklable callable returning the source clip, called once in every worker"""
+QTGMCFactory = Callable[[vs.VideoNode], QTGMC]
+"""Picklable callable returning a configured `QTGMC` for the given clip"""
+
+# A scene cut further than this share of the chunk length from an even boundary isn't used
+_MAX_CUT_SHIFT = 1 / 4
+
+
+class Chunk(NamedTuple):
+    start: int
+    """First source frame of the chunk"""
+    end: int
+    """Source frame after the last one of the chunk"""
+    pad_start: int
+    """First source frame rendered, including the lookbehind"""
+    pad_end: int
+    """Source frame after the last one rendered, including the lookahead"""
+
+
+def detect_scene_cuts(clip: vs.VideoNode, threshold: float = 28 / 255) -> List[int]:
+    """
+    Scene cut detection on a downscaled luma.
+
+    :param clip:        Source clip
+    :param threshold:   misc.SCDetect threshold
+    :return:            Frames starting a new scene
+    """
+    small = core.resize.Bilinear(clip, clip.width // 4 // 2 * 2, clip.height // 4 // 2 * 2, format=vs.GRAY8)
+    scenes = core.misc.SCDetect(small, threshold)
+    return [n for n, f in enumerate(scenes.frames(close=True)) if n and f.props.get('_SceneChangePrev')]
+
+
+def split_chunks(num_frames: int, num_chunks: int, scene_cuts: Sequence[int], pad: int, align: int = 1) -> List[Chunk]:
+    """
+    Split `num_frames` frames in at most `num_chunks` chunks cut at the scene cuts
+    closest to evenly spaced boundaries, or at the boundaries themselves when no scene cut
+    is within a quarter of the chunk length.
+
+    :param pad:     Frames of lookbehind and lookahead rendered on each side of a chunk
+    :param align:   The padded start of each chunk is a multiple of `align`
+    """
+    cuts = sorted({c for c in scene_cuts if 0 < c < num_frames})
+    max_shift = num_frames / num_chunks * _MAX_CUT_SHIFT
+    bounds = [0]
+    for i in range(1, num_chunks):
+        target = num_frames * i // num_chunks
+        candidates = [c for c in cuts if c > bounds[-1]] or [target]
+        bound = min(candidates, key=lambda c: abs(c - target))
+        if abs(bound - target) > max_shift:
+            bound = target
+        if bounds[-1] < bound < num_frames:
+            bounds.append(bound)
+    bounds.append(num_frames)
+
+    chunks: List[Chunk] = []
+    for start, end in zip(bounds, bounds[1:]):
+        pad_start = max(start - pad, 0) // align * align
+        chunks.append(Chunk(start, end, pad_start, min(end + pad, num_frames)))
+    return chunks
+
+
+def _chunk_output_range(chunk: Chunk, rate: int, fps_divisor: int) -> range:
+    """Range of output frames of a chunk, local to its padded render"""
+    first = -(-(chunk.start * rate) // fps_divisor)
+    last = -(-(chunk.end * rate) // fps_divisor)
+    offset = chunk.pad_start * rate // fps_divisor
+    return range(first - offset, last - offset)
+
+
+def _render_chunk(source: SourceFactory, qtgmc: QTGMCFactory, chunk: Chunk, threads: int, path: str) -> int:
+    vs.core.num_threads = threads
+    # Numbered before the trim, so frame number based filters match the unchunked render
+    clip = number_frames(source())
+    instance = qtgmc(core.std.Trim(clip, chunk.pad_start, chunk.pad_end - 1))
+    instance.thread_budget = threads
+    if instance.analysis is not None and instance.analysis.num_frames == clip.num_frames:
+        # The pre-analysis of the full source is shifted to the chunk
+        instance.analysis = instance.analysis.trim(chunk.pad_start, chunk.pad_end)
+    output = instance.process()
+    # The worker owns its core, so the split of an auto denoiser can be applied
+    if instance.thread_split is not None:
+        vs.core.num_threads = instance.thread_split.core_threads
+
+    rate = 2 if instance.input_type == InputType.INTERLACED_ONLY else 1
+    frames = _chunk_output_range(chunk, rate, instance.motion_blur['fps_divisor'])
+    try:
+        with open(path, 'wb') as out:
+            return FrameWriter(output, window=threads).write(out, frames).frames
+    finally:
+        if instance.vector_cache is not None:
+            instance.vector_cache.close()
+
+
+class ChunkedRenderer:
+    """
+    Render a `QTGMC` graph in parallel chunks and write the raw planar frames in order.
+
+    >>> renderer = ChunkedRenderer(load_source, configure_qtgmc, workers=8)
+    >>> with open('out.raw', 'wb') as f:
+    ...     renderer.render(f)
+    """
+    source: SourceFactory
+    qtgmc: QTGMCFactory
+    workers: int
+    num_chunks: int
+    scene_cuts: Optional[Sequence[int]]
+
+    def __init__(self, source: SourceFactory, qtgmc: QTGMCFactory, workers: Optional[int] = None,
+                 num_chunks: Optional[int] = None, scene_cuts: Optional[Sequence[int]] = None) -> None:
+        """
+        :param source:      Picklable callable returning the source clip.
+                            VapourSynth nodes can't cross process boundaries, so every worker rebuilds its graph.
+        :param qtgmc:       Picklable callable returning a configured `QTGMC` for the given clip
+        :param workers:     Number of worker processes. Defaults to the number of CPUs
+        :param num_chunks:  Number of chunks. Defaults to four chunks per worker
+        :param scene_cuts:  Known scene cuts. Read from the `QTGMC` pre-analysis if any,
+                            otherwise detected with `detect_scene_cuts` if not specified
+        """
+        self.source = source
+        self.qtgmc = qtgmc
+        self.workers = workers or os.cpu_count() or 1
+        self.num_chunks = num_chunks or self.workers * 4
+        self.scene_cuts = scene_cuts
+
+    def overlap(self, instance: QTGMC) -> int:
+        """Lookbehind/lookahead in source frames needed by the configured graph"""
+        reach = instance.temporal_reach()
+        if instance.input_type == InputType.INTERLACED_ONLY:
+            # Processed frame n comes from source frame n // 2
+            return -(-reach // 2) + 1
+        return reach
+
+    def plan(self) -> List[Chunk]:
+        clip = self.source()
+        instance = self.qtgmc(clip)
+        if self.scene_cuts is not None:
+            scene_cuts = self.scene_cuts
+        elif instance.analysis is not None:
+            scene_cuts = instance.analysis.scene_cuts()
+        else:
+            scene_cuts = detect_scene_cuts(clip)
+
+        # The padded start must fall on a decimated frame
+        rate = 2 if instance.input_type == InputType.INTERLACED_ONLY else 1
+        fps_divisor = instance.motion_blur['fps_divisor']
+        align = fps_divisor // gcd(rate, fps_divisor)
+        return split_chunks(clip.num_frames, self.num_chunks, scene_cuts, self.overlap(instance), align)
+
+    def render(self, out: BinaryIO) -> int:
+        """
+        Render every chunk and write the frames in order to `out`.
+
+        :return:    Number of frames written
+        """
+        # Only the parent process of a chunked render needs multiprocessing
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = self.plan()
+        threads = max((os.cpu_count() or 1) // self.workers, 1)
+        tmpdir = tempfile.mkdtemp(prefix='qtgmc_chunks_')
+        try:
+            paths = [os.path.join(tmpdir, f'{i:05d}.raw') for i in range(len(chunks))]
+            # A forked worker would inherit the core of `plan`, without its thread pool
+            with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [
+                    pool.submit(_render_chunk, self.source, self.qtgmc, chunk, threads, path)
+                    for chunk, path in zip(chunks, paths)
+                ]
+                written = 0
+                # Stitch in order as soon as each chunk is done
+                for future, path in zip(futures, paths):
+                    written += future.result()
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+                    Path(path).unlink()
+            return written
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
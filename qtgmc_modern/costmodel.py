@@ -0,0 +1,264 @@
+"""
+Static cost model.\n
+The graph a `QTGMC` would build is walked without rendering it: every node is priced with a per-filter
+cost per sample, calibrated once on the current machine, and sized like `QTGMC.estimate_memory` does.
+Presets can then be compared for any resolution and format before scheduling a job.
+
+    python -m qtgmc_modern.costmodel calibrate
+    python -m qtgmc_modern.costmodel compare --width 1920 --height 1080 --format yuv420p16
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'CostModel', 'CostPrediction',
+    'compare_presets'
+]
+
+import argparse
+import json
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import vapoursynth as vs
+
+from .graph import core
+from .helper import cache_dir
+from .qtgmc import QTGMC
+from .settings import InputType, Preset
+
+QTGMCFactory = Callable[[vs.VideoNode], QTGMC]
+"""Callable returning a configured `QTGMC` for the given clip"""
+
+# Cost of a filter never seen by the calibration, in nanoseconds per sample
+_DEFAULT_COST = 2.0
+_CALIBRATION_PRESETS = (Preset.PLACEBO, Preset.SLOWER, Preset.FAST, Preset.DRAFT)
+
+
+def _cache_path() -> Path:
+    return cache_dir() / 'cost_model.json'
+
+
+def _samples(node: vs.VideoNode) -> int:
+    fmt = node.format
+    assert fmt
+    chroma = (node.width >> fmt.subsampling_w) * (node.height >> fmt.subsampling_h)
+    return node.width * node.height + (fmt.num_planes - 1) * chroma
+
+
+def _name(node: vs.VideoNode) -> str:
+    return getattr(node, '_name', '') or type(node).__name__
+
+
+def _calibration_clip(width: int, height: int, length: int) -> vs.VideoNode:
+    """Moving interlaced pattern, so motion search and masks do real work"""
+    blank = core.std.BlankClip(width=width, height=height, format=vs.GRAYS, length=length, fpsnum=30000, fpsden=1001)
+    pattern = core.std.Expr(blank, 'X N 2 * Y 2 % + 3 * + 23 / sin Y N 2 * Y 2 % + + 17 / cos * 0.4 * 0.5 +')
+    chroma = core.std.Expr(pattern, 'x 0.5 - 0.5 *')
+    clip = core.std.ShufflePlanes([pattern, chroma, chroma], [0, 0, 0], vs.YUV)
+    clip = core.resize.Bicubic(clip, format=vs.YUV420P8, dither_type='error_diffusion')
+    return core.std.SetFieldBased(clip, 2)
+
+
+class CostPrediction(NamedTuple):
+    label: str
+    width: int
+    height: int
+    format: str
+    fps: float
+    """Predicted output frames per second"""
+    cpu_time: float
+    """Predicted filter time per output frame, summed over all threads, in seconds"""
+    memory_mb: int
+    """Predicted working set, see `QTGMC.estimate_memory`"""
+    stages: Dict[str, float]
+    """Filter time per output frame of each stage, in seconds"""
+    filters: Dict[str, int]
+    """Number of nodes of each filter"""
+
+    def __str__(self) -> str:
+        return (
+            f'{self.label:<12}{self.width}x{self.height} {self.format:<14}'
+            f'{self.fps:9.2f} fps{self.memory_mb:>8} MB{sum(self.filters.values()):>6} nodes'
+        )
+
+
+class CostModel:
+    """
+    Per-filter costs of the current machine.
+
+    >>> model = CostModel.load() or CostModel.calibrate()
+    >>> print(model.predict(lambda clip: QTGMC(clip, Preset.SLOWER), 1920, 1080, vs.YUV420P16))
+    """
+    costs: Dict[str, float]
+    """Nanoseconds per sample of each filter"""
+    efficiency: float
+    """Share of the threads kept busy during the calibration renders"""
+    threads: int
+    """Threads used by the calibration"""
+
+    def __init__(self, costs: Dict[str, float], efficiency: float, threads: int) -> None:
+        self.costs = costs
+        self.efficiency = efficiency
+        self.threads = threads
+
+    @classmethod
+    def load(cls, path: Optional[os.PathLike[str] | str] = None) -> Optional[CostModel]:
+        """Calibration of this machine, or None if it was never run"""
+        try:
+            with open(path or _cache_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)[platform.node()]
+            return cls(dict(data['costs']), float(data['efficiency']), int(data['threads']))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path: Optional[os.PathLike[str] | str] = None) -> None:
+        path = Path(path or _cache_path())
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[platform.node()] = dict(costs=self.costs, efficiency=self.efficiency, threads=self.threads)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    @classmethod
+    def calibrate(cls, presets: Sequence[Preset] = _CALIBRATION_PRESETS, width: int = 720, height: int = 480,
+                  frames: int = 60, save: bool = True) -> CostModel:
+        """
+        Render a few presets with node timing enabled and derive the cost per sample of every filter.
+        Takes a minute or so. Requires VapourSynth R58 or later.
+
+        :param presets:     Presets rendered. Together they should cover the filters of the presets to compare
+        :param frames:      Output frames rendered per preset
+        :param save:        Store the result in the per-machine cache file
+        """
+        times: Dict[str, float] = {}
+        samples: Dict[str, float] = {}
+        busy = wall = 0.0
+        for preset in presets:
+            source = _calibration_clip(width, height, frames // 2 + 32)
+            qtgmc = QTGMC(source, preset, log_info=False)
+            profiler = qtgmc.set_profiling()
+            assert profiler
+            output = qtgmc.process()
+            wall += profiler.render(output, frames)
+
+            for nodes in profiler.nodes.values():
+                for node in nodes:
+                    if node.format is None:
+                        continue
+                    # Frames of the node requested per output frame
+                    rendered = frames * node.num_frames / output.num_frames
+                    name = _name(node)
+                    times[name] = times.get(name, 0.0) + node._timings
+                    samples[name] = samples.get(name, 0.0) + _samples(node) * rendered
+                    busy += node._timings / 1e9
+
+        costs = {name: times[name] / samples[name] for name in times if samples[name] > 0}
+        efficiency = min(busy / (wall * core.num_threads), 1.0) if wall > 0 else 1.0
+        model = cls(costs, efficiency, core.num_threads)
+        if save:
+            model.save()
+        return model
+
+    def predict(self, qtgmc: QTGMCFactory, width: int, height: int, fmt: vs.PresetVideoFormat | int,
+                threads: Optional[int] = None, label: str = '') -> CostPrediction:
+        """
+        Predict the speed and the memory of a configured `QTGMC` on a given resolution and format.
+        The graph is built on a blank clip and never rendered.
+
+        :param qtgmc:       Callable returning a configured `QTGMC` for the given clip
+        :param fmt:         Format of the source
+        :param threads:     Threads of the render. Defaults to the number of threads of the core
+        :param label:       Name of the configuration in the prediction
+        """
+        threads = threads or core.num_threads
+        source = core.std.BlankClip(width=width, height=height, format=int(fmt), length=1000,
+                                    fpsnum=30000, fpsden=1001)
+        instance = qtgmc(core.std.SetFieldBased(source, 2))
+        tags = instance.set_profiling()
+        assert tags
+        output = instance.process()
+        memory = instance.estimate_memory(threads)
+
+        stages: Dict[str, float] = {}
+        filters: Dict[str, int] = {}
+        default = _median(list(self.costs.values())) if self.costs else _DEFAULT_COST
+        for stage, nodes in tags.nodes.items():
+            stage_time = 0.0
+            for node in nodes:
+                if node.format is None:
+                    continue
+                name = _name(node)
+                filters[name] = filters.get(name, 0) + 1
+                cost = self.costs.get(name, default)
+                stage_time += cost * _samples(node) * node.num_frames / output.num_frames / 1e9
+            stages[stage] = stage_time
+
+        cpu_time = sum(stages.values())
+        fps = threads * self.efficiency / cpu_time if cpu_time > 0 else float('inf')
+        return CostPrediction(
+            label, width, height, core.get_video_format(fmt).name, fps, cpu_time, memory.mb, stages, filters
+        )
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def compare_presets(model: CostModel, width: int, height: int, fmt: vs.PresetVideoFormat | int,
+                    presets: Optional[Sequence[Preset]] = None, tff: bool = True,
+                    input_type: InputType = InputType.INTERLACED_ONLY,
+                    threads: Optional[int] = None) -> List[CostPrediction]:
+    """Predictions of every preset, fastest first"""
+    predictions = [
+        model.predict(
+            lambda clip, preset=preset: QTGMC(clip, preset, tff, input_type, log_info=False),
+            width, height, fmt, threads, preset.name.lower()
+        )
+        for preset in (presets or list(Preset))
+    ]
+    return sorted(predictions, key=lambda p: -p.fps)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    calibrate = sub.add_parser('calibrate', help='Calibrate the costs of this machine')
+    calibrate.add_argument('--frames', type=int, default=60)
+    compare = sub.add_parser('compare', help='Predict every preset')
+    compare.add_argument('--width', type=int, default=1920)
+    compare.add_argument('--height', type=int, default=1080)
+    compare.add_argument('--format', default='yuv420p8', help='Name of a VapourSynth preset format')
+    compare.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'calibrate':
+        start = time.perf_counter()
+        model = CostModel.calibrate(frames=args.frames)
+        print(f'Calibrated {len(model.costs)} filters in {time.perf_counter() - start:.1f}s, '
+              f'efficiency {model.efficiency:.0%}, saved to {_cache_path()}')
+        return
+
+    model = CostModel.load()
+    if model is None:
+        parser.error('no calibration for this machine, run "calibrate" first')
+    try:
+        fmt = vs.PresetVideoFormat[args.format.upper()]
+    except KeyError:
+        parser.error(f'unknown format "{args.format}"')
+    for prediction in compare_presets(model, args.width, args.height, fmt, threads=args.threads):
+        print(prediction)
+
+
+if __name__ == '__main__':
+    main()
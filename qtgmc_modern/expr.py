@@ -0,0 +1,315 @@
+"""
+Elementwise expression compiler.\n
+Chains of per-pixel nodes (`std.Expr`, `std.MakeDiff`, `std.MergeDiff`, `std.Merge`) are kept lazy
+and emitted as one multi-input `std.Expr` when the result is needed, instead of writing a full frame per link.
+
+Fusion is bit-exact: every intermediate result is clamped exactly like the node it replaces would have stored it.
+An operation whose Expr emulation can't be proven exact for the clip format is materialized on its own
+and becomes a fusion boundary:
+    - Expressions with a non integral result on integer formats (division, sqrt, float constants, ...),
+      since the rounding at store time can't be reproduced.
+    - `std.Merge` on integer formats above 8 bits, where the fixed point product doesn't fit in a float mantissa.
+    - Expressions accessing neighbouring pixels or frame properties of a fused operand.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'ExprClip',
+    'expr', 'make_diff', 'merge_diff', 'merge'
+]
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import vapoursynth as vs
+
+from .graph import core
+
+_VARS = 'xyzabcdefghijklmnopqrstuvw'
+# Integrality of the result of each operator, given integral operands
+_INTEGRAL_BINARY = {'+', '-', '*', 'max', 'min'}
+_BOOLEAN_BINARY = {'>', '<', '=', '>=', '<=', 'and', 'or', 'xor'}
+_ROUNDING = {'floor', 'round', 'trunc'}
+_REAL_BINARY = {'/', 'pow'}
+_REAL_UNARY = {'sqrt', 'exp', 'log', 'sin', 'cos'}
+_STACK_OP = re.compile(r'^(dup|swap)(\d*)$')
+_VAR_ACCESS = re.compile(r'^([a-z])[\[.]')
+# std.Merge fixed point precision on integer formats
+_MERGE_SHIFT = 15
+_MERGE_EXACT_BITS = 8
+# Operand expressions longer than that aren't duplicated if referenced more than once
+_MAX_INLINE = 48
+
+_Tokens = Tuple[str, ...]
+ClipLike = Union[vs.VideoNode, 'ExprClip']
+
+
+def _ref(i: int) -> str:
+    return f'@{i}'
+
+
+class ExprClip:
+    """
+    Lazy elementwise node.\n
+    Each plane is an RPN token list where `@i` refers to the i-th input node.
+    The first input is the one the frame properties are copied from, as std.Expr does with `x`.
+    """
+    __slots__ = ('_inputs', '_planes', '_node')
+
+    _inputs: Tuple[vs.VideoNode, ...]
+    _planes: Tuple[_Tokens, ...]
+    _node: Optional[vs.VideoNode]
+
+    def __init__(self, inputs: Sequence[vs.VideoNode], planes: Sequence[_Tokens]) -> None:
+        self._inputs = tuple(inputs)
+        self._planes = tuple(planes)
+        self._node = None
+
+    @classmethod
+    def of(cls, clip: ClipLike) -> ExprClip:
+        if isinstance(clip, ExprClip):
+            return clip
+        assert clip.format
+        return cls([clip], [(_ref(0), )] * clip.format.num_planes)
+
+    @property
+    def is_leaf(self) -> bool:
+        return all(tokens == (_ref(0), ) for tokens in self._planes)
+
+    @property
+    def format(self) -> vs.VideoFormat:
+        fmt = self._inputs[0].format
+        assert fmt
+        return fmt
+
+    def node(self) -> vs.VideoNode:
+        """Compile the chain into a single std.Expr"""
+        if self.is_leaf:
+            return self._inputs[0]
+        if self._node is None:
+            exprs = [
+                '' if tokens == (_ref(0), ) else ' '.join(_VARS[int(t[1:])] if t.startswith('@') else t for t in tokens)
+                for tokens in self._planes
+            ]
+            self._node = core.std.Expr(list(self._inputs), exprs)
+        return self._node
+
+    def materialize(self) -> ExprClip:
+        return ExprClip.of(self.node())
+
+    def _operand(self, plane: int, refs: Dict[int, int]) -> _Tokens:
+        """Tokens of this clip plane as an operand, remapped to the combined inputs"""
+        tokens = tuple(_ref(refs[int(t[1:])]) if t.startswith('@') else t for t in self._planes[plane])
+        if len(tokens) == 1 and tokens[0].startswith('@'):
+            return tokens
+        if self.format.sample_type == vs.INTEGER:
+            # Clamp like the replaced node would have done when storing its frame
+            tokens += ('0', 'max', str((1 << self.format.bits_per_sample) - 1), 'min')
+        return tokens
+
+
+def _combine(operands: Sequence[ExprClip]) -> Tuple[List[vs.VideoNode], List[Dict[int, int]]]:
+    inputs: List[vs.VideoNode] = []
+    mappings: List[Dict[int, int]] = []
+    for operand in operands:
+        mapping: Dict[int, int] = {}
+        for i, node in enumerate(operand._inputs):
+            for j, known in enumerate(inputs):
+                if known is node:
+                    mapping[i] = j
+                    break
+            else:
+                mapping[i] = len(inputs)
+                inputs.append(node)
+        mappings.append(mapping)
+    return inputs, mappings
+
+
+def _check(operands: Sequence[ExprClip]) -> vs.VideoFormat:
+    fmt = operands[0].format
+    width, height = operands[0]._inputs[0].width, operands[0]._inputs[0].height
+    for operand in operands[1:]:
+        if operand.format.id != fmt.id or (operand._inputs[0].width, operand._inputs[0].height) != (width, height):
+            raise ValueError('ExprClip: all clips must have the same format and dimensions')
+    return fmt
+
+
+def _is_integral(tokens: Sequence[str]) -> bool:
+    """Whether the expression always yields an integer, given integer inputs"""
+    stack: List[bool] = []
+    try:
+        for token in tokens:
+            if token.startswith('@'):
+                stack.append(True)
+            elif token in _INTEGRAL_BINARY:
+                b, a = stack.pop(), stack.pop()
+                stack.append(a and b)
+            elif token in _BOOLEAN_BINARY:
+                del stack[-2:]
+                stack.append(True)
+            elif token in _REAL_BINARY:
+                del stack[-2:]
+                stack.append(False)
+            elif token in _REAL_UNARY:
+                stack[-1] = False
+            elif token in {'abs', 'not'} | _ROUNDING:
+                stack.append(stack.pop() or token != 'abs')
+            elif token == '?':
+                b, a, _ = stack.pop(), stack.pop(), stack.pop()
+                stack.append(a and b)
+            elif m := _STACK_OP.match(token):
+                n = int(m.group(2) or (0 if m.group(1) == 'dup' else 1))
+                if m.group(1) == 'dup':
+                    stack.append(stack[-1 - n])
+                else:
+                    stack[-1], stack[-1 - n] = stack[-1 - n], stack[-1]
+            else:
+                try:
+                    int(token)
+                except ValueError:
+                    try:
+                        float(token)
+                    except ValueError:
+                        # Unknown operator
+                        return False
+                    stack.append(False)
+                else:
+                    stack.append(True)
+    except IndexError:
+        return False
+    return stack == [True]
+
+
+def _fusable(fmt: vs.VideoFormat) -> bool:
+    return fmt.sample_type == vs.INTEGER or fmt.bits_per_sample == 32
+
+
+def _build(operands: Sequence[ExprClip], planes_exprs: Sequence[Optional[List[str]]]) -> ExprClip:
+    """
+    Build an ExprClip from per-plane RPN token lists written in terms of `x`, `y`, `z`...
+    A None plane copies the first operand
+    """
+    fmt = _check(operands)
+
+    inputs, mappings = _combine(operands)
+    if len(inputs) > len(_VARS):
+        operands = [op.materialize() for op in operands]
+        inputs, mappings = _combine(operands)
+
+    planes: List[_Tokens] = []
+    for p, words in enumerate(planes_exprs):
+        if words is None:
+            planes.append(operands[0]._operand(p, mappings[0]))
+            continue
+        tokens: List[str] = []
+        for word in words:
+            if word in _VARS[:len(operands)]:
+                tokens.extend(operands[_VARS.index(word)]._operand(p, mappings[_VARS.index(word)]))
+            else:
+                tokens.append(word)
+        planes.append(tuple(tokens))
+
+    out = ExprClip(inputs, planes)
+    if fmt.sample_type == vs.INTEGER and not all(_is_integral(tokens) for tokens in planes):
+        # Store rounding can't be reproduced, so that node must exist on its own
+        return out.materialize()
+    return out
+
+
+def _normalise_exprs(exprs: str | Sequence[str], num_planes: int) -> List[str]:
+    exprs = [exprs] if isinstance(exprs, str) else list(exprs)
+    return (exprs + exprs[-1:] * num_planes)[:num_planes]
+
+
+def _planes_list(planes: int | Sequence[int] | None, num_planes: int) -> List[int]:
+    if planes is None:
+        return list(range(num_planes))
+    return [planes] if isinstance(planes, int) else list(planes)
+
+
+def expr(clips: Sequence[ClipLike], exprs: str | Sequence[str]) -> ExprClip:
+    """Lazy std.Expr"""
+    operands = [ExprClip.of(c) for c in clips]
+    fmt = _check(operands)
+    exprs = _normalise_exprs(exprs, fmt.num_planes)
+
+    if not _fusable(fmt):
+        return ExprClip.of(core.std.Expr([op.node() for op in operands], exprs))
+
+    words_list = [e.split() if e else None for e in exprs]
+    for i, op in enumerate(operands):
+        if op.is_leaf:
+            continue
+        var = _VARS[i]
+        for words in filter(None, words_list):
+            accessed = any((m := _VAR_ACCESS.match(w)) and m.group(1) == var for w in words)
+            duplicated = words.count(var) > 1 and max(len(t) for t in op._planes) > _MAX_INLINE
+            if accessed or duplicated:
+                operands[i] = op.materialize()
+                break
+
+    if any(_VAR_ACCESS.match(w) for words in filter(None, words_list) for w in words):
+        return ExprClip.of(core.std.Expr([op.node() for op in operands], exprs))
+    return _build(operands, words_list)
+
+
+def make_diff(clipa: ClipLike, clipb: ClipLike, planes: int | Sequence[int] | None = None) -> ExprClip:
+    """Lazy std.MakeDiff"""
+    a, b = ExprClip.of(clipa), ExprClip.of(clipb)
+    fmt = _check([a, b])
+    if not _fusable(fmt):
+        return ExprClip.of(core.std.MakeDiff(a.node(), b.node(), planes))
+    if fmt.sample_type == vs.INTEGER:
+        words = ['x', 'y', '-', str(1 << (fmt.bits_per_sample - 1)), '+']
+    else:
+        words = ['x', 'y', '-']
+    processed = _planes_list(planes, fmt.num_planes)
+    return _build([a, b], [words if p in processed else None for p in range(fmt.num_planes)])
+
+
+def merge_diff(clipa: ClipLike, clipb: ClipLike, planes: int | Sequence[int] | None = None) -> ExprClip:
+    """Lazy std.MergeDiff"""
+    a, b = ExprClip.of(clipa), ExprClip.of(clipb)
+    fmt = _check([a, b])
+    if not _fusable(fmt):
+        return ExprClip.of(core.std.MergeDiff(a.node(), b.node(), planes))
+    if fmt.sample_type == vs.INTEGER:
+        words = ['x', 'y', '+', str(1 << (fmt.bits_per_sample - 1)), '-']
+    else:
+        words = ['x', 'y', '+']
+    processed = _planes_list(planes, fmt.num_planes)
+    return _build([a, b], [words if p in processed else None for p in range(fmt.num_planes)])
+
+
+def merge(clipa: ClipLike, clipb: ClipLike, weight: float | Sequence[float] = 0.5) -> ExprClip:
+    """Lazy std.Merge"""
+    a, b = ExprClip.of(clipa), ExprClip.of(clipb)
+    fmt = _check([a, b])
+    weights = [weight] if isinstance(weight, (int, float)) else list(weight)
+    if (
+        not _fusable(fmt)
+        or (fmt.sample_type == vs.INTEGER and fmt.bits_per_sample > _MERGE_EXACT_BITS)
+    ):
+        return ExprClip.of(core.std.Merge(a.node(), b.node(), weights))
+
+    # Merge takes one weight for all planes, or one for luma and one for chroma
+    weights = (weights + weights[-1:] * fmt.num_planes)[:fmt.num_planes]
+
+    planes_words: List[Optional[List[str]]] = []
+    for w in weights:
+        if fmt.sample_type == vs.INTEGER:
+            scaled = int(w * (1 << _MERGE_SHIFT) + 0.5)
+            if scaled <= 0:
+                planes_words.append(None)
+            elif scaled >= 1 << _MERGE_SHIFT:
+                planes_words.append(['y'])
+            else:
+                # x + (((y - x) * w + round) >> shift)
+                planes_words.append([
+                    'y', 'x', '-', str(scaled), '*', str(1 << (_MERGE_SHIFT - 1)), '+',
+                    str(1 << _MERGE_SHIFT), '/', 'floor', 'x', '+'
+                ])
+        else:
+            planes_words.append(None if w <= 0 else ['y'] if w >= 1 else ['y', 'x', '-', repr(float(w)), '*', 'x', '+'])
+    return _build([a, b], planes_words)
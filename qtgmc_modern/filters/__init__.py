@@ -4,6 +4,9 @@ Interface implementing various vapoursynth filters
 
 # flake8: noqa
 from ._deinterlacers import *
+from ._autodeint import *
 from ._denoisers import *
+from ._autodenoise import *
 from ._conv import *
 from ._mvtools import *
+from ._mvcache import *
@@ -0,0 +1,158 @@
+"""
+Deinterlacer backend picked by benchmarking the installed implementations
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'AutoDeinterlacer', 'AutoNNEDI3', 'AutoEEDI3'
+]
+
+import json
+import os
+import platform
+import threading
+import time
+from contextvars import Context
+from pathlib import Path
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type
+
+import vapoursynth as vs
+
+from ..graph import core
+from ..helper import cache_dir
+from ._deinterlacers import EEDI3, NNEDI3, NNEDI3CL, ZNEDI3, Deinterlacer, EEDI3m, EEDI3mCL
+
+_SAMPLE_FRAMES = 8
+# Average absolute difference, normalised to 0-1, allowed between two implementations
+_MAX_DIFF = 2 / 255
+# OpenCL backends have to be faster than the fastest CPU backend by this factor
+_CL_MARGIN = 1.1
+
+_LOCK = threading.Lock()
+_CHOICES: Optional[Dict[str, str]] = None
+
+
+def _cache_path() -> Path:
+    return cache_dir() / 'deint_backends.json'
+
+
+def _load_choices() -> Dict[str, str]:
+    global _CHOICES
+    if _CHOICES is None:
+        try:
+            with open(_cache_path(), 'r', encoding='utf-8') as f:
+                _CHOICES = dict(json.load(f))
+        except (OSError, ValueError):
+            _CHOICES = {}
+    return _CHOICES
+
+
+def _save_choice(key: str, name: str) -> None:
+    choices = _load_choices()
+    choices[key] = name
+    path = _cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(choices, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        # Not persisted, the benchmark will run again in the next process
+        pass
+
+
+def _sample(clip: vs.VideoNode, num_frames: int) -> vs.VideoNode:
+    """First frames of `clip`, rendered once so every backend is timed on its own"""
+    frames = [f.copy() for f in clip[:num_frames].frames(close=True)]
+    blank = core.std.BlankClip(clip, length=len(frames))
+    return core.std.ModifyFrame(blank, blank, lambda n, f: frames[n].copy())
+
+
+def _timed(deint: Deinterlacer, clip: vs.VideoNode, field: int, **kwargs: Any) -> Tuple[vs.VideoNode, float]:
+    out = deint(clip, field, **kwargs)
+    # The first frame pays for the initialisation, e.g. OpenCL kernels compilation
+    out.get_frame(0).close()
+    start = time.perf_counter()
+    for _ in out[1:].frames(close=True):
+        pass
+    return out, time.perf_counter() - start
+
+
+def _diff(a: vs.VideoNode, b: vs.VideoNode) -> float:
+    assert a.format
+    diffs: List[float] = []
+    for plane in range(a.format.num_planes):
+        stats = core.std.PlaneStats(a, b, plane=plane)
+        diffs.extend(float(f.props['PlaneStatsDiff']) for f in stats.frames(close=True))
+    return max(diffs)
+
+
+class AutoDeinterlacer(Deinterlacer):
+    """
+    Deinterlacer running the fastest installed implementation of an algorithm.\n
+    On first use for a format and resolution, every candidate is timed on the first frames of the clip,
+    candidates whose output differs from the first working one are discarded, and the winner is stored
+    in a per-machine cache file, so later processes skip the benchmark.
+    The cache file is `$QTGMC_CACHE_DIR/deint_backends.json` or `qtgmc_modern/deint_backends.json`
+    in the user cache folder.
+    """
+    candidates: ClassVar[Tuple[Type[Deinterlacer], ...]]
+    """Implementations of the same algorithm. The first ones are the reference"""
+
+    def __call__(self, clip: vs.VideoNode, field: int, **kwargs: Any) -> vs.VideoNode:
+        return self.select(clip, field, **kwargs)(clip, field, **kwargs)
+
+    def select(self, clip: vs.VideoNode, field: int = 3, **kwargs: Any) -> Deinterlacer:
+        """
+        Fastest backend for the format and resolution of `clip`
+
+        :param field:       Field argument used for the benchmark
+        :param kwargs:      Additional arguments used for the benchmark
+        """
+        assert clip.format
+        key = f'{platform.node()}:{self.__class__.__name__}:{clip.format.name}:{clip.width}x{clip.height}'
+        names = {clss.__name__: clss for clss in self.candidates}
+        with _LOCK:
+            if (name := _load_choices().get(key)) in names:
+                return names[name](**self.params)
+
+            # Fresh context, so the benchmark nodes aren't memoized or profiled with the graph being built
+            name = Context().run(self._benchmark, clip, field, **kwargs)
+            _save_choice(key, name)
+        return names[name](**self.params)
+
+    def _benchmark(self, clip: vs.VideoNode, field: int, **kwargs: Any) -> str:
+        sample = _sample(clip, _SAMPLE_FRAMES)
+        reference: Optional[vs.VideoNode] = None
+        timings: Dict[str, float] = {}
+        for clss in self.candidates:
+            try:
+                out, elapsed = _timed(clss(**self.params), sample, field, **kwargs)
+                if reference is None:
+                    reference = out
+                elif _diff(reference, out) > _MAX_DIFF:
+                    continue
+            except (AttributeError, vs.Error):
+                # Not installed, or not supported for this format
+                continue
+            timings[clss.__name__] = elapsed
+
+        if not timings:
+            raise ValueError(f'{self.__class__.__name__}: no working backend among {self.candidates}')
+
+        fastest_cpu = min((t for name, t in timings.items() if not name.endswith('CL')), default=None)
+        if fastest_cpu is not None:
+            for name in [name for name in timings if name.endswith('CL')]:
+                if timings[name] * _CL_MARGIN > fastest_cpu:
+                    del timings[name]
+        return min(timings, key=timings.__getitem__)
+
+
+class AutoNNEDI3(AutoDeinterlacer):
+    candidates = (ZNEDI3, NNEDI3, NNEDI3CL)
+
+
+class AutoEEDI3(AutoDeinterlacer):
+    candidates = (EEDI3m, EEDI3, EEDI3mCL)
@@ -0,0 +1,161 @@
+"""
+Denoiser backend and thread split picked by benchmarking the installed implementations
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'AutoDenoiser', 'AutoDFTTest', 'AutoFFT3D',
+    'ThreadSplit'
+]
+
+import os
+import platform
+import threading
+import time
+from contextvars import Context
+from typing import Any, ClassVar, Dict, NamedTuple, Optional, Tuple, Type
+
+import vapoursynth as vs
+
+from ..graph import core
+from ._autodeint import _MAX_DIFF, _SAMPLE_FRAMES, _diff, _load_choices, _sample, _save_choice
+from ._denoisers import FFT3D, Denoiser, DFTTest, NeoDFTTest, NeoFFT3D
+
+# Frames rendered per thread of the budget when timing a thread split
+_SPLIT_FRAMES = 4
+# More plugin threads have to beat fewer of them by this factor, as the rest of the graph only scales with the core
+_SPLIT_MARGIN = 1.1
+
+_LOCK = threading.Lock()
+
+
+class ThreadSplit(NamedTuple):
+    core_threads: int
+    """Value to give `core.num_threads`"""
+    plugin_threads: int
+    """Internal threads of the denoiser, on top of the frames it renders in parallel"""
+
+
+def _fps(out: vs.VideoNode, prefetch: Optional[int] = None) -> float:
+    """Frames per second with at most `prefetch` frames in flight"""
+    # The first frame pays for the initialisation, e.g. FFTW plans
+    out.get_frame(0).close()
+    start = time.perf_counter()
+    for _ in out[1:].frames(prefetch, close=True):
+        pass
+    return (out.num_frames - 1) / (time.perf_counter() - start)
+
+
+class AutoDenoiser(Denoiser):
+    """
+    Denoiser running the fastest installed implementation of an algorithm, with the fastest split
+    of the threads between VapourSynth and the internal threads of the plugin.\n
+    On first use for a format, resolution and thread budget, candidates whose output differs from the first
+    working one are discarded, and the others are timed on the first frames of the clip with every split
+    of the budget into core threads × plugin threads, plugin threads being a power of two.
+    The winner is stored next to the deinterlacer backends in the per-machine cache file.\n
+    The budget defaults to the number of CPUs, never to `core.num_threads`, so applying a split doesn't change
+    the next decision. The core is never reconfigured: a split is timed by limiting the frames in flight
+    to its share of the budget, and `resolve` only returns the split. Setting `core.num_threads` is up
+    to the caller, once no other graph renders.
+    """
+    candidates: ClassVar[Tuple[Type[Denoiser], ...]]
+    """Implementations of the same algorithm. The first ones are the reference"""
+
+    def __call__(self, clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
+        return self.select(clip, **kwargs)(clip, **kwargs)
+
+    def select(self, clip: vs.VideoNode, **kwargs: Any) -> Denoiser:
+        """
+        Fastest backend for the format and resolution of `clip`, set to its share of the CPUs
+
+        :param kwargs:      Additional arguments used for the benchmark
+        """
+        return self.resolve(clip, **kwargs)[0]
+
+    def resolve(self, clip: vs.VideoNode, budget: Optional[int] = None,
+                **kwargs: Any) -> Tuple[Denoiser, ThreadSplit]:
+        """
+        Fastest backend and thread split for the format and resolution of `clip`
+
+        :param budget:      Threads shared by the core and the plugin. Defaults to the number of CPUs
+        :param kwargs:      Additional arguments used for the benchmark
+        :return:            Backend set to its share of the threads, and the split to apply to the core
+        """
+        assert clip.format
+        budget = budget or os.cpu_count() or 1
+        key = (
+            f'{platform.node()}:{self.__class__.__name__}:{clip.format.name}:{clip.width}x{clip.height}'
+            f':{budget} threads'
+        )
+        names = {clss.__name__: clss for clss in self.candidates}
+        with _LOCK:
+            name, _, threads = (_load_choices().get(key) or '').partition(':')
+            if name not in names or not threads.isdigit():
+                # Fresh context, so the benchmark nodes aren't memoized or profiled with the graph being built
+                name, plugin_threads = Context().run(self._benchmark, clip, budget, **kwargs)
+                _save_choice(key, f'{name}:{plugin_threads}')
+            else:
+                plugin_threads = int(threads)
+
+        clss = names[name]
+        if clss.threads_arg is None:
+            return clss(**self.params), ThreadSplit(budget, 1)
+        # Threads set by the user take precedence
+        plugin_threads = int(self.params.get(clss.threads_arg, plugin_threads)) or budget
+        split = ThreadSplit(max(budget // plugin_threads, 1), plugin_threads)
+        return clss(**({clss.threads_arg: plugin_threads} | self.params)), split
+
+    def _benchmark(self, clip: vs.VideoNode, budget: int, **kwargs: Any) -> Tuple[str, int]:
+        sample = _sample(clip, _SAMPLE_FRAMES)
+        # Enough frames to keep every thread of the core busy
+        looped = core.std.Loop(sample, -(-_SPLIT_FRAMES * budget // sample.num_frames))
+        reference: Optional[vs.VideoNode] = None
+        results: Dict[str, Tuple[float, int]] = {}
+        for clss in self.candidates:
+            try:
+                out = clss(**self._single_threaded(clss))(sample, **kwargs)
+                if reference is None:
+                    reference = out
+                elif _diff(reference, out) > _MAX_DIFF:
+                    continue
+                results[clss.__name__] = self._fastest_split(clss, looped, budget, **kwargs)
+            except (AttributeError, vs.Error):
+                # Not installed, or not supported for this format
+                continue
+
+        if not results:
+            raise ValueError(f'{self.__class__.__name__}: no working backend among {self.candidates}')
+        name = max(results, key=lambda name: results[name][0])
+        return name, results[name][1]
+
+    def _single_threaded(self, clss: Type[Denoiser]) -> Dict[str, Any]:
+        return ({clss.threads_arg: 1} if clss.threads_arg else {}) | self.params
+
+    def _fastest_split(self, clss: Type[Denoiser], clip: vs.VideoNode, budget: int, **kwargs: Any) -> Tuple[float, int]:
+        """Frames per second and plugin threads of the fastest split"""
+        if clss.threads_arg is None or clss.threads_arg in self.params:
+            return _fps(clss(**self.params)(clip, **kwargs)), 1
+
+        timings: Dict[int, float] = {}
+        threads = 1
+        while threads <= budget:
+            params = {clss.threads_arg: threads} | self.params
+            # The frames in flight stand for the threads of the core, which is left as it is
+            timings[threads] = _fps(clss(**params)(clip, **kwargs), budget // threads)
+            threads *= 2
+
+        best = 1
+        for threads in sorted(timings):
+            if timings[threads] > timings[best] * _SPLIT_MARGIN:
+                best = threads
+        return timings[best], best
+
+
+class AutoDFTTest(AutoDenoiser):
+    candidates = (DFTTest, NeoDFTTest)
+
+
+class AutoFFT3D(AutoDenoiser):
+    candidates = (FFT3D, NeoFFT3D)
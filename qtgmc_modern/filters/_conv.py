@@ -8,9 +8,13 @@ __all__ = [
     'noisedeintd2class'
 ]
 
-from typing import Dict, Type
+from typing import Dict, Optional, Type
+
+import vapoursynth as vs
 
 from ..settings import VSCallableD
+from ._autodeint import AutoDeinterlacer, AutoEEDI3, AutoNNEDI3
+from ._autodenoise import AutoDenoiser, AutoDFTTest, AutoFFT3D
 from ._deinterlacers import (EEDI2, EEDI3, NNEDI3, NNEDI3CL, ZNEDI3, Bob,
                              BWDiF, Deinterlacer, EEDI3m, EEDI3mCL, NoiseBob,
                              NoiseDeint, NoiseDWeave, NoiseGenerate, SangNom2)
@@ -21,6 +25,7 @@ DEINTERLACERS: Dict[str, Type[Deinterlacer]] = dict(
     nnedi3=NNEDI3,
     nnedi3cl=NNEDI3CL,
     znedi3=ZNEDI3,
+    znedi=ZNEDI3,
     eedi2=EEDI2,
     eedi3=EEDI3,
     eedi3m=EEDI3m,
@@ -28,6 +33,9 @@ DEINTERLACERS: Dict[str, Type[Deinterlacer]] = dict(
     sangnom2=SangNom2,
     bwdif=BWDiF,
     bob=Bob,
+    auto=AutoNNEDI3,
+    auto_nnedi3=AutoNNEDI3,
+    auto_eedi3=AutoEEDI3,
 
     NNEDI3=NNEDI3,
     NNEDI3CL=NNEDI3CL,
@@ -38,13 +46,22 @@ DEINTERLACERS: Dict[str, Type[Deinterlacer]] = dict(
     EEDI3mCL=EEDI3mCL,
     SangNom2=SangNom2,
     BWDiF=BWDiF,
-    Bob=Bob
+    Bob=Bob,
+    AutoNNEDI3=AutoNNEDI3,
+    AutoEEDI3=AutoEEDI3
 )
 
 NOISE_DEINTERLACERS: Dict[str, Type[NoiseDeint]] = dict(
     doubleweave=NoiseDWeave,
     bob=NoiseBob,
-    generate=NoiseGenerate
+    generate=NoiseGenerate,
+
+    DoubleWeave=NoiseDWeave,
+    Bob=NoiseBob,
+    Generate=NoiseGenerate,
+    NoiseDWeave=NoiseDWeave,
+    NoiseBob=NoiseBob,
+    NoiseGenerate=NoiseGenerate
 )
 
 DENOISERS: Dict[str, Type[Denoiser]] = dict(
@@ -53,16 +70,23 @@ DENOISERS: Dict[str, Type[Denoiser]] = dict(
     knlmeanscl=KNLMeansCL,
     neodfttest=NeoDFTTest,
     neofft3d=NeoFFT3D,
+    auto_dfttest=AutoDFTTest,
+    auto_fft3d=AutoFFT3D,
 
     FFT3D=FFT3D,
     DFTTest=DFTTest,
     KNLMeansCL=KNLMeansCL,
     NeoDFTTest=NeoDFTTest,
-    NeoFFT3D=NeoFFT3D
+    NeoFFT3D=NeoFFT3D,
+    AutoDFTTest=AutoDFTTest,
+    AutoFFT3D=AutoFFT3D
 )
 
 
-def deintd2class(dico: VSCallableD) -> Deinterlacer:
+def deintd2class(dico: VSCallableD, clip: Optional[vs.VideoNode] = None) -> Deinterlacer:
+    """
+    :param clip:    Clip to deinterlace. If specified, an "auto" backend is resolved to the fastest implementation
+    """
     if (kwargs := dico['args']) is None:
         kwargs = {}
 
@@ -71,7 +95,10 @@ def deintd2class(dico: VSCallableD) -> Deinterlacer:
     except KeyError as key_err:
         raise ValueError from key_err
 
-    return clss(**kwargs)
+    deint = clss(**kwargs)
+    if clip is not None and isinstance(deint, AutoDeinterlacer):
+        return deint.select(clip)
+    return deint
 
 
 def noisedeintd2class(dico: VSCallableD) -> NoiseDeint:
@@ -86,7 +113,10 @@ def noisedeintd2class(dico: VSCallableD) -> NoiseDeint:
     return clss(**kwargs)
 
 
-def dend2class(dico: VSCallableD) -> Denoiser:
+def dend2class(dico: VSCallableD, clip: Optional[vs.VideoNode] = None) -> Denoiser:
+    """
+    :param clip:    Clip to denoise. If specified, an "auto" backend is resolved to the fastest implementation
+    """
     if (kwargs := dico['args']) is None:
         kwargs = {}
 
@@ -95,4 +125,7 @@ def dend2class(dico: VSCallableD) -> Denoiser:
     except KeyError as key_err:
         raise ValueError from key_err
 
-    return clss(**kwargs)
+    denoiser = clss(**kwargs)
+    if clip is not None and isinstance(denoiser, AutoDenoiser):
+        return denoiser.select(clip)
+    return denoiser
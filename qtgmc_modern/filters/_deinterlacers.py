@@ -15,21 +15,30 @@ __all__ = [
     'NoiseDWeave', 'NoiseBob', 'NoiseGenerate'
 ]
 
+import math
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, TypeVar, cast
+from contextvars import Context
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, cast
 
 import vapoursynth as vs
-from vsutil import Dither, depth, get_depth
+from vsutil import get_depth
 
 from ..better_vsutil import get_num_planes, scale_value_full
-from ..helper import inject_param
-from ..kernels import BicubicFC
+from ..graph import core
+from ..helper import SOURCE_FRAME_PROP, inject_param
+from ..kernels import Bicubic, BicubicFC
 from ._abstract import VSFilter
 
-core = vs.core
-
 _Deinterlacer = TypeVar('_Deinterlacer', bound='Deinterlacer')
 
+# (format id, b, c, tff, resize props): whether the zimg bob matches the fmtc one
+_BOB_EQUIVALENT: Dict[Tuple[Any, ...], bool] = {}
+_BOB_LOCK = threading.Lock()
+# (format id, width, height, size, seed): noise fields of `NoiseGenerate`
+_NOISE_BANKS: Dict[Tuple[int, int, int, int, int], List[List[Any]]] = {}
+_NOISE_LOCK = threading.Lock()
+
 
 class Deinterlacer(VSFilter, ABC):
     def __call__(self, clip: vs.VideoNode, field: int, **kwargs: Any) -> vs.VideoNode:
@@ -90,7 +99,7 @@ class SangNom2(Deinterlacer):
             # SeparateFields and DoubleWeave must be called
             # and we determine if top field first or bottom field first
             # if field = 2 then it's TFF. If field = 3 then it's BFF
-            clip = core.std.SeparateFields(clip, field % 2).std.DoubleWeave(field % 2)
+            clip = core.std.DoubleWeave(core.std.SeparateFields(clip, field % 2), field % 2)
         return super().__call__(clip, order, **self.params | kwargs)
 
 
@@ -103,12 +112,27 @@ class BWDiF(_AcceptExternalDeintClip):
 
 
 class Bob(Deinterlacer):
+    """
+    Bicubic bob. Two implementations are available:
+    fmtc, resampling the fields at 16 bits or float with `interlaced=1` then converting back to the source depth,
+    and zimg, resampling each field at native depth with a quarter pixel `src_top` shift.
+    The zimg one is faster and is used automatically when its output stays within one code value
+    of the fmtc one (1e-4 in float) on every sample of a high-frequency test pattern.
+    The pattern carries the frame props of the first frame of the clip, e.g. `_FieldBased` and `_ChromaLocation`,
+    so it goes through the same resize path. The check runs once per format, kernel, field order and props.
+    It is a tolerance check on one pattern, not a proof: pass `fast=False` where the fmtc output is required.
+    """
     b: float
     c: float
+    fast: Optional[bool]
 
-    def __init__(self, b: float = 0, c: float = 1/2) -> None:
+    def __init__(self, b: float = 0, c: float = 1/2, fast: Optional[bool] = None) -> None:
+        """
+        :param fast:    Force the zimg (True) or the fmtc (False) implementation. Automatic if None
+        """
         self.b = b
         self.c = c
+        self.fast = fast
         super().__init__()
 
     def __call__(self, clip: vs.VideoNode, field: int, **kwargs: Any) -> vs.VideoNode:
@@ -117,17 +141,86 @@ class Bob(Deinterlacer):
         except KeyError as key_err:
             raise ValueError(f'{self.__class__.__name__}: only supports double rate -> field 2 or 3') from key_err
 
-        bits = get_depth(clip)
-        fields = clip.std.SeparateFields(tff)
-        clip = BicubicFC(self.b, self.c).scale(fields, None, None, scalev=2, interlaced=1, interlacedd=0)
-        return depth(clip, bits, dither_type=Dither.NONE)
-
+        fields = core.std.SeparateFields(clip, tff)
+        fast = self.fast if self.fast is not None else _zimg_bob_equivalent(clip, tff, self.b, self.c)
+        if fast:
+            return _zimg_bob(fields, tff, self.b, self.c)
+        return _fmtc_bob(fields, get_depth(clip), self.b, self.c)
+
+
+def _fmtc_bob(fields: vs.VideoNode, bits: int, b: float, c: float) -> vs.VideoNode:
+    clip = BicubicFC(b, c).scale(fields, None, None, scalev=2, interlaced=1, interlacedd=0)
+    assert clip.format
+    if clip.format.bits_per_sample == bits:
+        return clip
+    return core.resize.Point(clip, format=clip.format.replace(bits_per_sample=bits), dither_type='none')
+
+
+def _zimg_bob(fields: vs.VideoNode, tff: bool, b: float, c: float) -> vs.VideoNode:
+    # Lines of the top field sit a quarter of a field line above the bobbed lines, the bottom field ones below
+    kernel = Bicubic(b, c)
+    shift = 0.25 if tff else -0.25
+    first = kernel.scale(core.std.SelectEvery(fields, 2, 0), fields.width, fields.height * 2, src_top=shift)
+    second = kernel.scale(core.std.SelectEvery(fields, 2, 1), fields.width, fields.height * 2, src_top=-shift)
+    return core.std.Interleave([first, second])
+
+
+# Frame props changing how the fields are resized
+_BOB_PROPS = ('_FieldBased', '_Field', '_ChromaLocation', '_Matrix', '_Transfer', '_Primaries', '_ColorRange')
+
+
+def _zimg_bob_equivalent(clip: vs.VideoNode, tff: bool, b: float, c: float) -> bool:
+    """
+    Whether the zimg bob is within one code value (1e-4 in float) of the fmtc bob for the format of `clip`.
+    Checked on a high-frequency test pattern, where chroma siting or rounding differences show up,
+    carrying the frame props of the first frame of `clip`.
+    """
+    # Fresh context, so the test nodes aren't memoized or profiled with the graph being built
+    return Context().run(_check_bobs, clip, tff, b, c)
+
+
+def _check_bobs(clip: vs.VideoNode, tff: bool, b: float, c: float) -> bool:
+    fmt = clip.format
+    assert fmt
+    with clip.get_frame(0) as f:
+        key = (fmt.id, b, c, tff) + tuple(f.props.get(name) for name in _BOB_PROPS)
+    with _BOB_LOCK:
+        if (equivalent := _BOB_EQUIVALENT.get(key)) is None:
+            equivalent = _BOB_EQUIVALENT[key] = _compare_bobs(clip, tff, b, c)
+    return equivalent
+
+
+def _compare_bobs(clip: vs.VideoNode, tff: bool, b: float, c: float) -> bool:
+    fmt = clip.format
+    assert fmt
+    size = 64 << max(fmt.subsampling_w, fmt.subsampling_h)
+    pattern = core.std.BlankClip(format=fmt.id, width=size, height=size, length=1)
+    if fmt.sample_type == vs.INTEGER:
+        peak = (1 << fmt.bits_per_sample) - 1
+        tolerance = 1.0
+        exprs = [f'X 37 * Y 91 * + X Y * 13 * + {peak + 1} %'] * fmt.num_planes
+    else:
+        tolerance = 1e-4
+        exprs = ['X 37 * Y 91 * + X Y * 13 * + 256 % 255 /'] + ['X 37 * Y 91 * + X Y * 13 * + 256 % 255 / 0.5 -'] * 2
+    pattern = core.std.CopyFrameProps(core.std.Expr(pattern, exprs[:fmt.num_planes]), clip[0])
+
+    try:
+        fields = core.std.SeparateFields(pattern, tff)
+        diff = core.std.Expr([_fmtc_bob(fields, fmt.bits_per_sample, b, c), _zimg_bob(fields, tff, b, c)], 'x y - abs')
+        worst = 0.0
+        for plane in range(fmt.num_planes):
+            for f in core.std.PlaneStats(diff, plane=plane).frames(close=True):
+                worst = max(worst, float(f.props['PlaneStatsMax']))
+    except (AttributeError, vs.Error):
+        # fmtc isn't installed or doesn't support the format, the zimg bob is the only one left
+        return True
+    return worst <= tolerance
 
 
 class NoiseDeint(VSFilter, ABC):
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
 
     @abstractmethod
     def __call__(self, clip: vs.VideoNode, tff: bool = True, **kwargs: Any) -> vs.VideoNode:
@@ -136,7 +229,7 @@ class NoiseDeint(VSFilter, ABC):
 
 class NoiseDWeave(NoiseDeint):
     def __call__(self, clip: vs.VideoNode, tff: bool = True, **kwargs: Any) -> vs.VideoNode:
-        return clip.std.SeparateFields(tff).std.DoubleWeave(tff)
+        return core.std.DoubleWeave(core.std.SeparateFields(clip, tff), tff)
 
 
 class NoiseBob(NoiseDeint):
@@ -153,6 +246,25 @@ class NoiseBob(NoiseDeint):
 
 
 class NoiseGenerate(NoiseDeint):
+    """
+    Generate the missing field of noise from random noise.\n
+    With `bank`, the random noise comes from a bank of fields drawn once with NumPy, cycled through the frames
+    with a different entry and offset for each field. The offsets only depend on the source frame numbers,
+    so the output is the same in every run, chunked or not. Integer formats only, float clips use `grain.Add`.
+    """
+    bank: int
+    seed: int
+
+    def __init__(self, bank: int = 0, seed: int = 0) -> None:
+        """
+        :param bank:    Number of precomputed noise fields. 0 generates new noise for every field with `grain.Add`
+        :param seed:    Seed of the precomputed noise fields
+        """
+        self.bank = bank
+        self.seed = seed
+        # Kept in the params, so `to_dict` and the settings fingerprint tell banks apart
+        super().__init__(bank=bank, seed=seed)
+
     def __call__(self, clip: vs.VideoNode, tff: bool = True, **kwargs: Any) -> vs.VideoNode:
         """
         Given noise extracted from an interlaced source (i.e. the noise is interlaced),
@@ -168,14 +280,17 @@ class NoiseGenerate(NoiseDeint):
 
         planes = [0, 1, 2] if chroma else [0]
 
-        noise = clip.std.SeparateFields(tff)
-        noisemax = noise.std.Maximum(planes).std.Maximum(planes, coordinates=[0, 0, 0, 1, 1, 0, 0, 0])
-        noisemin = noise.std.Minimum(planes).std.Minimum(planes, coordinates=[0, 0, 0, 1, 1, 0, 0, 0])
+        noise = core.std.SeparateFields(clip, tff)
+        noisemax = core.std.Maximum(core.std.Maximum(noise, planes), planes, coordinates=[0, 0, 0, 1, 1, 0, 0, 0])
+        noisemin = core.std.Minimum(core.std.Minimum(noise, planes), planes, coordinates=[0, 0, 0, 1, 1, 0, 0, 0])
 
         neutral = 1 << (get_depth(clip) - 1)
-        randomnoise = interleaved_clip.std.SeparateFields(tff).std.BlankClip(
-            color=[neutral] * get_num_planes(clip)
-        ).grain.Add(1800, 1800)
+        blank = core.std.BlankClip(core.std.SeparateFields(interleaved_clip, tff), color=[neutral] * get_num_planes(clip))
+        assert blank.format
+        if self.bank > 0 and blank.format.sample_type == vs.INTEGER:
+            randomnoise = _banked_noise(blank, noise, self.bank, self.seed)
+        else:
+            randomnoise = core.grain.Add(blank, 1800, 1800)
 
         diffnoise = core.std.MakeDiff(noisemax, noisemin, planes)
 
@@ -184,4 +299,71 @@ class NoiseGenerate(NoiseDeint):
         varrandom = core.std.Expr([diffnoise, randomnoise], f'x {neutral} - y * {_scale(256)} / {neutral} +')
         newnoise = core.std.MergeDiff(noisemin, varrandom, planes)
 
-        return core.std.Interleave([noise, newnoise]).std.DoubleWeave(tff)[::2]
+        return core.std.SelectEvery(core.std.DoubleWeave(core.std.Interleave([noise, newnoise]), tff), 2, 0)
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as import_err:
+        raise ImportError('NoiseGenerate: the noise bank requires numpy') from import_err
+    return numpy
+
+
+def _noise_bank(fmt: vs.VideoFormat, width: int, height: int, size: int, seed: int) -> List[List[Any]]:
+    """Noise fields of the bank, one array per plane, drawn on first use and shared by every graph"""
+    key = (fmt.id, width, height, size, seed)
+    with _NOISE_LOCK:
+        if (bank := _NOISE_BANKS.get(key)) is None:
+            np = _numpy()
+            rng = np.random.default_rng(seed)
+            peak = (1 << fmt.bits_per_sample) - 1
+            # Same distribution as grain.Add(var=1800, uvar=1800), whose variance is given on the 8-bit scale
+            sigma = scale_value_full(math.sqrt(1800), 8, fmt.bits_per_sample)
+            dtype = np.uint8 if fmt.bytes_per_sample == 1 else np.uint16
+            shapes = [
+                (height >> fmt.subsampling_h, width >> fmt.subsampling_w) if plane else (height, width)
+                for plane in range(fmt.num_planes)
+            ]
+            bank = _NOISE_BANKS[key] = [
+                [
+                    np.clip(np.rint(rng.normal(1 << (fmt.bits_per_sample - 1), sigma, shape)), 0, peak).astype(dtype)
+                    for shape in shapes
+                ]
+                for _ in range(size)
+            ]
+    return bank
+
+
+def _copy_rolled(dst: Any, src: Any, dy: int, dx: int) -> None:
+    """`dst[y, x] = src[(y + dy) % h, (x + dx) % w]`, without the temporary array of `numpy.roll`"""
+    h, w = src.shape
+    dst[:h - dy, :w - dx] = src[dy:, dx:]
+    dst[:h - dy, w - dx:] = src[dy:, :dx]
+    dst[h - dy:, :w - dx] = src[:dy, dx:]
+    dst[h - dy:, w - dx:] = src[:dy, :dx]
+
+
+def _banked_noise(blank: vs.VideoNode, fields: vs.VideoNode, size: int, seed: int) -> vs.VideoNode:
+    fmt = blank.format
+    assert fmt
+    chroma_h, chroma_w = blank.height >> fmt.subsampling_h, blank.width >> fmt.subsampling_w
+
+    def _fill(n: int, f: List[vs.VideoFrame]) -> vs.VideoFrame:
+        np = _numpy()
+        bank = _noise_bank(fmt, blank.width, blank.height, size, seed)
+        # Number of the field in the whole source, when the frames were numbered before being trimmed
+        source = f[1].props.get(SOURCE_FRAME_PROP)
+        index = n if source is None else cast(int, source) * 2 + (n & 1)
+
+        h = (index * 0x9E3779B1 + seed) & 0xFFFFFFFF
+        # Offsets in whole chroma samples, so every plane moves by the same amount
+        dy = (h >> 7) % chroma_h
+        dx = ((h * 0x85EBCA6B) >> 11) % chroma_w
+        fout = f[0].copy()
+        for plane, src in enumerate(bank[h % size]):
+            scale_y, scale_x = (0, 0) if plane else (fmt.subsampling_h, fmt.subsampling_w)
+            _copy_rolled(np.asarray(fout[plane]), src, dy << scale_y, dx << scale_x)
+        return fout
+
+    return core.std.ModifyFrame(blank, [blank, fields], _fill)
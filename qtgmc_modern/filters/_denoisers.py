@@ -13,17 +13,19 @@ __all__ = [
 
 from abc import ABC
 from enum import Enum
-from typing import Any
+from typing import Any, ClassVar, Optional
 
 import vapoursynth as vs
 
 from ..better_vsutil import is_444
+from ..graph import core
 from ._abstract import VSFilter
 
-core = vs.core
-
 
 class Denoiser(VSFilter, ABC):
+    threads_arg: ClassVar[Optional[str]] = None
+    """Argument setting the internal threads of the plugin, if any"""
+
     def __call__(self, clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
         return super().__vscall__(clip, **kwargs)
 
@@ -34,6 +36,7 @@ class DFTTest(Denoiser):
 
 class NeoDFTTest(Denoiser):
     func = lambda: core.neo_dfttest.DFTTest
+    threads_arg = 'threads'
 
 
 class KNLMeansCL(Denoiser):
@@ -42,10 +45,12 @@ class KNLMeansCL(Denoiser):
 
 class FFT3D(Denoiser):
     func = lambda: core.fft3dfilter.FFT3DFilter
+    threads_arg = 'ncpu'
 
 
 class NeoFFT3D(Denoiser):
     func = lambda: core.neo_fft3d.FFT3D
+    threads_arg = 'ncpu'
 
 
 class DeviceTypeCL(str, Enum):
@@ -72,11 +77,10 @@ def knl_means_cl(
     knl_args = dict(d=tmprange, a=radsearch, s=radsim, h=strength) | kwargs
     if channels == KNLMeansCLChannel.YUV:
         if is_444(clip):
-            return clip.knlm.KNLMeansCL(**knl_args, channels=channels)
-        return clip.knlm.KNLMeansCL(
-            **knl_args, channels=KNLMeansCLChannel.Y
-        ).knlm.KNLMeansCL(
+            return core.knlm.KNLMeansCL(clip, **knl_args, channels=channels)
+        return core.knlm.KNLMeansCL(
+            core.knlm.KNLMeansCL(clip, **knl_args, channels=KNLMeansCLChannel.Y),
             **knl_args, channels=KNLMeansCLChannel.UV
         )
 
-    return clip.knlm.KNLMeansCL(**knl_args, channels=channels)
+    return core.knlm.KNLMeansCL(clip, **knl_args, channels=channels)
@@ -0,0 +1,284 @@
+"""
+Persistent on-disk motion vector cache
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'VectorCache'
+]
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import vapoursynth as vs
+
+from ..helper import SOURCE_FRAME_PROP
+from ..types import SettingsView
+from ._mvtools import mv_analyse
+
+# Frame properties holding the analysed vectors in MVTools
+_PROPS = ('MVTools_MVAnalysisData', 'MVTools_vectors')
+
+# magic | num_frames | slot_size | format id | width | height | fpsnum | fpsden
+_HEADER = struct.Struct('<8sIQiIIQQ')
+_MAGIC = b'QTGMCMV1'
+_LEN = struct.Struct('<I')
+
+
+class _VectorFile:
+    """
+    Fixed-slot memory-mapped file storing the vector props of every frame of a vector clip.\n
+    Layout: header | one "filled" byte per frame | one slot per frame.
+    Slot size is known after the first recorded frame since MVTools vectors have a constant size
+    for a given clip and analysis settings.
+    A new file is recorded under a temporary name private to the process and moved into place once complete,
+    so a file mapped by another worker is never truncated.
+    """
+    path: Path
+    num_frames: int
+    slot_size: int
+    clip_info: Tuple[int, int, int, int, int]
+    """Format id, width, height and frame rate of the vector clip"""
+    _mm: Optional[mmap.mmap]
+    _lock: threading.Lock
+    _filled: int
+    _tmp: Optional[Path]
+    _closed: bool
+
+    def __init__(self, path: Path, num_frames: int) -> None:
+        self.path = path
+        self.num_frames = num_frames
+        self.slot_size = 0
+        self.clip_info = (0, 0, 0, 0, 0)
+        self._mm = None
+        self._lock = threading.Lock()
+        self._filled = 0
+        self._tmp = None
+        self._closed = False
+
+    @property
+    def complete(self) -> bool:
+        """Whether every frame is recorded and the file is still open"""
+        return self._mm is not None and self._filled == self.num_frames
+
+    @property
+    def _data_offset(self) -> int:
+        return _HEADER.size + self.num_frames
+
+    @classmethod
+    def open_complete(cls, path: Path) -> Optional[_VectorFile]:
+        """Open an existing cache file. Returns None if it is missing, corrupted or partially filled"""
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(mm) < _HEADER.size:
+            mm.close()
+            return None
+        magic, num_frames, slot_size, fmt_id, width, height, fpsnum, fpsden = _HEADER.unpack_from(mm, 0)
+        vfile = cls(path, num_frames)
+        vfile.slot_size = slot_size
+        vfile.clip_info = (fmt_id, width, height, fpsnum, fpsden)
+        vfile._mm = mm
+        if (
+            magic != _MAGIC or slot_size == 0
+            or len(mm) != vfile._data_offset + num_frames * slot_size
+            or mm[_HEADER.size:vfile._data_offset].count(b'\x01') != num_frames
+        ):
+            vfile.close()
+            return None
+        vfile._filled = num_frames
+        return vfile
+
+    def write(self, n: int, clip: vs.VideoNode, blobs: List[bytes]) -> None:
+        slot = b''.join(_LEN.pack(len(b)) + b for b in blobs)
+        with self._lock:
+            if self._closed:
+                # Superseded by a complete file, or the cache was closed while a graph still renders
+                return
+            if self._mm is None:
+                self._create(clip, len(slot))
+            assert self._mm
+            if len(slot) > self.slot_size:
+                raise ValueError(f'{self.__class__.__name__}: vector data size changed between frames')
+            offset = self._data_offset + n * self.slot_size
+            self._mm[offset:offset + len(slot)] = slot
+            if not self._mm[_HEADER.size + n]:
+                self._mm[_HEADER.size + n] = 1
+                self._filled += 1
+            if self._filled == self.num_frames and self._tmp is not None:
+                self._mm.flush()
+                os.replace(self._tmp, self.path)
+                self._tmp = None
+
+    def read(self, n: int) -> List[bytes]:
+        assert self._mm
+        offset = self._data_offset + n * self.slot_size
+        blobs: List[bytes] = []
+        for _ in _PROPS:
+            (size, ) = _LEN.unpack_from(self._mm, offset)
+            offset += _LEN.size
+            blobs.append(self._mm[offset:offset + size])
+            offset += size
+        return blobs
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            if self._tmp is not None:
+                # Partially recorded
+                self._tmp.unlink(missing_ok=True)
+                self._tmp = None
+
+    def _create(self, clip: vs.VideoNode, slot_size: int) -> None:
+        assert clip.format
+        self.slot_size = slot_size
+        self.clip_info = (clip.format.id, clip.width, clip.height, clip.fps.numerator, clip.fps.denominator)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.{id(self):x}.tmp')
+        with open(self._tmp, 'w+b') as f:
+            f.truncate(self._data_offset + self.num_frames * slot_size)
+            self._mm = mmap.mmap(f.fileno(), 0)
+        _HEADER.pack_into(
+            self._mm, 0, _MAGIC, self.num_frames, slot_size,
+            clip.format.id, clip.width, clip.height, clip.fps.numerator, clip.fps.denominator
+        )
+
+
+class VectorCache:
+    """
+    Stores analysed motion vector clips in memory-mapped files so that later renders
+    of the same source with the same motion settings skip the motion search entirely.
+
+    The first render records the vectors of every frame actually requested.
+    Once a vector clip has been fully recorded, `analyse` replays it as a drop-in vector node
+    usable by `mv_compensate`, `mv_degrain1`, `mv_recalculate` and the likes.\n
+    The vector files stay mapped until `close`, which has to wait for the end of the renders using the cache:
+
+    >>> with VectorCache('mvcache', 'in.mkv') as cache:
+    ...     qtgmc.vector_cache = cache
+    ...     render(qtgmc.process())
+    """
+    directory: Path
+    source_id: str
+    _files: Dict[str, _VectorFile]
+    _digests: Dict[int, Tuple[vs.VideoNode, str]]
+
+    def __init__(self, directory: str | os.PathLike[str], source_id: str) -> None:
+        """
+        :param directory:   Folder where the vector files are stored
+        :param source_id:   Identifier of the source clip, typically its file path.
+                            VapourSynth nodes have no identity that survives the process,
+                            so it is combined with the clip properties and a digest of its first
+                            and last frames to build the cache key.
+        """
+        self.directory = Path(directory)
+        self.source_id = source_id
+        self._files = {}
+        self._digests = {}
+
+    def __enter__(self) -> VectorCache:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def key(self, clip: vs.VideoNode, tff: bool, input_type: int, motion_analysis: Mapping[str, Any],
+            motion_search: Mapping[str, Any], **kwargs: Any) -> str:
+        assert clip.format
+        identity = dict(
+            source_id=self.source_id,
+            format=clip.format.name, width=clip.width, height=clip.height,
+            num_frames=clip.num_frames, fps=str(clip.fps), frames=self._digest(clip),
+            # Both change the bobbed search clip
+            tff=tff, input_type=int(input_type),
+            motion_analysis=SettingsView(motion_analysis).fingerprint,
+            motion_search=SettingsView(motion_search).fingerprint,
+            analyse=kwargs
+        )
+        dump = json.dumps(identity, sort_keys=True, default=str).encode()
+        return hashlib.sha256(dump).hexdigest()
+
+    def _digest(self, clip: vs.VideoNode) -> str:
+        """
+        Digest of the first and last frames of `clip`, with their source frame numbers if numbered.
+        Tells apart trims of the same source with the same length, e.g. two chunks of a `ChunkedRenderer`
+        """
+        if (cached := self._digests.get(id(clip))) is not None and cached[0] is clip:
+            return cached[1]
+        digest = hashlib.sha256()
+        for n in sorted({0, clip.num_frames - 1}):
+            with clip.get_frame(n) as f:
+                digest.update(str(f.props.get(SOURCE_FRAME_PROP)).encode())
+                for plane in range(f.format.num_planes):
+                    digest.update(memoryview(f[plane]).tobytes())
+        # The clip is kept alive so its id isn't reused
+        self._digests[id(clip)] = (clip, digest.hexdigest())
+        return digest.hexdigest()
+
+    def analyse(self, super_clip: vs.VideoNode, clip: vs.VideoNode, tff: bool, input_type: int,
+                motion_analysis: Mapping[str, Any], motion_search: Mapping[str, Any],
+                **kwargs: Any) -> vs.VideoNode:
+        """
+        Cached `mv_analyse`.
+
+        :param super_clip:          Super clip used for the motion search
+        :param clip:                Source clip, only used for its identity
+        :param tff:                 Field order the search clip was bobbed with
+        :param input_type:          `InputType` of the source
+        :param motion_analysis:     `motion_analysis` settings
+        :param motion_search:       `core.motion_search` settings
+        :param kwargs:              Additional arguments passed to `mv_analyse` (isb, delta, blksize, ...)
+        :return:                    Vector clip
+        """
+        key = self.key(clip, tff, input_type, motion_analysis, motion_search, **kwargs)
+        path = self.directory / f'{key}.mvc'
+
+        vfile = self._files.get(key)
+        if (vfile is None or not vfile.complete) and (opened := _VectorFile.open_complete(path)) is not None:
+            if vfile is not None:
+                # Unfinished recording, superseded by the complete file
+                vfile.close()
+            self._files[key] = vfile = opened
+
+        if vfile is not None and vfile.complete:
+            fmt_id, width, height, fpsnum, fpsden = vfile.clip_info
+            blank = vs.core.std.BlankClip(
+                width=width, height=height, format=fmt_id, length=vfile.num_frames,
+                fpsnum=fpsnum, fpsden=fpsden, keep=True
+            )
+
+            def _replay(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+                fout = f.copy()
+                for prop, blob in zip(_PROPS, vfile.read(n)):
+                    fout.props[prop] = blob
+                return fout
+            return blank.std.ModifyFrame(blank, _replay)
+
+        vectors = mv_analyse(super_clip, **kwargs)
+        # An unfinished recording of the same vectors keeps being filled
+        recorded = self._files.setdefault(key, _VectorFile(path, vectors.num_frames))
+
+        def _record(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+            recorded.write(n, vectors, [bytes(f.props[prop]) for prop in _PROPS])
+            return f
+        return vectors.std.ModifyFrame(vectors, _record)
+
+    def close(self) -> None:
+        """Unmap the vector files and delete the unfinished recordings"""
+        for vfile in self._files.values():
+            vfile.close()
+        self._files.clear()
+        self._digests.clear()
@@ -2,20 +2,29 @@
 MVTools interface
 """
 
+from __future__ import annotations
+
 __all__ = [
     'mv_analyse',
-    'mv_super',
+    'mv_super', 'SuperFactory', 'SuperStats',
     'mv_compensate',
     'mv_mask',
-    'mv_degrain1',
+    'mv_degrain1', 'mv_degrain2', 'mv_degrain3',
     'mv_recalculate',
     'mv_flowblur'
 ]
 
-from typing import Any, Callable
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
 import vapoursynth as vs
 
 from ..better_vsutil import get_sample_type
+from ..graph import core
+
+_FACTORY: ContextVar[Optional[SuperFactory]] = ContextVar('_FACTORY', default=None)
+# Defaults of mv.Super and mvsf.Super, so omitted and explicit default arguments get the same key
+_SUPER_DEFAULTS: Dict[str, Any] = dict(hpad=16, vpad=16, pel=2, levels=0, chroma=True, sharp=2, rfilter=2, opt=True)
 
 
 def _pick_function(clip: vs.VideoNode,
@@ -25,28 +34,113 @@ def _pick_function(clip: vs.VideoNode,
 
 
 def mv_analyse(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Analyse, vs.core.mvsf.Analyse)(clip, **kwargs)
+    return _pick_function(clip, core.mv.Analyse, core.mvsf.Analyse)(clip, **kwargs)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, vs.VideoNode):
+        return ('node', id(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class SuperStats(NamedTuple):
+    created: int
+    reused: int
+
+    def __str__(self) -> str:
+        return f'Super nodes: {self.created} created, {self.reused} reused'
+
+
+class SuperFactory:
+    """
+    Memoizing `mv.Super` factory, active for the calls to `mv_super` made inside its context.\n
+    Super clips are 4 to 16 times bigger than the input frame with pel=2/4, so requesting twice
+    the same Super clip for the same input node returns the node already created.
+    Nodes are keyed on the input node identity and the Super parameters with their defaults filled in.
+    Every `QTGMC` build enters its own factory, so concurrent builds never share or clear each other's nodes.
+
+    >>> with SuperFactory() as factory:
+    ...     a = mv_super(clip, pel=2)
+    ...     b = mv_super(clip)
+    >>> a is b
+    True
+    """
+    _cache: Dict[Tuple[int, Hashable], Tuple[vs.VideoNode, vs.VideoNode]]
+    _token: Optional[Token[Optional[SuperFactory]]]
+    _created: int
+    _reused: int
+
+    def __init__(self) -> None:
+        self._cache = {}
+        self._token = None
+        self._created = 0
+        self._reused = 0
+
+    def __enter__(self) -> SuperFactory:
+        self._token = _FACTORY.set(self)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self._token is not None:
+            _FACTORY.reset(self._token)
+            self._token = None
+
+    def __call__(self, clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
+        key = (id(clip), _freeze(tuple(sorted((_SUPER_DEFAULTS | kwargs).items()))))
+        try:
+            _, sup = self._cache[key]
+        except KeyError:
+            sup = _pick_function(clip, core.mv.Super, core.mvsf.Super)(clip, **kwargs)
+            # The input node is kept alive along the Super clip so its id can't be recycled
+            self._cache[key] = (clip, sup)
+            self._created += 1
+        else:
+            self._reused += 1
+        return sup
+
+    @property
+    def stats(self) -> SuperStats:
+        return SuperStats(self._created, self._reused)
+
+    def clear(self) -> None:
+        """Release every memoized node and reset the counters"""
+        self._cache.clear()
+        self._created = 0
+        self._reused = 0
 
 
 def mv_super(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Super, vs.core.mvsf.Super)(clip, **kwargs)
+    """`mv.Super`, memoized by the active `SuperFactory` if any"""
+    if (factory := _FACTORY.get()) is not None:
+        return factory(clip, **kwargs)
+    return _pick_function(clip, core.mv.Super, core.mvsf.Super)(clip, **kwargs)
 
 
 def mv_compensate(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Compensate, vs.core.mvsf.Compensate)(clip, **kwargs)
+    return _pick_function(clip, core.mv.Compensate, core.mvsf.Compensate)(clip, **kwargs)
 
 
 def mv_mask(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Mask, vs.core.mvsf.Mask)(clip, **kwargs)
+    return _pick_function(clip, core.mv.Mask, core.mvsf.Mask)(clip, **kwargs)
 
 
 def mv_degrain1(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Degrain1, vs.core.mvsf.Degrain1)(clip, **kwargs)
+    return _pick_function(clip, core.mv.Degrain1, core.mvsf.Degrain1)(clip, **kwargs)
+
+
+def mv_degrain2(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
+    return _pick_function(clip, core.mv.Degrain2, core.mvsf.Degrain2)(clip, **kwargs)
+
+
+def mv_degrain3(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
+    return _pick_function(clip, core.mv.Degrain3, core.mvsf.Degrain3)(clip, **kwargs)
 
 
 def mv_recalculate(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.Recalculate, vs.core.mvsf.Recalculate)(clip, **kwargs)
+    return _pick_function(clip, core.mv.Recalculate, core.mvsf.Recalculate)(clip, **kwargs)
 
 
 def mv_flowblur(clip: vs.VideoNode, **kwargs: Any) -> vs.VideoNode:
-    return _pick_function(clip, vs.core.mv.FlowBlur, vs.core.mvsf.FlowBlur)(clip, **kwargs)
+    return _pick_function(clip, core.mv.FlowBlur, core.mvsf.FlowBlur)(clip, **kwargs)
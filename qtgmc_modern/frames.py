@@ -0,0 +1,93 @@
+"""
+Frame access from Python.\n
+Frames are requested ahead of the consumer with a bounded window of `get_frame_async` futures
+and handed over in order. `iter_arrays` exposes them as NumPy views over the frame memory.
+NumPy is only needed when `iter_arrays` is actually used.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'FrameArrays',
+    'prefetch_frames', 'iter_arrays'
+]
+
+from collections import deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Deque, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import vapoursynth as vs
+
+from .graph import core
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as import_err:
+        raise ImportError('qtgmc_modern.frames.iter_arrays requires numpy') from import_err
+    return numpy
+
+
+def prefetch_frames(clip: vs.VideoNode, frames: Optional[Iterable[int]] = None,
+                    window: Optional[int] = None) -> Iterator[Tuple[int, vs.VideoFrame]]:
+    """
+    Frames of `clip` in order, with up to `window` frames requested ahead.\n
+    No more than `window` frames are ever rendered but not consumed, so a slow consumer
+    holds VapourSynth back instead of piling up frames in memory.
+
+    :param frames:      Frame numbers to render. Defaults to the whole clip
+    :param window:      Frames in flight. Defaults to the number of threads of the core
+    :return:            Frame numbers and frames. Frames are owned by the caller
+    """
+    window = max(window or core.num_threads, 1)
+    numbers = iter(range(clip.num_frames) if frames is None else frames)
+    pending: Deque[Tuple[int, Future[vs.VideoFrame]]] = deque()
+
+    for n in numbers:
+        pending.append((n, clip.get_frame_async(n)))
+        if len(pending) >= window:
+            break
+    while pending:
+        n, fut = pending.popleft()
+        frame = fut.result()
+        if (nxt := next(numbers, None)) is not None:
+            pending.append((nxt, clip.get_frame_async(nxt)))
+        yield n, frame
+
+
+class FrameArrays(NamedTuple):
+    n: int
+    """Frame number"""
+    frame: vs.VideoFrame
+    """Frame the planes are views of, with its properties"""
+    planes: Tuple[NDArray[Any], ...]
+    """Read-only `(height, width)` views of each plane, strided like the frame memory"""
+
+
+def iter_arrays(clip: vs.VideoNode, frames: Optional[Iterable[int]] = None,
+                window: Optional[int] = None) -> Iterator[FrameArrays]:
+    """
+    Frames of `clip` as NumPy views, without copying the pixels.\n
+    Each view holds a reference to its frame, so the memory and the strides stay valid as long as
+    the arrays (or the frame) are alive. Drop them to release the frame back to VapourSynth;
+    keeping many of them keeps as many frames in memory.
+    Rows may be padded: use `np.ascontiguousarray` if a contiguous array is needed.
+
+    >>> for n, frame, (y, u, v) in iter_arrays(clip, window=8):
+    ...     scores.append(y.mean())
+
+    :param frames:      Frame numbers to render. Defaults to the whole clip
+    :param window:      Frames in flight. Defaults to the number of threads of the core
+    """
+    np = _numpy()
+    for n, frame in prefetch_frames(clip, frames, window):
+        planes = []
+        for plane in range(frame.format.num_planes):
+            array = np.asarray(frame[plane])
+            array.flags.writeable = False
+            planes.append(array)
+        yield FrameArrays(n, frame, tuple(planes))
@@ -0,0 +1,305 @@
+"""
+Graph building helpers.\n
+`core` is a drop-in replacement for `vs.core` routing every filter call through the active `GraphBuilder`, if any,
+and tagging the created nodes for the active `StageProfiler`, if any.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'GraphBuilder', 'GraphStats',
+    'StageProfiler', 'StageTiming',
+    'core'
+]
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from enum import Enum
+from typing import Any, Dict, Hashable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import vapoursynth as vs
+
+from .types import SettingsView
+
+_BUILDER: ContextVar[Optional[GraphBuilder]] = ContextVar('_BUILDER', default=None)
+_PROFILER: ContextVar[Optional[StageProfiler]] = ContextVar('_PROFILER', default=None)
+
+
+class _Unhashable(Exception):
+    ...
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (vs.VideoNode, vs.AudioNode)):
+        return ('node', id(value))
+    if isinstance(value, SettingsView):
+        return ('settings', value.fingerprint)
+    if isinstance(value, Enum):
+        return _freeze(value.value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (int, float, str, bytes, type(None))):
+        return value
+    # Callbacks, frames, and the likes can't be compared safely
+    raise _Unhashable
+
+
+class GraphStats(NamedTuple):
+    created: int
+    reused: int
+
+    def __str__(self) -> str:
+        return f'Filter calls: {self.created} nodes created, {self.reused} reused'
+
+
+class GraphBuilder:
+    """
+    Opt-in context memoizing every filter call made through `qtgmc_modern.graph.core`.\n
+    Calls are keyed on (plugin namespace, function name, normalised arguments) where input nodes are compared by identity.
+    As a memoized call returns the very same node object, identical subgraphs collapse into a single chain of nodes.
+
+    >>> with GraphBuilder() as graph:
+    ...     a = core.std.SeparateFields(clip, True)
+    ...     b = core.std.SeparateFields(clip, tff=True)
+    >>> a is b
+    True
+    """
+    _calls: Dict[Hashable, Any]
+    _refs: List[Any]
+    _signatures: Dict[Tuple[str, str], Tuple[str, ...]]
+    _token: Optional[Token[Optional[GraphBuilder]]]
+    _created: int
+    _reused: int
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._refs = []
+        self._signatures = {}
+        self._token = None
+        self._created = 0
+        self._reused = 0
+
+    def __enter__(self) -> GraphBuilder:
+        self._token = _BUILDER.set(self)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self._token is not None:
+            _BUILDER.reset(self._token)
+            self._token = None
+
+    @property
+    def stats(self) -> GraphStats:
+        return GraphStats(self._created, self._reused)
+
+    def clear(self) -> None:
+        """Release every memoized node and reset the counters"""
+        self._calls.clear()
+        self._refs.clear()
+        self._created = 0
+        self._reused = 0
+
+    def call(self, namespace: str, name: str, func: vs.Function, *args: Any, **kwargs: Any) -> Any:
+        try:
+            key = self._key(namespace, name, func, args, kwargs)
+        except _Unhashable:
+            self._created += 1
+            return func(*args, **kwargs)
+
+        try:
+            out = self._calls[key]
+        except KeyError:
+            out = self._calls[key] = func(*args, **kwargs)
+            # Input nodes are kept alive so their ids can't be recycled
+            self._refs.append((args, kwargs))
+            self._created += 1
+        else:
+            self._reused += 1
+        return out
+
+    def _key(self, namespace: str, name: str, func: vs.Function,
+             args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+        if args:
+            arg_names = self._arg_names(namespace, name, func)
+            if len(args) > len(arg_names):
+                raise _Unhashable
+            kwargs = dict(zip(arg_names, args)) | kwargs
+        return (namespace, name, _freeze(kwargs))
+
+    def _arg_names(self, namespace: str, name: str, func: vs.Function) -> Tuple[str, ...]:
+        try:
+            return self._signatures[(namespace, name)]
+        except KeyError:
+            # Signature looks like "clip:vnode;tff:int:opt;"
+            signature: str = getattr(func, 'signature', '')
+            names = tuple(arg.split(':')[0] for arg in signature.split(';') if arg)
+            self._signatures[(namespace, name)] = names
+            return names
+
+
+class StageTiming(NamedTuple):
+    stage: str
+    nodes: int
+    """Number of nodes created in the stage"""
+    time: float
+    """Time spent in the filters of the stage, in seconds"""
+    share: float
+    """Share of the time of every stage"""
+
+
+class StageProfiler:
+    """
+    Tag every node created through `qtgmc_modern.graph.core` with the active stage
+    and read back the VapourSynth node timings after a render.\n
+    Node timings are the time spent in each filter, summed over all threads, so a stage share
+    is its share of the work, not of the wall time. Requires VapourSynth R58 or later.
+
+    >>> profiler = StageProfiler()
+    >>> with profiler.stage('denoise'):
+    ...     clip = core.dfttest.DFTTest(clip)
+    >>> profiler.render(clip)
+    >>> print(profiler)
+    """
+    _nodes: Dict[str, List[vs.VideoNode]]
+    _seen: Set[int]
+    _stage: Optional[str]
+    wall_time: float
+
+    def __init__(self) -> None:
+        self._nodes = {}
+        self._seen = set()
+        self._stage = None
+        self.wall_time = 0.0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Tag the nodes created in the context with `name`"""
+        token = _PROFILER.set(self)
+        previous, self._stage = self._stage, name
+        try:
+            yield
+        finally:
+            self._stage = previous
+            _PROFILER.reset(token)
+
+    def record(self, out: Any) -> None:
+        if self._stage is None:
+            return
+        for node in out if isinstance(out, list) else [out]:
+            # Nodes returned again by a GraphBuilder belong to the stage that created them
+            if isinstance(node, vs.VideoNode) and id(node) not in self._seen:
+                self._seen.add(id(node))
+                self._nodes.setdefault(self._stage, []).append(node)
+
+    @property
+    def nodes(self) -> Dict[str, List[vs.VideoNode]]:
+        """Tagged nodes of each stage"""
+        return self._nodes
+
+    def reset(self) -> None:
+        """Reset the timings of every tagged node"""
+        for nodes in self._nodes.values():
+            for node in nodes:
+                node._timings = 0
+
+    def render(self, clip: vs.VideoNode, frames: Optional[int] = None) -> float:
+        """
+        Render `clip` with node timing enabled and remember the wall time.
+
+        :param frames:      Number of frames to render. Defaults to the whole clip
+        :return:            Wall time in seconds
+        """
+        vs.core.enable_node_timing = True
+        self.reset()
+        if frames is not None:
+            clip = clip[:frames]
+        start = time.perf_counter()
+        for _ in clip.frames(close=True):
+            pass
+        self.wall_time = time.perf_counter() - start
+        return self.wall_time
+
+    def report(self) -> List[StageTiming]:
+        times = {stage: sum(node._timings for node in nodes) / 1e9 for stage, nodes in self._nodes.items()}
+        total = sum(times.values())
+        return [
+            StageTiming(stage, len(self._nodes[stage]), t, t / total if total else 0.0)
+            for stage, t in times.items()
+        ]
+
+    def __str__(self) -> str:
+        lines = [f'{"Stage":<24}{"Nodes":>8}{"Time (s)":>12}{"Share":>9}']
+        for timing in self.report():
+            lines.append(f'{timing.stage:<24}{timing.nodes:>8}{timing.time:>12.3f}{timing.share:>9.1%}')
+        lines.append(f'Render wall time: {self.wall_time:.3f}s')
+        return '\n'.join(lines)
+
+
+class _FunctionProxy:
+    """Plugin function resolved on its first call and memoized until the core changes"""
+    __slots__ = ('_namespace', '_name', '_core', '_func')
+
+    def __init__(self, namespace: str, name: str) -> None:
+        self._namespace = namespace
+        self._name = name
+        self._core: Optional[vs.Core] = None
+        self._func: Optional[vs.Function] = None
+
+    @property
+    def func(self) -> vs.Function:
+        current = vs.core.core
+        if self._core is not current or self._func is None:
+            self._func = getattr(getattr(current, self._namespace), self._name)
+            self._core = current
+        return self._func
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        if (builder := _BUILDER.get()) is None:
+            out = self.func(*args, **kwargs)
+        else:
+            out = builder.call(self._namespace, self._name, self.func, *args, **kwargs)
+        if (profiler := _PROFILER.get()) is not None:
+            profiler.record(out)
+        return out
+
+
+class _PluginProxy:
+    __slots__ = ('_namespace', '_functions')
+
+    def __init__(self, namespace: str) -> None:
+        self._namespace = namespace
+        self._functions: Dict[str, _FunctionProxy] = {}
+
+    def __getattr__(self, name: str) -> _FunctionProxy:
+        try:
+            return self._functions[name]
+        except KeyError:
+            func = self._functions[name] = _FunctionProxy(self._namespace, name)
+            return func
+
+
+class _CoreProxy:
+    """
+    Attributes of `vs.Core` are forwarded, anything else is a plugin namespace.
+    Nothing is looked up on the core until a function is actually called,
+    so a missing plugin only fails where it is used.
+    """
+    _plugins: Dict[str, _PluginProxy]
+
+    def __init__(self) -> None:
+        self._plugins = {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__') or hasattr(vs.Core, name):
+            return getattr(vs.core, name)
+        try:
+            return self._plugins[name]
+        except KeyError:
+            plugin = self._plugins[name] = _PluginProxy(name)
+            return plugin
+
+
+core: Any = _CoreProxy()
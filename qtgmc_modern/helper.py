@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import os
 from functools import partial, wraps
+from pathlib import Path
 from typing import (Any, Callable, Dict, Optional, Protocol, TypeVar, Union,
                     cast, overload)
 
 import vapoursynth as vs
 from typing_extensions import Concatenate, ParamSpec
 
+from .graph import core
+
 _T_co = TypeVar('_T_co', covariant=True)
 _P = ParamSpec('_P')
 
@@ -50,7 +54,7 @@ class HasParam(Protocol):
 
 
 def merge_chroma(y: vs.VideoNode, uv: vs.VideoNode, /) -> vs.VideoNode:
-    return vs.core.std.ShufflePlanes([y, uv], [0, 1, 2], vs.YUV)
+    return core.std.ShufflePlanes([y, uv], [0, 1, 2], vs.YUV)
 
 
 CallMethod = Callable[Concatenate[HasParam, vs.VideoNode, int, _P], vs.VideoNode]
@@ -121,3 +125,30 @@ def clamp_value(val: Optional[Nb], min_val: Optional[Nb], max_val: Optional[Nb])
     if min_val is None and max_val is not None:
         return max_val if val > max_val else val
     return val
+
+
+def cache_dir() -> Path:
+    """
+    Per-user folder of the machine-specific caches, e.g. the benchmark results.
+    `$QTGMC_CACHE_DIR` if set, otherwise `qtgmc_modern` in the user cache folder
+    """
+    if directory := os.environ.get('QTGMC_CACHE_DIR'):
+        return Path(directory)
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'qtgmc_modern'
+
+
+SOURCE_FRAME_PROP = 'QTGMC_SourceFrame'
+"""Frame prop holding the number of the frame in the whole source, set by `number_frames`"""
+
+
+def number_frames(clip: vs.VideoNode) -> vs.VideoNode:
+    """
+    Store the frame number of every frame in `SOURCE_FRAME_PROP`, before the clip is trimmed or spliced,
+    so filters that depend on the frame number give the same output on a part of the clip
+    """
+    def _number(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+        fout = f.copy()
+        fout.props[SOURCE_FRAME_PROP] = n
+        return fout
+    return core.std.ModifyFrame(clip, clip, _number)
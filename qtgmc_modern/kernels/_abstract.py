@@ -12,8 +12,6 @@ from typing import Any, Dict, Optional
 
 import vapoursynth as vs
 
-core = vs.core
-
 
 class Kernel(ABC):
     params: Dict[str, Any]
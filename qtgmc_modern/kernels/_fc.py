@@ -22,11 +22,10 @@ from typing import Any, ClassVar
 
 import vapoursynth as vs
 
+from ..graph import core
 from ._abstract import (AbstractBicubic, AbstractSpline, AbstractWindowed,
                         Kernel, ScaleIsCall)
 
-core = vs.core
-
 
 class _FmtConvKernel(str, Enum):
     POINT = 'point'
@@ -49,7 +48,7 @@ class _FmtConv(ScaleIsCall, Kernel, ABC):
     kernel: ClassVar[_FmtConvKernel]
 
     def __call__(self, clip: vs.VideoNode, *args: Any, **kwargs: Any) -> vs.VideoNode:
-        return clip.fmtc.resample(*args, kernel=self.kernel, **self.params | kwargs)
+        return core.fmtc.resample(clip, *args, kernel=self.kernel, **self.params | kwargs)
 
     def descale(self, clip: vs.VideoNode, width: int, height: int, **kwargs: Any) -> vs.VideoNode:
         return self.__call__(clip, width, height, invks=True, **kwargs)
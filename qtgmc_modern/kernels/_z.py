@@ -22,16 +22,16 @@ from typing import Any, Callable, ClassVar, NamedTuple
 import vapoursynth as vs
 from typing_extensions import Concatenate, ParamSpec
 
+from ..graph import core
 from ._abstract import AbstractBicubic, AbstractWindowed, Kernel, ScaleIsCall
 
-core = vs.core
-
 _P = ParamSpec('_P')
 _Scaler = Callable[Concatenate[vs.VideoNode, _P], vs.VideoNode]
 _Descaler = Callable[Concatenate[vs.VideoNode, int, int, _P], vs.VideoNode]
 
 
 class _Resizers(NamedTuple):
+    # Plugin functions of `qtgmc_modern.graph.core`, only resolved when called
     scaler: _Scaler
     descaler: _Descaler
 
@@ -1,23 +1,131 @@
+"""
+Process-wide settings logger.\n
+Settings changes are recorded as structured events in a bounded ring buffer and handed to the handlers
+by a background thread. Nothing is formatted or sent anywhere while logging is disabled.
+"""
+
 from __future__ import annotations
 
-from typing import Any, Sequence
+__all__ = [
+    'SettingsEvent', 'SettingsLogger',
+    'add_logger', 'logger'
+]
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, NamedTuple, Optional
+
+SettingsHandler = Callable[['SettingsEvent'], None]
+
+_log = logging.getLogger(__name__)
+
+
+class SettingsEvent(NamedTuple):
+    time: float
+    """`time.time()` of the change"""
+    section: str
+    """Settings class name, e.g. `SharpnessSettings`"""
+    key: str
+    value: Any
+
+    def __str__(self) -> str:
+        return f'QTGMC-Modern: "{self.section}.{self.key}" updated to "{self.value}"'
+
+
+def _print_event(event: SettingsEvent) -> None:
+    print(event)
+
+
+class SettingsLogger:
+    """
+    Only one instance is meant to exist, `qtgmc_modern.logger.logger`.
+
+    >>> logger.add_handler(my_handler)
+    >>> logger.enable()
+    """
+    enabled: bool
+    """Checked before anything else is done on a settings change. False by default"""
+    dropped: int
+    """Events discarded because the ring buffer was full"""
+    failed: int
+    """Handler calls that raised an exception"""
+    _events: Deque[SettingsEvent]
+    _handlers: List[SettingsHandler]
+    _lock: threading.Lock
+    _dispatch_lock: threading.RLock
+    _wakeup: threading.Event
+    _thread: Optional[threading.Thread]
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.enabled = False
+        self.dropped = 0
+        self.failed = 0
+        self._events = deque(maxlen=capacity)
+        self._handlers = []
+        self._lock = threading.Lock()
+        # Serialises the handler calls of the background thread and of the atexit flush
+        self._dispatch_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add_handler(self, handler: SettingsHandler) -> None:
+        """Add a handler, unless it is already registered"""
+        with self._lock:
+            if handler not in self._handlers:
+                self._handlers.append(handler)
+
+    def remove_handler(self, handler: SettingsHandler) -> None:
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+
+    def record(self, section: str, key: str, value: Any) -> None:
+        """Buffer a settings change. Callers check `enabled` first"""
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(SettingsEvent(time.time(), section, key, value))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='qtgmc-logger', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """Hand every buffered event to the handlers, in order. A handler raising doesn't stop the others"""
+        with self._dispatch_lock:
+            with self._lock:
+                events = list(self._events)
+                self._events.clear()
+                handlers = list(self._handlers)
+            for event in events:
+                for handler in handlers:
+                    try:
+                        handler(event)
+                    except Exception:
+                        self.failed += 1
+                        _log.exception('SettingsLogger: handler %r failed on %s', handler, event)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+
 
-from vapoursynth import MESSAGE_TYPE_INFORMATION, MessageType, core
+logger = SettingsLogger()
+atexit.register(logger.flush)
 
 
 def add_logger() -> None:
-    def _log(msgtype: MessageType, msg: str) -> None:
-        if msgtype == MESSAGE_TYPE_INFORMATION and msg.startswith('QTGMC-Modern'):
-            print(msg)
-    core.add_log_handler(_log)
-    # globals()['QTGMC-Modern_USE_LOGGER'] = True
-
-
-def log_update(root: str | Sequence[str], val: Any) -> None:
-    # if not globals()['QTGMC-Modern_USE_LOGGER']:
-    #     return
-    root = '.'.join(root) if isinstance(root, Sequence) else root
-    core.log_message(
-        MESSAGE_TYPE_INFORMATION,
-        f'QTGMC-Modern: "{root}" updated to "{str(val)}"'
-    )
+    """Enable the logger and print the settings changes. Calling it again doesn't add another handler"""
+    logger.add_handler(_print_event)
+    logger.enable()
@@ -0,0 +1,141 @@
+"""
+Memory budget of a `QTGMC` graph.\n
+The footprint of every node created by `QTGMC.process` is estimated from its frame size and the number
+of its frames the graph keeps alive at once, which depends on the temporal radius of its consumers
+and on the number of threads. The estimate sets the global and per-node frame caches.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'NodeFootprint', 'MemoryEstimate',
+    'frame_bytes', 'estimate_memory', 'apply_budget'
+]
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import vapoursynth as vs
+
+from .graph import core
+
+# VapourSynth aligns the rows of every plane
+_ALIGNMENT = 64
+# Frame props of an analysed frame, per block: vector x, vector y and SAD, each a 32-bit int
+_BLOCK_BYTES = 12
+_VECTOR_FILTERS = frozenset(['Analyse', 'Recalculate', 'Analyze'])
+
+
+def frame_bytes(clip: vs.VideoNode, aligned: bool = False) -> int:
+    """
+    Size in bytes of a frame of `clip`
+
+    :param aligned:     Count the row padding of the frames in memory, otherwise the packed size
+    """
+    fmt = clip.format
+    assert fmt
+    size = 0
+    for plane in range(fmt.num_planes):
+        width = clip.width >> fmt.subsampling_w if plane else clip.width
+        height = clip.height >> fmt.subsampling_h if plane else clip.height
+        row = width * fmt.bytes_per_sample
+        if aligned:
+            row = -(-row // _ALIGNMENT) * _ALIGNMENT
+        size += row * height
+    return size
+
+
+class NodeFootprint(NamedTuple):
+    stage: str
+    name: str
+    """Filter name, e.g. `Super`"""
+    frame_bytes: int
+    frames: int
+    """Frames of the node alive at once"""
+    node: vs.VideoNode
+
+    @property
+    def bytes(self) -> int:
+        return self.frame_bytes * self.frames
+
+
+class MemoryEstimate(NamedTuple):
+    nodes: List[NodeFootprint]
+    threads: int
+
+    @property
+    def bytes(self) -> int:
+        """Working set of the graph"""
+        return sum(node.bytes for node in self.nodes)
+
+    @property
+    def mb(self) -> int:
+        return -(-self.bytes // (1 << 20))
+
+    def per_stage(self) -> Dict[str, int]:
+        stages: Dict[str, int] = {}
+        for node in self.nodes:
+            stages[node.stage] = stages.get(node.stage, 0) + node.bytes
+        return stages
+
+    def __str__(self) -> str:
+        lines = [f'{"Stage":<24}{"MB":>10}']
+        for stage, size in sorted(self.per_stage().items(), key=lambda kv: -kv[1]):
+            lines.append(f'{stage:<24}{size / (1 << 20):>10.1f}')
+        lines.append(f'Working set with {self.threads} threads: {self.mb} MB')
+        return '\n'.join(lines)
+
+
+def _node_bytes(node: vs.VideoNode, name: str, blocksize: int, overlap: int) -> int:
+    if name in _VECTOR_FILTERS:
+        # Vectors are frame props, sized by the block grid of every level, a third more than the finest one
+        step = max(blocksize - overlap, 1)
+        blocks = -(-node.width // step) * -(-node.height // step)
+        return blocks * _BLOCK_BYTES * 4 // 3
+    return frame_bytes(node, aligned=True)
+
+
+def estimate_memory(nodes: Dict[str, Sequence[vs.VideoNode]], radii: Dict[str, int],
+                    blocksize: int, overlap: int, threads: Optional[int] = None) -> MemoryEstimate:
+    """
+    Working set of the tagged nodes of a graph
+
+    :param nodes:       Nodes created by each stage, see `StageProfiler.nodes`
+    :param radii:       Temporal radius each stage reads its inputs with
+    :param blocksize:   Block size of the motion vectors
+    :param overlap:     Block overlap of the motion vectors
+    :param threads:     Frames rendered concurrently. Defaults to the number of threads of the core
+    """
+    threads = threads or core.num_threads
+    footprints: List[NodeFootprint] = []
+    for stage, stage_nodes in nodes.items():
+        # Every thread works on its own output frame, and neighbouring threads share most of their window
+        frames = 2 * radii.get(stage, 0) + threads
+        for node in stage_nodes:
+            if node.format is None:
+                continue
+            name = getattr(node, '_name', '') or type(node).__name__
+            footprints.append(NodeFootprint(
+                stage, name, _node_bytes(node, name, blocksize, overlap), min(frames, node.num_frames), node
+            ))
+    return MemoryEstimate(footprints, threads)
+
+
+def apply_budget(estimate: MemoryEstimate, budget_mb: int) -> None:
+    """
+    Set the global frame cache to `budget_mb` and every node cache to its temporal window,
+    scaled up to share whatever the working set leaves of the budget.
+
+    :raises ValueError:     If the working set alone doesn't fit
+    """
+    if estimate.mb > budget_mb:
+        raise ValueError(
+            f'QTGMC: memory budget of {budget_mb} MB is too small, '
+            f'the graph needs about {estimate.mb} MB\n{estimate}'
+        )
+    vs.core.max_cache_size = budget_mb
+
+    scale = max(budget_mb // max(estimate.mb, 1), 1)
+    for fp in estimate.nodes:
+        # Requires VapourSynth R58 or later
+        if hasattr(fp.node, 'set_cache_options'):
+            fp.node.set_cache_options(max_size=fp.frames * scale)
@@ -2,21 +2,34 @@
 from __future__ import annotations
 import math
 
-from typing import Any, Callable, NamedTuple, Optional, Tuple, TypedDict
+from contextlib import nullcontext
+from typing import (Any, Callable, ContextManager, Dict, FrozenSet, Iterable,
+                    Iterator, List, NamedTuple, Optional, Set, Tuple, TypedDict)
 
 import vapoursynth as vs
 
-from .better_vsutil import get_depth, get_neutral, get_peak, get_y, scale_value_full
-from .filters import (Deinterlacer, Denoiser, NoiseDeint, deintd2class,
-                      dend2class, noisedeintd2class)
+from .analysis import FrameAnalysis
+from .better_vsutil import (get_depth, get_neutral, get_sample_type, get_y,
+                            scale_value_full)
+from .expr import ExprClip, expr, make_diff, merge, merge_diff
+from .filters import (FFT3D, AutoDenoiser, AutoDFTTest, AutoFFT3D, Bob,
+                      Deinterlacer, Denoiser, DFTTest, KNLMeansCL,
+                      KNLMeansCLChannel, NeoDFTTest, NeoFFT3D, NoiseDeint,
+                      SuperFactory, SuperStats, ThreadSplit, VectorCache,
+                      deintd2class, dend2class,
+                      mv_analyse, mv_compensate, mv_degrain1, mv_degrain2,
+                      mv_degrain3, mv_flowblur, mv_mask, mv_recalculate,
+                      mv_super, noisedeintd2class)
+from .frames import FrameArrays, iter_arrays
+from .graph import StageProfiler, core
 from .helper import clamp_value, merge_chroma
+from .kernels import Gauss
 from .logger import add_logger
+from .memory import MemoryEstimate, apply_budget, estimate_memory
 from .settings import (CoreParam, InputType, NoisePreset, NoiseSettings,
                        Preset, Settings, load_preset)
 from .types import SettingsView
 
-core = vs.core
-
 
 class _ExtraSharpnessSettings(NamedTuple):
     spatial_l: bool
@@ -29,12 +42,37 @@ class _ExtraSettings(TypedDict, total=False):
     sharp: _ExtraSharpnessSettings
 
 
+class _StageRequirements(NamedTuple):
+    deltas: FrozenSet[int] = frozenset()
+    """Motion vector deltas"""
+    supers: FrozenSet[str] = frozenset()
+    """Super clips created"""
+    clips: FrozenSet[str] = frozenset()
+    """Intermediate clips"""
+
+
+class _Nodes(TypedDict, total=False):
+    clip: vs.VideoNode
+    srch: vs.VideoNode
+    srch_super: vs.VideoNode
+    inner: vs.VideoNode
+    final_noise: vs.VideoNode
+    edi_input: vs.VideoNode
+    edi: vs.VideoNode
+    edi_super: vs.VideoNode
+    tmax: vs.VideoNode
+    tmin: vs.VideoNode
+    lossed1: vs.VideoNode
+    output: vs.VideoNode
+
+
 class QTGMC:
     _pclip: vs.VideoNode
     _tff: bool
     _input_type: InputType
     _preset: Preset
     _settings: Settings
+    _snapshot: Optional[SettingsView]
     _extra_settings: _ExtraSettings
 
     log_info: bool
@@ -45,6 +83,25 @@ class QTGMC:
     denoiser: Optional[Denoiser]
     noise_deint: Optional[NoiseDeint]
 
+    vector_cache: Optional[VectorCache]
+    analysis: Optional[FrameAnalysis]
+    super_stats: Optional[SuperStats]
+    profiler: Optional[StageProfiler]
+    memory_budget: Optional[int]
+    thread_budget: Optional[int]
+    """Threads shared by the core and the internal threads of an auto denoiser. Defaults to the number of CPUs"""
+    thread_split: Optional[ThreadSplit]
+    """
+    Split of `thread_budget` picked by an auto denoiser during the last `process`, None otherwise.
+    Never applied by `QTGMC` itself: the chunked and tiled renderers and the frame server, which own their core,
+    set `core.num_threads` to `thread_split.core_threads`.
+    """
+
+    _reqs: Dict[str, _StageRequirements]
+    _nodes: _Nodes
+    _vectors: Dict[int, Tuple[vs.VideoNode, vs.VideoNode]]
+    _tags: Optional[StageProfiler]
+
     def __init__(self, clip: vs.VideoNode, preset: Preset = Preset.SLOWER, tff: bool = True,
                  input_type: InputType = InputType.INTERLACED_ONLY, log_info: bool = True) -> None:
         self._pclip = clip
@@ -52,6 +109,7 @@ class QTGMC:
         self._input_type = input_type
         self._preset = preset
         self._settings = load_preset(preset)
+        self._snapshot = None
         self._extra_settings = _ExtraSettings()
 
         self.deint = None
@@ -59,47 +117,68 @@ class QTGMC:
         self.ref_deint = None
         self.denoiser = None
         self.noise_deint = None
+        self.vector_cache = None
+        self.analysis = None
+        self.super_stats = None
+        self.profiler = None
+        self.memory_budget = None
+        self.thread_budget = None
+        self._tags = None
+        self.thread_split = None
 
         self.log_info = log_info
         if log_info:
             add_logger()
 
+    @property
+    def settings(self) -> SettingsView:
+        """
+        Frozen snapshot of the settings, built once and shared until a setter is called.
+        Its fingerprint identifies the settings in vector, intermediate clip and graph caches.
+        """
+        if self._snapshot is None:
+            self._snapshot = SettingsView(self._settings)
+        return self._snapshot
+
     @property
     def core(self) -> SettingsView:
-        return SettingsView(self._settings['core'])
+        return self.settings['core']
 
     @property
     def interpolation(self) -> SettingsView:
-        return SettingsView(self._settings['interpolation'])
+        return self.settings['interpolation']
 
     @property
     def motion_analysis(self) -> SettingsView:
-        return SettingsView(self._settings['motion_analysis'])
+        return self.settings['motion_analysis']
 
     @property
     def sharpness(self) -> SettingsView:
-        return SettingsView(self._settings['sharpness'])
+        return self.settings['sharpness']
 
     @property
     def source_match(self) -> SettingsView:
-        return SettingsView(self._settings['source_match'])
+        return self.settings['source_match']
 
     @property
     def noise(self) -> Optional[SettingsView]:
-        if (noise := self._settings['noise']) is None:
-            return None
-        return SettingsView(noise)
+        return self.settings['noise']
 
     @property
     def motion_blur(self) -> SettingsView:
-        return SettingsView(self._settings['motion_blur'])
+        return self.settings['motion_blur']
 
     @property
     def clip(self) -> vs.VideoNode:
         return self._pclip
 
+    @property
+    def input_type(self) -> InputType:
+        return self._input_type
+
     def set_core(self, motion_search: Optional[CoreParam] = None, initial_output: Optional[CoreParam] = None,
                  final_output: Optional[CoreParam] = None) -> None:
+        self._snapshot = None
         root = 'core'
         qtgmc_core = self._settings[root]
         if motion_search is not None:
@@ -123,6 +202,7 @@ class QTGMC:
 
     def set_interpolation(self, deint: Optional[Deinterlacer] = None, deint_chroma: Optional[Deinterlacer] = None,
                           ref: Optional[vs.VideoNode] = None) -> None:
+        self._snapshot = None
         root = 'interpolation'
         inter = self._settings[root]
         if deint is not None:
@@ -136,6 +216,7 @@ class QTGMC:
             self.ref_deint = ref
 
     def set_motion_analysis(self, **kwargs: Any) -> None:
+        self._snapshot = None
         ma = self._settings['motion_analysis']
         ma.update(kwargs)  # type: ignore
 
@@ -169,12 +250,14 @@ class QTGMC:
         ma['plevel'] = clamp_value(ma['plevel'], 0, 2)
         ma['dct'] = clamp_value(ma['dct'], 0, 10)
         ma['prog_sad_mask'] = clamp_value(ma['prog_sad_mask'], 0., None)
+        ma['precision'] = clamp_value(ma['precision'], 8, 16) if ma['precision'] > 0 else 0
 
         # Default values
         if self._input_type < 2:
             ma['prog_sad_mask'] = 0.0
 
     def set_sharpness(self, **kwargs: Any) -> None:
+        self._snapshot = None
         sharp = self._settings['sharpness']
         sharp.update(kwargs)  # type: ignore
 
@@ -198,7 +281,7 @@ class QTGMC:
         temporal_l = sharp['lmode'] in {2, 4}
         mul = 2 if temporal_l else 1.5 if spatial_l else 1
 
-        ovs = scale_value_full(sharp['ovs'], 8, get_peak(self._pclip))
+        ovs = scale_value_full(sharp['ovs'], 8, get_depth(self._pclip))
 
         strength_adj = (
             sharp['strength'] * (
@@ -214,6 +297,7 @@ class QTGMC:
     def set_source_match(self, match: Optional[int] = None, lossless: Optional[int] = None,
                          basic_deint: Optional[Deinterlacer] = None, refined_deint: Optional[Deinterlacer] = None,
                          refined_tr: Optional[int] = None, enhance: Optional[float] = None) -> None:
+        self._snapshot = None
         root = 'source_match'
         sm = self._settings[root]
         if match is not None:
@@ -236,11 +320,12 @@ class QTGMC:
         sm['enhance'] = clamp_value(sm['enhance'], 0., None)
 
     def set_noise(self, ezdenoise: float = 0.0, ezkeepgrain: float = 0.0,
-                  preset: NoisePreset = NoisePreset.FAST, mode: Optional[int] = None, denoiser: Optional[Denoiser] = None,
+                  preset: Optional[NoisePreset] = None, mode: Optional[int] = None, denoiser: Optional[Denoiser] = None,
                   use_mc: Optional[bool] = None, tr: Optional[int] = None, strength: Optional[float] = None,
                   chroma: Optional[bool] = None, restore_before_final: Optional[float] = None,
                   restore_after_final: Optional[float] = None, deint: Optional[NoiseDeint] = None,
                   stabilise: Optional[bool] = None) -> None:
+        self._snapshot = None
         noise = self._settings['noise']
         if not noise:
             noise = NoiseSettings(
@@ -249,6 +334,7 @@ class QTGMC:
                 restore_after_final=0.1 if self._preset.i <= 1 else 0.,
                 **NoisePreset.FAST
             )
+            self._settings['noise'] = noise
             self.denoiser = None
             self.noise_deint = None
         if preset is not None:
@@ -304,16 +390,12 @@ class QTGMC:
         total_restore = noise['restore_before_final'] + noise['restore_after_final']
         if total_restore == 0:
             noise['stabilise'] = False
-        noise_td = [1, 3, 5][noise['tr']]
-        if noise['denoiser']['name'] in {'fft3d', 'neofft3d', 'FFT3D', 'NeoFFT3D'}:
-            noise_centre = scale_value_full(128.5, 8, get_depth(self._pclip))
-        else:
-            noise_centre = get_neutral(self._pclip)
         # add show noise things
 
     def set_motion_blur(self, fps_divisor: Optional[int] = None, shutter_blur: Optional[int] = None,
                         shutter_angle_src: Optional[int] = None, shutter_angle_out: Optional[int] = None,
                         blur_limit: Optional[int] = None) -> None:
+        self._snapshot = None
         mb = self._settings['motion_blur']
         if fps_divisor is not None:
             mb['fps_divisor'] = fps_divisor
@@ -337,35 +419,785 @@ class QTGMC:
         if mb['shutter_angle_out'] * mb['fps_divisor'] == mb['shutter_angle_src']:
             mb['shutter_blur'] = 0
 
+    def set_vector_cache(self, directory: str, source_id: str) -> None:
+        """
+        Store the analysed motion vectors on disk and reuse them on later renders of the same source.
+        Only `motion_analysis` and `core.motion_search` settings invalidate the cache,
+        so sharpness, noise or source-match settings can be tweaked freely.
+        Call `vector_cache.close()` once the renders are done. The chunked and tiled renderers close it themselves.
+
+        :param directory:   Folder where the vector files are stored
+        :param source_id:   Identifier of the source clip, typically its file path
+        """
+        self.vector_cache = VectorCache(directory, source_id)
+
+    def set_analysis(self, analysis: FrameAnalysis) -> None:
+        """
+        Use a pre-analysis sidecar instead of detecting scene changes in the temporal stages.
+
+        :param analysis:    Analysis of the source clip, see `qtgmc_modern.analysis`.
+                            `ChunkedRenderer` trims the analysis of the full source to each chunk.
+        """
+        self.analysis = analysis
+
+    def set_profiling(self, enabled: bool = True) -> Optional[StageProfiler]:
+        """
+        Tag the nodes created by each stage of `process` so a render can be broken down per stage.
+        Disabled by default, in which case nothing is recorded.
+
+        >>> profiler = qtgmc.set_profiling()
+        >>> profiler.render(qtgmc.process())
+        >>> print(profiler)
+
+        :param enabled:     Enable or disable the profiling
+        :return:            The profiler, or None if disabled
+        """
+        self.profiler = StageProfiler() if enabled else None
+        return self.profiler
+
+    def set_memory_budget(self, budget: Optional[int]) -> None:
+        """
+        Fit the working set of the graph in a memory budget.
+        `process` estimates the footprint of every node it creates, raises if the budget is too small,
+        then sets `core.max_cache_size` to the budget and the cache of every node to its temporal window,
+        scaled up with whatever the budget leaves.
+
+        :param budget:      Budget in MB, or None to leave the VapourSynth caches alone
+        """
+        self.memory_budget = budget
+
+    def estimate_memory(self, threads: Optional[int] = None) -> MemoryEstimate:
+        """
+        Build the graph and estimate its working set without rendering anything
+
+        :param threads:     Frames rendered concurrently. Defaults to the number of threads of the core
+        """
+        tags = StageProfiler()
+        self._build(tags)
+        return self._estimate_memory(tags, threads)
 
     def max_tr(self) -> int:
-        ...
-
-    def process(self) -> None:
+        """Maximum temporal radius of the motion vectors actually consumed by the current settings"""
+        return max((delta for req in self._stage_requirements().values() for delta in req.deltas), default=0)
+
+    def temporal_reach(self) -> int:
+        """
+        Number of neighbouring frames on each side an output frame depends on,
+        counted in processed frames (double-rate for interlaced input, before `fps_divisor`).
+        Derived from the stage requirements and their temporal depths, rounded up where field
+        separation and reweaving shift frames around.
+        """
+        sttg = self._settings
+        reqs = self._stage_requirements()
+        max_tr = self.max_tr()
+        tr0 = sttg['core']['motion_search']['tr']
+        tr1 = sttg['core']['initial_output']['tr']
+        tr2 = sttg['core']['final_output']['tr']
+        sharp = sttg['sharpness']
+        sm = sttg['source_match']
+        noise = sttg['noise']
+        # Fields of an interlaced clip are reweaved into half-rate frames, then interpolated back
+        field_shift = 1 if self._input_type == InputType.INTERLACED_ONLY else 0
+
+        # SCDetect compares with the previous and the next frames
+        search = tr0 + 1 if tr0 > 0 else 0
+        vectors = search + max_tr if max_tr > 0 else 0
+
+        inner = final_noise = 0
+        if noise is not None and noise['mode'] > 0:
+            noise_req = reqs['_noise_processing']
+            denoised = max(vectors, noise['tr']) if 'full' in noise_req.supers else noise['tr']
+            denoised += 2 * field_shift
+            final_noise = max(denoised + 1, vectors) if 'noise' in noise_req.supers else denoised
+            if noise['mode'] == 1:
+                inner = denoised
+
+        edi = inner
+        tlimit = max(edi + (3 if sharp['lrad'] > 1 else 1), vectors) if sharp['lmode'] in {2, 4} else 0
+        basic = max(edi + tr1, vectors) if tr1 > 0 else edi
+        if sm['match'] > 0:
+            basic = max(max(basic + field_shift, inner) + tr1, vectors)
+        if sm['match'] > 1:
+            basic = max(basic + field_shift + sm['refined_tr'], vectors)
+        if sm['match'] > 2:
+            basic = max(basic + sm['refined_tr'], vectors)
+        if sm['lossless'] >= 2:
+            basic += 1
+
+        stable = max(basic, tlimit, final_noise)
+        if tr2 > 0:
+            stable = max(stable + tr2, vectors)
+        if sm['lossless'] == 1:
+            stable += 1
+        if sttg['motion_blur']['shutter_blur'] > 0:
+            stable = max(stable + 1, vectors)
+        return stable
+
+    def process(self) -> vs.VideoNode:
+        tags = self.profiler
+        if tags is None and self.memory_budget is not None:
+            tags = StageProfiler()
+        output = self._build(tags)
+        if self.memory_budget is not None:
+            assert tags
+            apply_budget(self._estimate_memory(tags), self.memory_budget)
+        return output
+
+    def _build(self, tags: Optional[StageProfiler]) -> vs.VideoNode:
+        self._tags = tags
+        self.thread_split = None
+        self._reqs = self._stage_requirements()
+        self._nodes = _Nodes()
+        self._vectors = {}
+        supers = SuperFactory()
+
+        try:
+            # Super clips are shared within this build only
+            with supers:
+                with self._stage('pre_processing'):
+                    self._pre_processing()
+                with self._stage('motion_analysis'):
+                    self._processing()
+                with self._stage('noise_processing'):
+                    self._noise_processing()
+                with self._stage('interpolation_processing'):
+                    self._interpolation_processing()
+                with self._stage('basic_output_processing'):
+                    self._basic_output_processing()
+                with self._stage('restore_processing'):
+                    self._restore_processing()
+                with self._stage('post_processing'):
+                    self._post_processing()
+                return self._nodes['output']
+        finally:
+            self.super_stats = supers.stats
+            self._nodes = _Nodes()
+            self._vectors = {}
+            self._tags = None
+
+    def arrays(self, frames: Optional[Iterable[int]] = None, window: Optional[int] = None) -> Iterator[FrameArrays]:
+        """
+        Output frames as read-only NumPy views of each plane, without copies. Requires numpy.
+
+        >>> for n, frame, planes in qtgmc.arrays(window=8):
+        ...     metrics.append(score(planes[0]))
+
+        :param frames:      Output frame numbers. Defaults to the whole output
+        :param window:      Frames rendered ahead of the consumer. Defaults to the number of threads of the core
+        """
+        return iter_arrays(self.process(), frames, window)
+
+    def _stage(self, name: str) -> ContextManager[None]:
+        if self._tags is None:
+            return nullcontext()
+        return self._tags.stage(name)
+
+    def _estimate_memory(self, tags: StageProfiler, threads: Optional[int] = None) -> MemoryEstimate:
+        ma = self._settings['motion_analysis']
+        radii = {name.lstrip('_'): max(req.deltas, default=0) for name, req in self._stage_requirements().items()}
+        # Scene change detection reads one frame past the farthest vector
+        radii['motion_analysis'] = self.max_tr() + 1
+        return estimate_memory(tags.nodes, radii, ma['blocksize'], ma['overlap'], threads)
+
+    def _stage_requirements(self) -> Dict[str, _StageRequirements]:
+        """
+        Declare the vector deltas, Super clips and intermediate clips each stage consumes.
+        Only these are created by `process`, so a delta nobody asks for never gets analysed.
+        """
         sttg = self._settings
-        ...
+        tr1 = sttg['core']['initial_output']['tr']
+        tr2 = sttg['core']['final_output']['tr']
+        ma = sttg['motion_analysis']
+        sharp = sttg['sharpness']
+        sm = sttg['source_match']
+        mb = sttg['motion_blur']
+        noise = sttg['noise']
+
+        temporal_sl = sharp['lmode'] in {2, 4}
+        restore = noise['restore_before_final'] + noise['restore_after_final'] if noise else 0
+
+        # Noise
+        deltas: Set[int] = set()
+        supers: Set[str] = set()
+        if noise and noise['mode'] > 0:
+            if noise['use_mc'] and noise['tr'] > 0:
+                deltas.update(range(1, noise['tr'] + 1))
+                supers.add('full')
+            if noise['stabilise'] and restore > 0:
+                deltas.add(1)
+                supers.add('noise')
+        noise_req = _StageRequirements(frozenset(deltas), frozenset(supers))
+
+        # Interpolation
+        deltas, supers, clips = set(), set(), set()
+        if temporal_sl:
+            deltas.update([1, 3] if sharp['lrad'] > 1 else [1])
+        if self._input_type >= 2 and ma['prog_sad_mask'] > 0:
+            deltas.add(1)
+            clips.add('srch')
+        if tr1 > 0 or temporal_sl:
+            supers.add('edi')
+        inter_req = _StageRequirements(frozenset(deltas), frozenset(supers), frozenset(clips))
+
+        # Basic output
+        deltas, supers = set(range(1, tr1 + 1)), set()
+        if tr1 > 0:
+            supers.add('edi')
+        if sm['match'] > 0 and tr1 > 0:
+            supers.add('match1')
+        if sm['match'] > 1 and sm['refined_tr'] > 0:
+            deltas.update(range(1, sm['refined_tr'] + 1))
+            supers.update(['match2', 'match3'] if sm['match'] > 2 else ['match2'])
+        basic_req = _StageRequirements(frozenset(deltas), frozenset(supers))
+
+        # Restore
+        clips = set()
+        if restore > 0:
+            clips.add('final_noise')
+        if temporal_sl:
+            clips.update(['tmax', 'tmin'])
+        restore_req = _StageRequirements(
+            frozenset(range(1, tr2 + 1)), frozenset(['stable'] if tr2 > 0 else []), frozenset(clips)
+        )
+
+        # Post-processing
+        deltas, supers, clips = set(), set(), set()
+        if mb['shutter_blur'] > 0:
+            deltas.add(1)
+            supers.add('sblur')
+            if mb['shutter_blur'] > 1:
+                supers.add('srch')
+            if mb['blur_limit'] > 0:
+                clips.add('srch')
+        post_req = _StageRequirements(frozenset(deltas), frozenset(supers), frozenset(clips))
+
+        return {
+            '_noise_processing': noise_req,
+            '_interpolation_processing': inter_req,
+            '_basic_output_processing': basic_req,
+            '_restore_processing': restore_req,
+            '_post_processing': post_req,
+        }
+
+    @property
+    def _needed(self) -> _StageRequirements:
+        return _StageRequirements(
+            frozenset().union(*(req.deltas for req in self._reqs.values())),
+            frozenset().union(*(req.supers for req in self._reqs.values())),
+            frozenset().union(*(req.clips for req in self._reqs.values())),
+        )
+
+    @property
+    def _process_tff(self) -> bool:
+        # Reverse "field" dominance for progressive repair mode 3
+        return not self._tff if self._input_type >= 3 else self._tff
+
+    def _super_args(self, **kwargs: Any) -> Dict[str, Any]:
+        ma = self._settings['motion_analysis']
+        return dict(pel=ma['subpel'], sharp=ma['subpel_inter'], hpad=ma['blocksize'], vpad=ma['blocksize']) | kwargs
+
+    def _scd_args(self) -> Dict[str, Any]:
+        ma = self._settings['motion_analysis']
+        return dict(thscd1=ma['thscd1'], thscd2=ma['thscd2'])
+
+    def _analyse(self, super_clip: vs.VideoNode, isb: bool, delta: int) -> vs.VideoNode:
+        ma = self._settings['motion_analysis']
+        analyse_args = dict(
+            blksize=ma['blocksize'], overlap=ma['overlap'], search=ma['search'], searchparam=ma['search_param'],
+            pelsearch=ma['pelsearch'], truemotion=ma['truemotion'], lambda_=ma['lambda_'], lsad=ma['lsad'],
+            pnew=ma['pnew'], plevel=ma['plevel'], global_=ma['globalmotion'], dct=ma['dct'], chroma=ma['chroma_motion']
+        )
+        if self.vector_cache is not None:
+            return self.vector_cache.analyse(
+                super_clip, self._pclip, self._process_tff, self._input_type,
+                self.motion_analysis, self.core['motion_search'],
+                isb=isb, delta=delta, **analyse_args
+            )
+        return mv_analyse(super_clip, isb=isb, delta=delta, **analyse_args)
+
+    def _search(self, srch_super: vs.VideoNode, search_super: vs.VideoNode, isb: bool, delta: int) -> vs.VideoNode:
+        vectors = self._analyse(search_super, isb, delta)
+        if search_super is srch_super:
+            return vectors
+        # Same block layout and a minimal search, so the SADs match the depth of the compensated clips
+        ma = self._settings['motion_analysis']
+        return mv_recalculate(
+            srch_super, vectors=vectors, blksize=ma['blocksize'], overlap=ma['overlap'],
+            search=3, searchparam=1, truemotion=ma['truemotion'], lambda_=ma['lambda_'], pnew=ma['pnew'],
+            dct=ma['dct'], chroma=ma['chroma_motion']
+        )
+
+    def _binomial_smooth(self, clip: vs.VideoNode, super_clip: Optional[vs.VideoNode], tr: int,
+                         thsad: int) -> vs.VideoNode:
+        # Combine linear weightings to give binomial weightings - TR=0: (1), TR=1: (1:2:1), TR=2: (1:4:6:4:1)
+        if tr <= 0 or super_clip is None:
+            return clip
+        bvec1, fvec1 = self._vectors[1]
+        degrain1 = mv_degrain1(clip, super=super_clip, mvbw=bvec1, mvfw=fvec1, thsad=thsad, **self._scd_args())
+        if tr == 1:
+            return merge(degrain1, clip, 0.25).node()
+        bvec2, fvec2 = self._vectors[2]
+        degrain2 = mv_degrain1(clip, super=super_clip, mvbw=bvec2, mvfw=fvec2, thsad=thsad, **self._scd_args())
+        return merge(merge(degrain1, degrain2, 0.2), clip, 0.0625).node()
 
     def _pre_processing(self) -> None:
-        ...
+        ma = self._settings['motion_analysis']
+        if any(ma[k] is None for k in ('lambda_', 'lsad', 'pnew', 'plevel')):
+            self.set_motion_analysis()
+        if 'sharp' not in self._extra_settings:
+            self.set_sharpness()
+
+        self._nodes['clip'] = self._pclip
 
     def _processing(self) -> None:
-        ...
+        needed = self._needed
+        if not needed.deltas and 'srch' not in needed.supers | needed.clips:
+            return
+
+        clip = self._nodes['clip']
+        tff = self._process_tff
+        ma = self._settings['motion_analysis']
+        search = self._settings['core']['motion_search']
+        chroma = ma['chroma_motion']
+        planes = [0, 1, 2] if chroma and not _is_gray(clip) else [0]
+        weights: Callable[[float], List[float]] = lambda w: [w] if chroma or _is_gray(clip) else [w, 0]
+
+        # Bob the input as a starting point for motion search clip
+        if self._input_type == InputType.INTERLACED_ONLY:
+            bobbed = Bob(0, 0.5)(clip, 3 if tff else 2)
+        elif self._input_type == InputType.PROGRESSIVE_GENERIC:
+            bobbed = clip
+        else:
+            bobbed = core.std.Convolution(clip, [1, 2, 1], mode='v')
+
+        # Temporally smooth over the neighboring frames using a binomial kernel to average away the bob shimmer
+        if search['tr'] > 0:
+            # Scene changes are detected once for both averages or read from the pre-analysis
+            if self.analysis is not None:
+                scenes = self.analysis.apply(bobbed, 2 if self._input_type == InputType.INTERLACED_ONLY else 1)
+            else:
+                scenes = core.misc.SCDetect(bobbed, 28 / 255)
+            ts1 = core.std.AverageFrames(scenes, [1] * 3, scenechange=True, planes=planes)
+        if search['tr'] <= 0:
+            binomial0 = bobbed
+        elif search['tr'] == 1:
+            binomial0 = merge(ts1, bobbed, weights(0.25)).node()
+        else:
+            ts2 = core.std.AverageFrames(scenes, [1] * 5, scenechange=True, planes=planes)
+            binomial0 = merge(merge(ts1, ts2, weights(0.357)), bobbed, weights(0.125)).node()
+
+        # Remove areas of difference between temporal blurred motion search clip and bob that are not due to bob-shimmer
+        if search['rep'] <= 0:
+            repair0 = binomial0
+        else:
+            repair0 = bob_shimmer_fix(binomial0, bobbed, search['rep'], chroma)
+
+        # Blur image and soften edges to assist in motion matching of edge blocks
+        kernel = [1, 2, 1, 2, 4, 2, 1, 2, 1]
+        if ma['searchpre'] == 1:
+            spatial_blur = core.resize.Bilinear(
+                core.std.Convolution(core.resize.Bilinear(repair0, clip.width // 2, clip.height // 2), kernel, planes=planes),
+                clip.width, clip.height
+            )
+        elif ma['searchpre'] >= 2:
+            spatial_blur = gauss_blur(core.std.Convolution(repair0, kernel, planes=planes), 2)
+            spatial_blur = merge(spatial_blur, repair0, weights(0.1)).node()
+
+        if ma['searchpre'] <= 0:
+            srch = repair0
+        elif ma['searchpre'] < 3:
+            srch = spatial_blur
+        else:
+            def _scale(x: int) -> int | float:
+                return scale_value_full(x, 8, get_depth(clip))
+            tweaked = expr(
+                [repair0, bobbed],
+                _planes_exprs(clip, f'x {_scale(3)} + y < x {_scale(3)} + x {_scale(3)} - y > x {_scale(3)} - y ? ?', chroma)
+            )
+            srch = expr(
+                [spatial_blur, tweaked],
+                _planes_exprs(
+                    clip,
+                    f'x {_scale(7)} + y < x {_scale(2)} + x {_scale(7)} - y > x {_scale(2)} - x 51 * y 49 * + 100 / ? ?',
+                    chroma
+                )
+            ).node()
+        self._nodes['srch'] = srch
+
+        # Calculate forward and backward motion vectors from motion search clip
+        rebuilt = luma_rebuild(srch, s0=1, chroma=chroma)
+        srch_super = mv_super(rebuilt, **self._super_args(chroma=chroma))
+        self._nodes['srch_super'] = srch_super
+
+        # Vectors are searched at reduced depth and rescored at full depth
+        bits = ma['precision']
+        if 0 < bits < get_depth(clip) and get_sample_type(clip) == vs.INTEGER:
+            assert rebuilt.format
+            reduced = core.resize.Point(rebuilt, format=rebuilt.format.replace(bits_per_sample=bits), dither_type='none')
+            search_super = mv_super(reduced, **self._super_args(chroma=chroma))
+        else:
+            search_super = srch_super
+        for delta in sorted(needed.deltas):
+            self._vectors[delta] = (
+                self._search(srch_super, search_super, True, delta),
+                self._search(srch_super, search_super, False, delta)
+            )
 
     def _noise_processing(self) -> None:
-        ...
+        clip = self._nodes['clip']
+        self._nodes['inner'] = clip
+
+        noise = self._settings['noise']
+        if noise is None or noise['mode'] <= 0:
+            return
+
+        req = self._reqs['_noise_processing']
+        tff = self._process_tff
+        ma = self._settings['motion_analysis']
+        planes = [0, 1, 2] if noise['chroma'] and not _is_gray(clip) else [0]
+        tr = noise['tr']
+        noise_td = [1, 3, 5][tr]
+
+        # Expand fields to full frame size before extracting noise (allows use of motion vectors which are frame-sized)
+        full = clip if self._input_type > 0 else Bob(0, 1)(clip, 3 if tff else 2)
+
+        # Create a motion compensated temporal window around current frame and use to guide denoisers
+        if 'full' in req.supers:
+            full_super = mv_super(
+                full, pel=ma['subpel'], levels=1, hpad=ma['blocksize'], vpad=ma['blocksize'], chroma=noise['chroma']
+            )
+            bcomps = [
+                mv_compensate(full, super=full_super, vectors=self._vectors[d][0], **self._scd_args())
+                for d in range(1, tr + 1)
+            ]
+            fcomps = [
+                mv_compensate(full, super=full_super, vectors=self._vectors[d][1], **self._scd_args())
+                for d in range(tr, 0, -1)
+            ]
+            window = core.std.Interleave(fcomps + [full] + bcomps)
+        else:
+            window = full
+
+        denoiser = self.denoiser or dend2class(noise['denoiser'])
+        if isinstance(denoiser, AutoDenoiser):
+            # Benchmarked with the arguments it runs with
+            kwargs = denoise_args(denoiser, noise['strength'], tr, planes)
+            denoiser, self.thread_split = denoiser.resolve(window, self.thread_budget, **kwargs)
+        dn_window = denoise(denoiser, window, noise['strength'], tr, planes)
+
+        # Rework denoised clip to match source format - discard the motion compensation window and doubled lines,
+        # reweave to get interlaced noise if source was interlaced
+        if 'full' not in req.supers:
+            if self._input_type > 0:
+                denoised = dn_window
+            else:
+                denoised = single_weave(core.std.SelectEvery(core.std.SeparateFields(dn_window, tff), 4, [0, 3]), tff)
+        elif self._input_type > 0:
+            denoised = core.std.SelectEvery(dn_window, noise_td, tr)
+        else:
+            denoised = single_weave(
+                core.std.SelectEvery(core.std.SeparateFields(dn_window, tff), noise_td * 4, [tr * 2, tr * 6 + 3]), tff
+            )
+
+        # Get actual noise from difference. Then 'deinterlace' where we have weaved noise
+        if 'final_noise' in self._needed.clips:
+            diff = make_diff(clip, denoised, planes).node()
+            if self._input_type > 0:
+                deint_noise = diff
+            else:
+                noise_deint = self.noise_deint or noisedeintd2class(noise['deint'])
+                deint_noise = noise_deint(diff, tff, interleaved_clip=denoised, chroma=noise['chroma'])
+
+            # Motion-compensated stabilization of generated noise
+            if 'noise' in req.supers:
+                noise_super = mv_super(deint_noise, **self._super_args(levels=1, chroma=noise['chroma']))
+                mc_noise = mv_compensate(deint_noise, super=noise_super, vectors=self._vectors[1][0], **self._scd_args())
+                neutral = get_neutral(clip)
+                final_noise = expr(
+                    [deint_noise, mc_noise],
+                    _planes_exprs(clip, f'x {neutral} - abs y {neutral} - abs > x y ? 0.6 * x y + 0.2 * +', noise['chroma'])
+                ).node()
+            else:
+                final_noise = deint_noise
+            self._nodes['final_noise'] = final_noise
+
+        # Mode 1 denoises the input clip. Mode 2 leaves the noise and lets the temporal blurs "denoise" it
+        if noise['mode'] == 1:
+            self._nodes['inner'] = denoised
 
     def _interpolation_processing(self) -> None:
-        ...
+        req = self._reqs['_interpolation_processing']
+        inner = self._nodes['inner']
+        tff = self._process_tff
+        interp = self._settings['interpolation']
+
+        # Support badly deinterlaced progressive content - drop half the fields and reweave
+        # to get 1/2fps interlaced stream appropriate for QTGMC processing
+        if self._input_type > 1:
+            edi_input = single_weave(core.std.SelectEvery(core.std.SeparateFields(inner, tff), 4, [0, 3]), tff)
+        else:
+            edi_input = inner
+        self._nodes['edi_input'] = edi_input
+
+        # Create interpolated image as starting point for output
+        if self.ref_deint is not None:
+            edi1 = core.resize.Point(
+                self.ref_deint, inner.width, inner.height,
+                src_top=(self.ref_deint.height - inner.height) // 2, src_height=inner.height
+            )
+        elif self._input_type == InputType.PROGRESSIVE_GENERIC:
+            edi1 = edi_input
+        else:
+            deint_chroma = self.deint_chroma
+            if deint_chroma is None and interp['deint_chroma'] is not None:
+                deint_chroma = deintd2class(interp['deint_chroma'], edi_input)
+            edi1 = interpolate(edi_input, tff, self.deint or deintd2class(interp['deint'], edi_input), deint_chroma)
+
+        # InputType=2,3: use motion mask to blend luma between original clip & reweaved clip based on prog_sad_mask.
+        # Use chroma from original clip in any case
+        if self._input_type < 2:
+            edi = edi1
+        elif 'srch' not in req.clips:
+            if not _is_gray(inner):
+                edi = core.std.ShufflePlanes([edi1, inner], [0, 1, 2], inner.format.color_family)
+            else:
+                edi = edi1
+        else:
+            blend = mv_mask(
+                self._nodes['srch'], vectors=self._vectors[1][0],
+                kind=1, ml=self._settings['motion_analysis']['prog_sad_mask']
+            )
+            edi = core.std.MaskedMerge(inner, edi1, blend, planes=[0])
+        self._nodes['edi'] = edi
+
+        if 'edi' in req.supers:
+            self._nodes['edi_super'] = mv_super(edi, **self._super_args(levels=1))
+
+        # Get the max/min value for each pixel over neighboring motion-compensated frames
+        # used for temporal sharpness limiting
+        if 'tmax' in self._needed.clips:
+            edi_super = self._nodes['edi_super']
+            tmax, tmin = ExprClip.of(edi), ExprClip.of(edi)
+            for delta in sorted(req.deltas & {1, 3}):
+                bvec, fvec = self._vectors[delta]
+                bcomp = mv_compensate(edi, super=edi_super, vectors=bvec, **self._scd_args())
+                fcomp = mv_compensate(edi, super=edi_super, vectors=fvec, **self._scd_args())
+                tmax = expr([tmax, fcomp, bcomp], 'x y max z max')
+                tmin = expr([tmin, fcomp, bcomp], 'x y min z min')
+            self._nodes['tmax'] = tmax.node()
+            self._nodes['tmin'] = tmin.node()
 
     def _basic_output_processing(self) -> None:
-        ...
+        req = self._reqs['_basic_output_processing']
+        edi = self._nodes['edi']
+        ma = self._settings['motion_analysis']
+        initial = self._settings['core']['initial_output']
+        sm = self._settings['source_match']
+
+        # Use motion vectors to blur interpolated image (edi) with motion-compensated previous and next frames
+        # to remove shimmer from alternate frames
+        binomial1 = self._binomial_smooth(edi, self._nodes.get('edi_super'), initial['tr'], ma['thsad_initial_output'])
+
+        # Remove areas of difference between smoothed image and interpolated image that are not bob-shimmer fixes:
+        # repairs residual motion blur from temporal smooth
+        if initial['rep'] <= 0:
+            repair1 = binomial1
+        else:
+            repair1 = bob_shimmer_fix(binomial1, edi, initial['rep'], True)
+
+        # Apply source match - use difference between output and source to succesively refine output
+        if sm['match'] <= 0:
+            match = repair1
+        else:
+            def _smooth(clip: vs.VideoNode, super_name: str, tr: int) -> vs.VideoNode:
+                if super_name not in req.supers:
+                    return clip
+                super_clip = mv_super(clip, **self._super_args(levels=1))
+                return self._binomial_smooth(clip, super_clip, tr, ma['thsad_initial_output'])
+
+            interp = self._settings['interpolation']
+            match = apply_source_match(
+                repair1, self._nodes['edi_input'], self._input_type, self._process_tff, sm['match'],
+                deintd2class(sm['basic_deint'] or interp['deint']),
+                deintd2class(sm['refined_deint'] or interp['deint']),
+                initial['tr'], sm['refined_tr'], sm['enhance'],
+                lambda clip, step, tr: _smooth(clip, f'match{step}', tr)
+            )
+
+        # Lossless=2 - after preparing an interpolated, de-shimmered clip,
+        # restore the original source fields into it and clean up any artefacts
+        if sm['lossless'] >= 2:
+            self._nodes['lossed1'] = make_lossless(match, self._nodes['inner'], self._input_type, self._process_tff)
+        else:
+            self._nodes['lossed1'] = match
 
     def _restore_processing(self) -> None:
-        ...
+        req = self._reqs['_restore_processing']
+        lossed1 = self._nodes['lossed1']
+        edi = self._nodes['edi']
+        ma = self._settings['motion_analysis']
+        final = self._settings['core']['final_output']
+        sharp = self._settings['sharpness']
+        sharp_extra = self._extra_settings['sharp']
+        sm = self._settings['source_match']
+        noise = self._settings['noise']
+        neutral = get_neutral(lossed1)
+        kernel = [1, 2, 1, 2, 4, 2, 1, 2, 1]
+
+        # Resharpen to counteract temporal blurs
+        if sharp['mode'] <= 0:
+            resharp = lossed1
+        else:
+            if sharp['mode'] == 1:
+                blurred = core.std.Convolution(lossed1, kernel)
+            else:
+                coord = [0, 1, 0, 0, 0, 0, 1, 0]
+                vresharp = merge(
+                    core.std.Maximum(lossed1, coordinates=coord), core.std.Minimum(lossed1, coordinates=coord)
+                ).node()
+                blurred = core.std.Convolution(vresharp, kernel)
+            resharp = expr([lossed1, blurred], f'x x y - {sharp_extra.strength_adj} * +').node()
+
+        # Slightly thin down 1-pixel high horizontal edges that have been widened into neigboring field lines
+        if sharp['vthin'] > 0:
+            vert_med_d = expr(
+                [lossed1, core.rgvs.VerticalCleaner(lossed1, [1] if _is_gray(lossed1) else [1, 0])],
+                _planes_exprs(lossed1, f'y x - {sharp["vthin"] * 6.0} * {neutral} +', False)
+            ).node()
+            vert_med_d = core.std.Convolution(vert_med_d, [1, 2, 1], planes=[0], mode='h')
+            neighbor_d = expr(
+                [vert_med_d, core.std.Convolution(vert_med_d, kernel, planes=[0])],
+                _planes_exprs(lossed1, f'y {neutral} - abs x {neutral} - abs > y {neutral} ?', False)
+            )
+            thin = merge_diff(resharp, neighbor_d, [0]).node()
+        else:
+            thin = resharp
+
+        # Back blend the blurred difference between sharpened & unsharpened clip,
+        # before (1st) sharpness limiting (bb == 1,3). A small fidelity improvement
+        back_blend1 = back_blend(thin, lossed1) if sharp['bb'] in {1, 3} else thin
+
+        # Limit over-sharpening by clamping to neighboring (spatial or temporal) min/max values in original
+        # Occurs here (before final temporal smooth) if lmode == 1,2
+        if sharp['lmode'] == 1:
+            sharp_limit1 = spatial_limit(back_blend1, edi, sharp['lrad'])
+        elif sharp['lmode'] == 2:
+            sharp_limit1 = clamp(
+                back_blend1, self._nodes['tmax'], self._nodes['tmin'], sharp_extra.ovs_scaled, sharp_extra.ovs_scaled
+            )
+        else:
+            sharp_limit1 = back_blend1
+
+        # Back blend after (1st) sharpness limiting (bb == 2,3)
+        back_blend2 = back_blend(sharp_limit1, lossed1) if sharp['bb'] >= 2 else sharp_limit1
+
+        # Add back any extracted noise, prior to final temporal smooth
+        add_noise1 = self._restore_noise(back_blend2, noise['restore_before_final'] if noise else 0)
+
+        # Final light linear temporal smooth for denoising
+        if 'stable' in req.supers:
+            stable_super = mv_super(add_noise1, **self._super_args(levels=1))
+            vectors: Dict[str, vs.VideoNode] = {}
+            for delta in range(1, final['tr'] + 1):
+                suffix = '' if delta == 1 else str(delta)
+                vectors['mvbw' + suffix], vectors['mvfw' + suffix] = self._vectors[delta]
+            degrain = [mv_degrain1, mv_degrain2, mv_degrain3][final['tr'] - 1]
+            stable = degrain(
+                add_noise1, super=stable_super, **vectors, thsad=ma['thsad_final_output'], **self._scd_args()
+            )
+        else:
+            stable = add_noise1
+
+        # Remove areas of difference between final output & basic interpolated image that are not bob-shimmer fixes:
+        # repairs motion blur caused by temporal smooth
+        if final['rep'] <= 0:
+            repair2 = stable
+        else:
+            repair2 = bob_shimmer_fix(stable, edi, final['rep'], True)
+
+        # Occurs here (after final temporal smooth) if lmode == 3,4
+        if sharp['lmode'] == 3:
+            sharp_limit2 = spatial_limit(repair2, edi, sharp['lrad'])
+        elif sharp['lmode'] >= 4:
+            sharp_limit2 = clamp(
+                repair2, self._nodes['tmax'], self._nodes['tmin'], sharp_extra.ovs_scaled, sharp_extra.ovs_scaled
+            )
+        else:
+            sharp_limit2 = repair2
+
+        # Lossless=1 - inject source fields into result and clean up inevitable artefacts
+        if sm['lossless'] == 1:
+            lossed2 = make_lossless(sharp_limit2, self._nodes['inner'], self._input_type, self._process_tff)
+        else:
+            lossed2 = sharp_limit2
+
+        # Add back any extracted noise, after final temporal smooth. This will appear as noise/grain in the output
+        self._nodes['output'] = self._restore_noise(lossed2, noise['restore_after_final'] if noise else 0)
+
+    def _restore_noise(self, clip: vs.VideoNode, restore: float) -> vs.VideoNode:
+        noise = self._settings['noise']
+        if noise is None or restore <= 0:
+            return clip
+        planes = [0, 1, 2] if noise['chroma'] and not _is_gray(clip) else [0]
+        # Average luma of FFT3DFilter extracted noise is 128.5
+        denoiser = self.denoiser or dend2class(noise['denoiser'])
+        if isinstance(denoiser, (FFT3D, NeoFFT3D, AutoFFT3D)):
+            centre = scale_value_full(128.5, 8, get_depth(clip))
+        else:
+            centre = get_neutral(clip)
+        restored = expr(
+            [self._nodes['final_noise']],
+            _planes_exprs(clip, f'x {centre} - {restore} * {get_neutral(clip)} +', noise['chroma'])
+        )
+        return merge_diff(clip, restored, planes).node()
 
     def _post_processing(self) -> None:
-        ...
+        clip = self._nodes['output']
+        ma = self._settings['motion_analysis']
+        mb = self._settings['motion_blur']
 
+        if mb['shutter_blur'] > 0:
+            # Get level of blur depending on output framerate and blur already in source
+            blur_level = (mb['shutter_angle_out'] * mb['fps_divisor'] - mb['shutter_angle_src']) * 100 / 360
+            if blur_level < 0:
+                raise ValueError(
+                    'QTGMC: Cannot reduce motion blur already in source: increase shutter_angle_out or fps_divisor'
+                )
+            if blur_level > 200:
+                raise ValueError('QTGMC: Exceeded maximum motion blur level: decrease shutter_angle_out or fps_divisor')
+
+            # ShutterBlur mode 2,3 - get finer resolution motion vectors to reduce blur "bleeding" into static areas
+            bvec1, fvec1 = self._vectors[1]
+            if mb['shutter_blur'] > 1:
+                divide = [1, 1, 2, 4][mb['shutter_blur']]
+                blocksize = max(ma['blocksize'] // divide, 4)
+                overlap = max(ma['overlap'] // divide, 2)
+                divide = ma['blocksize'] // blocksize
+                recalculate_args = dict(
+                    thsad=ma['thsad_initial_output'], blksize=blocksize, overlap=overlap,
+                    search=ma['search'], searchparam=ma['search_param'], truemotion=ma['truemotion'],
+                    lambda_=ma['lambda_'] // (divide * divide), pnew=ma['pnew'], dct=ma['dct'], chroma=ma['chroma_motion']
+                )
+                srch_super = self._nodes['srch_super']
+                bvec1 = mv_recalculate(srch_super, vectors=bvec1, **recalculate_args)
+                fvec1 = mv_recalculate(srch_super, vectors=fvec1, **recalculate_args)
+
+            # Use FlowBlur to blur along motion vectors
+            sblur_super = mv_super(clip, **self._super_args(levels=1))
+            sblur = mv_flowblur(clip, super=sblur_super, mvbw=bvec1, mvfw=fvec1, blur=blur_level, **self._scd_args())
+
+            # Use motion mask to reduce blurring in areas of low motion
+            if mb['blur_limit'] > 0:
+                motion_mask = mv_mask(self._nodes['srch'], vectors=self._vectors[1][0], kind=0, ml=mb['blur_limit'])
+                clip = core.std.MaskedMerge(clip, sblur, motion_mask)
+            else:
+                clip = sblur
+
+        # Reduce frame rate
+        if mb['fps_divisor'] > 1:
+            clip = core.std.SelectEvery(clip, mb['fps_divisor'], 0)
+
+        self._nodes['output'] = core.std.SetFieldBased(clip, 0)
 
 
 def interpolate(clip: vs.VideoNode, tff: bool, deint: Deinterlacer,
@@ -391,8 +1223,7 @@ def bob_shimmer_fix(clip: vs.VideoNode, ref: vs.VideoNode, rep: int, chroma: boo
     Thin regions will be removed by this process.
     Restore remaining areas of difference back to as they were in reference clip
     """
-
-    pclip = get_y(clip) if not chroma else clip
+    planes = [0, 1, 2] if chroma and not _is_gray(clip) else [0]
 
     # ed is the erosion distance - how much to deflate then reflate to remove thin areas of interest:
     # 0 = minimum to 6 = maximum
@@ -404,9 +1235,9 @@ def bob_shimmer_fix(clip: vs.VideoNode, ref: vs.VideoNode, rep: int, chroma: boo
     # (nasty method, but kept for compatibility with original TGMC)
     overdilatation = 0
 
-    diff = core.std.MakeDiff(ref, pclip)
+    diff = core.std.MakeDiff(ref, clip)
 
-    coord = dict(coordinates=[0, 1, 0, 0, 0, 0, 1, 0])
+    coord = dict(planes=planes, coordinates=[0, 1, 0, 0, 0, 0, 1, 0])
     _FuncTuple = Tuple[Callable[..., vs.VideoNode], Callable[..., vs.VideoNode]]
 
     def _process(_imum_func: _FuncTuple, _flate_func: _FuncTuple) -> vs.VideoNode:
@@ -420,9 +1251,9 @@ def bob_shimmer_fix(clip: vs.VideoNode, ref: vs.VideoNode, rep: int, chroma: boo
         if erosion > 5:
             choke = imum1(choke, **coord)
         if erosion % 3 != 0:
-            choke = flate1(choke)
+            choke = flate1(choke, planes=planes)
         if erosion in {2, 5}:
-            choke = core.std.Median(choke)
+            choke = core.std.Median(choke, planes=planes)
         choke = imum2(choke, **coord)
         if erosion > 1:
             choke = imum2(choke, **coord)
@@ -431,11 +1262,11 @@ def bob_shimmer_fix(clip: vs.VideoNode, ref: vs.VideoNode, rep: int, chroma: boo
 
         # Over-dilation - extra reflation up to about 1 pixel
         if overdilatation == 1:
-            choke = flate2(choke)
+            choke = flate2(choke, planes=planes)
         elif overdilatation == 2:
-            choke = flate2(flate2(choke))
+            choke = flate2(flate2(choke, planes=planes), planes=planes)
         elif overdilatation == 3:
-            choke = imum2(choke)
+            choke = imum2(choke, planes=planes)
         return choke
 
     choke1 = _process((core.std.Minimum, core.std.Maximum), (core.std.Deflate, core.std.Inflate))
@@ -446,10 +1277,9 @@ def bob_shimmer_fix(clip: vs.VideoNode, ref: vs.VideoNode, rep: int, chroma: boo
         return scale_value_full(x, 8, get_depth(clip))
     neutral = get_neutral(clip)
 
-    restore = core.std.Expr([diff, choke1], f'x {_scale(129)} < x y {neutral} < {neutral} y ? ?')
-    restore = core.std.Expr([restore, choke2], f'x {_scale(127)} > x y {neutral} > {neutral} y ? ?')
-    mergediff = core.std.MergeDiff(clip, restore)
-    return mergediff if chroma else merge_chroma(mergediff, clip)
+    restore = expr([diff, choke1], _planes_exprs(clip, f'x {_scale(129)} < x y {neutral} < {neutral} y ? ?', chroma))
+    restore = expr([restore, choke2], _planes_exprs(clip, f'x {_scale(127)} > x y {neutral} > {neutral} y ? ?', chroma))
+    return merge_diff(clip, restore, planes).node()
 
 
 def make_lossless(clip: vs.VideoNode, src: vs.VideoNode, input_type: InputType, tff: bool = True) -> vs.VideoNode:
@@ -463,39 +1293,172 @@ def make_lossless(clip: vs.VideoNode, src: vs.VideoNode, input_type: InputType,
 
     # Weave the source fields and the "new" fields that have generated in the input
     if input_type == InputType.INTERLACED_ONLY:
-        src_fields = src.std.SeparateFields(tff)
+        src_fields = core.std.SeparateFields(src, tff)
     elif input_type == InputType.PROGRESSIVE_GENERIC:
         raise ValueError('Lossless modes are incompatible with InputType=1')
     else:
-        src_fields = src.std.SeparateFields(tff).std.SelectEvery(4, [0, 3])
-    new_fields = clip.std.SeparateFields(tff).std.SelectEvery(4, [1, 2])
+        src_fields = core.std.SelectEvery(core.std.SeparateFields(src, tff), 4, [0, 3])
+    new_fields = core.std.SelectEvery(core.std.SeparateFields(clip, tff), 4, [1, 2])
     processed = single_weave(
-        core.std.Interleave([src_fields, new_fields]).std.SelectEvery(4, [0, 1, 3, 2]), tff
+        core.std.SelectEvery(core.std.Interleave([src_fields, new_fields]), 4, [0, 1, 3, 2]), tff
     )
 
     # Clean some of the artefacts caused by the above - creating a second version of the "new" fields
     vert_median = core.rgvs.VerticalCleaner(processed, 1)
     vert_med_diff = core.std.MakeDiff(processed, vert_median)
-    vm_new_diff1 = vert_med_diff.std.SeparateFields(tff).std.SelectEvery(4, [1, 2])
+    vm_new_diff1 = core.std.SelectEvery(core.std.SeparateFields(vert_med_diff, tff), 4, [1, 2])
     neutral = get_neutral(clip)
     vm_new_diff2 = core.std.Expr(
-        [vm_new_diff1.rgvs.VerticalCleaner(1), vm_new_diff1],
+        [core.rgvs.VerticalCleaner(vm_new_diff1, 1), vm_new_diff1],
         f'x {neutral} - y {neutral} - * 0 < {neutral} x {neutral} - abs y {neutral} - abs < x y ? ?'
     )
     vm_new_diff3 = core.rgvs.Repair(
-        vm_new_diff2, vm_new_diff2.rgvs.RemoveGrain(2), 1
+        vm_new_diff2, core.rgvs.RemoveGrain(vm_new_diff2, 2), 1
     )
     # Reweave final result
     return single_weave(
-        core.std.Interleave(
-            [src_fields, new_fields.std.MakeDiff(vm_new_diff3)]
-        ).std.SelectEvery(4, [0, 1, 3, 2]), tff
+        core.std.SelectEvery(
+            core.std.Interleave([src_fields, core.std.MakeDiff(new_fields, vm_new_diff3)]), 4, [0, 1, 3, 2]
+        ), tff
     )
 
 
-def apply_source_match():
-    ...
+def apply_source_match(deint: vs.VideoNode, source: vs.VideoNode, input_type: InputType, tff: bool, match: int,
+                       basic_deint: Deinterlacer, refined_deint: Deinterlacer, basic_tr: int, refined_tr: int,
+                       enhance: float, smooth: Callable[[vs.VideoNode, int, int], vs.VideoNode]) -> vs.VideoNode:
+    """
+    Basic source-match. Find difference between source clip & equivalent fields in interpolated/smoothed clip
+    (called the "error" in formula below). Adjust the *source* in such a way that smoothing it
+    will give a result closer to the unadjusted source, then rerun the interpolation and binomial smooth.
+
+    Formula used for correction is P0' = P0 + (P0-P1)/(k+S(1-k)), where P0 is original image,
+    P1 is the 1st attempt at interpolation/smoothing , P0' is the revised image to use as new source
+    for interpolation/smoothing, k is the weighting given to the current frame in the smooth,
+    and S is a factor indicating "temporal similarity" of the error from frame to frame.
+
+    :param smooth:      Binomial smooth of the source-match step (1, 2 or 3) using the given temporal radius
+    """
+    # S in formula described above
+    error_similarity = 0.5
+    error_adjust = [1.0, 2.0 / (1.0 + error_similarity), 8.0 / (3.0 + 5.0 * error_similarity)]
+    kernel = [1, 2, 1, 2, 4, 2, 1, 2, 1]
+
+    def _reweave(clip: vs.VideoNode) -> vs.VideoNode:
+        if input_type == InputType.PROGRESSIVE_GENERIC:
+            return clip
+        return single_weave(core.std.SelectEvery(core.std.SeparateFields(clip, tff), 4, [0, 3]), tff)
+
+    def _interpolate(clip: vs.VideoNode, deinterlacer: Deinterlacer) -> vs.VideoNode:
+        if input_type == InputType.PROGRESSIVE_GENERIC:
+            return clip
+        return interpolate(clip, tff, deinterlacer)
+
+    if basic_tr > 0:
+        adjust1 = error_adjust[basic_tr]
+        match1_update = expr([source, _reweave(deint)], f'x {adjust1 + 1} * y {adjust1} * -').node()
+    else:
+        match1_update = source
+    match1 = smooth(_interpolate(match1_update, basic_deint), 1, basic_tr)
+
+    if match < 2:
+        return match1
+
+    # Enhance effect of source-match stages 2 & 3 by sharpening clip prior to refinement
+    if enhance > 0:
+        match1_shp = expr([match1, core.std.Convolution(match1, kernel)], f'x x y - {enhance} * +').node()
+    else:
+        match1_shp = match1
+
+    # Source-match refinement. Find difference between source clip & equivalent fields in (updated)
+    # interpolated/smoothed clip. Interpolate & binomially smooth this difference then add it back to output
+    match2_edi = _interpolate(make_diff(source, _reweave(match1_shp)).node(), refined_deint)
+    match2 = smooth(match2_edi, 2, refined_tr)
+
+    # Source-match second refinement - correct error introduced in the refined difference by temporal smoothing
+    if match < 3:
+        match3 = match2
+    elif refined_tr <= 0:
+        match3 = match2_edi
+    else:
+        adjust2 = error_adjust[refined_tr]
+        match3_update = expr([match2_edi, match2], f'x {adjust2 + 1} * y {adjust2} * -').node()
+        match3 = smooth(match3_update, 3, refined_tr)
+
+    # Apply difference calculated in source-match refinement
+    return merge_diff(match1_shp, match3).node()
 
 
 def single_weave(clip: vs.VideoNode, tff: bool = True) -> vs.VideoNode:
-    return clip.std.DoubleWeave(tff)[::2]
+    return core.std.SelectEvery(core.std.DoubleWeave(clip, tff), 2, 0)
+
+
+def luma_rebuild(clip: vs.VideoNode, s0: float = 2.0, c: float = 0.0625, chroma: bool = True) -> vs.VideoNode:
+    """Luma curve boosting contrast in the dark areas of the motion search clip. Old "DitherLumaRebuild"."""
+    assert clip.format
+    is_integer = clip.format.sample_type == vs.INTEGER
+    shift = clip.format.bits_per_sample - 8
+    neutral = 128 << shift if is_integer else 0.0
+
+    k = (s0 - 1) * c
+    t = f'x {16 << shift if is_integer else 16 / 255} - {219 << shift if is_integer else 219 / 255} / 0 max 1 min'
+    luma = f'{k} {1 + c} {(1 + c) * c} {t} {c} + / - * {t} 1 {k} - * + {256 << shift if is_integer else 256 / 255} *'
+    if _is_gray(clip):
+        return expr([clip], luma).node()
+    return expr([clip], [luma, f'x {neutral} - 128 * 112 / {neutral} +' if chroma else '']).node()
+
+
+def clamp(clip: vs.VideoNode, bright_limit: vs.VideoNode, dark_limit: vs.VideoNode,
+          overshoot: float = 0, undershoot: float = 0) -> vs.VideoNode:
+    return expr(
+        [clip, bright_limit, dark_limit],
+        f'x y {overshoot} + > y {overshoot} + x ? z {undershoot} - < z {undershoot} - x y {overshoot} + > y {overshoot} + x ? ?'
+    ).node()
+
+
+def spatial_limit(clip: vs.VideoNode, ref: vs.VideoNode, rad: int) -> vs.VideoNode:
+    if rad <= 1:
+        return core.rgvs.Repair(clip, ref, [1])
+    return core.rgvs.Repair(clip, core.rgvs.Repair(clip, ref, [12]), [1])
+
+
+def gauss_blur(clip: vs.VideoNode, p: int) -> vs.VideoNode:
+    """Gaussian blur through fmtconv, dithered back to the input depth"""
+    width, height = clip.width, clip.height
+    # Slightly off source dimensions force fmtconv to actually resample
+    blurred = Gauss(p).scale(clip, width, height, sw=width + 1e-6, sh=height + 1e-6)
+    return core.fmtc.bitdepth(blurred, bits=get_depth(clip), dmode=1)
+
+
+def back_blend(clip: vs.VideoNode, ref: vs.VideoNode) -> vs.VideoNode:
+    """Back blend the blurred difference between sharpened & unsharpened clip"""
+    diff = core.std.Convolution(make_diff(clip, ref, [0]).node(), [1, 2, 1, 2, 4, 2, 1, 2, 1], planes=[0])
+    return make_diff(clip, gauss_blur(diff, 5), [0]).node()
+
+
+def denoise_args(denoiser: Denoiser, strength: float, tr: int, planes: List[int]) -> Dict[str, Any]:
+    """Arguments of the noise bypass denoiser, except the ones set in the denoiser itself"""
+    tbsize = [1, 3, 5][tr]
+    kwargs: Dict[str, Any]
+    if isinstance(denoiser, (DFTTest, NeoDFTTest, AutoDFTTest)):
+        kwargs = dict(sigma=strength * 4, tbsize=tbsize, planes=planes)
+    elif isinstance(denoiser, KNLMeansCL):
+        channels = KNLMeansCLChannel.YUV if len(planes) > 1 else KNLMeansCLChannel.Y
+        kwargs = dict(tmprange=tr, strength=strength, channels=channels)
+    else:
+        kwargs = dict(sigma=strength, planes=planes, bt=tbsize)
+    return {k: v for k, v in kwargs.items() if k not in denoiser.params}
+
+
+def denoise(denoiser: Denoiser, clip: vs.VideoNode, strength: float, tr: int, planes: List[int]) -> vs.VideoNode:
+    """Call the noise bypass denoiser. Arguments set in the denoiser itself take precedence"""
+    return denoiser(clip, **denoise_args(denoiser, strength, tr, planes))
+
+
+def _is_gray(clip: vs.VideoNode) -> bool:
+    assert clip.format
+    return clip.format.color_family == vs.GRAY
+
+
+def _planes_exprs(clip: vs.VideoNode, luma: str, chroma: bool) -> List[str]:
+    """Expression for every plane if `chroma` else luma only, chroma being copied from the first clip"""
+    return [luma] if chroma or _is_gray(clip) else [luma, '']
@@ -0,0 +1,296 @@
+"""
+Long-running frame server.\n
+A daemon keeps the plugins loaded and a pool of warm `QTGMC` graphs, one per recently used
+(format, resolution, frame rate, preset, settings) combination, and streams the output frames
+of each job over a local Unix socket.
+
+    python -m qtgmc_modern.server /tmp/qtgmc.sock --max-graphs 8
+
+A job is one JSON line, answered by one JSON header line followed by the raw planar frames:
+
+    {"source": {"plugin": "lsmas", "function": "LWLibavSource", "args": {"source": "in.mkv"}},
+     "preset": "slower", "tff": true, "input_type": 0,
+     "settings": {"sharpness": {"strength": 0.8}}, "start": 0, "end": null}
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'FrameServer', 'GraphPool', 'WarmGraph',
+    'submit'
+]
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+import vapoursynth as vs
+
+from .chunked import Chunk, _chunk_output_range
+from .graph import core
+from .helper import number_frames
+from .memory import frame_bytes
+from .qtgmc import QTGMC
+from .settings import InputType, Preset
+from .writer import FrameWriter
+
+# The field rate part of the graph doubles the length, which has to stay below 2^31
+_PROXY_LENGTH = 2 ** 29
+# Frames left between two jobs on the proxy source, more than any temporal reach
+_GAP = 1024
+# The vector cache is keyed on the source clip, i.e. on the proxy source shared by every job of a warm graph
+_REJECTED_SETTINGS = frozenset({'vector_cache'})
+
+
+class _Job:
+    __slots__ = ('offset', 'clip', 'shifted')
+
+    def __init__(self, offset: int, clip: vs.VideoNode, filler: vs.VideoNode) -> None:
+        self.offset = offset
+        # Numbered before the splice, so frame number based filters match a standalone render of the job
+        self.clip = clip = number_frames(clip)
+        # Frame n of the proxy is frame n - offset of the job, clamped to the job
+        head = [filler[:offset - _GAP // 2]] if offset > _GAP // 2 else []
+        self.shifted = core.std.Splice(
+            head + [core.std.Loop(clip[0], _GAP // 2), clip, core.std.Loop(clip[-1], _GAP // 2)], mismatch=True
+        )
+
+
+class WarmGraph:
+    """
+    `QTGMC` graph built once on a proxy source whose frames come from the jobs bound to it.\n
+    Every job gets its own range of proxy frames, never reused, so the frame caches of the graph
+    can't serve frames of a previous job, and several jobs can share the graph at the same time.
+    Proxy frames outside the jobs repeat the reference clip, so what the graph probes while it is built
+    (bob and deinterlacer checks, backend benchmarks) sees real pictures and frame properties.
+    """
+    qtgmc: QTGMC
+    output: vs.VideoNode
+    _filler: vs.VideoNode
+    _jobs: List[_Job]
+    _starts: List[int]
+    _next_offset: int
+    _lock: threading.Lock
+
+    def __init__(self, reference: vs.VideoNode, preset: Preset, tff: bool, input_type: InputType,
+                 settings: Mapping[str, Mapping[str, Any]], threads: Optional[int] = None) -> None:
+        assert reference.format
+        self._filler = core.std.Loop(reference, -(-_PROXY_LENGTH // reference.num_frames))[:_PROXY_LENGTH]
+        self._jobs = []
+        self._starts = []
+        self._next_offset = _GAP
+        self._lock = threading.Lock()
+
+        proxy = core.std.FrameEval(self._filler, self._shifted)
+        self.qtgmc = _configure(QTGMC(proxy, preset, tff, input_type, log_info=False), settings)
+        self.qtgmc.thread_budget = threads
+        self.output = self.qtgmc.process()
+
+    def has_room(self, num_frames: int) -> bool:
+        """Whether a job of `num_frames` frames still fits on the proxy source"""
+        divisor = self.qtgmc.motion_blur['fps_divisor']
+        return self._next_offset + divisor + num_frames + _GAP <= _PROXY_LENGTH
+
+    def bind(self, clip: vs.VideoNode) -> Tuple[_Job, range]:
+        """
+        Bind a source clip to the graph
+
+        :return:    Job handle and range of output frames of the job
+        """
+        divisor = self.qtgmc.motion_blur['fps_divisor']
+        with self._lock:
+            if not self.has_room(clip.num_frames):
+                raise ValueError(f'{self.__class__.__name__}: no room left on the proxy source')
+            # Decimated output frames must line up with the start of the job
+            offset = -(-self._next_offset // divisor) * divisor
+            job = _Job(offset, clip, self._filler)
+            self._jobs.append(job)
+            self._starts.append(offset - _GAP // 2)
+            self._next_offset = offset + clip.num_frames + _GAP
+        rate = 2 if self.qtgmc.input_type == InputType.INTERLACED_ONLY else 1
+        return job, _chunk_output_range(Chunk(offset, offset + clip.num_frames, 0, 0), rate, divisor)
+
+    def release(self, job: _Job) -> None:
+        with self._lock:
+            i = self._jobs.index(job)
+            del self._jobs[i]
+            del self._starts[i]
+
+    def _shifted(self, n: int) -> vs.VideoNode:
+        with self._lock:
+            i = bisect_right(self._starts, n) - 1
+            return self._jobs[max(i, 0)].shifted if self._jobs else self._filler
+
+
+def _configure(qtgmc: QTGMC, settings: Mapping[str, Mapping[str, Any]]) -> QTGMC:
+    for section, kwargs in settings.items():
+        if section in _REJECTED_SETTINGS:
+            raise ValueError(f'Settings section "{section}" can\'t be set by a job')
+        setter = getattr(qtgmc, f'set_{section}', None)
+        if setter is None:
+            raise ValueError(f'Unknown settings section "{section}"')
+        setter(**kwargs)
+    return qtgmc
+
+
+class GraphPool:
+    """
+    Least recently used warm graphs.\n
+    Graphs are built outside the pool lock, so a cold build only holds up the jobs waiting for the same graph.
+    The pool owns the core: the threads split by an auto denoiser are shared by all the graphs,
+    so `core.num_threads` is lowered to the smallest share of the core picked by any of them.
+    """
+    max_graphs: int
+    threads: int
+    """Threads shared by the core and the plugins, the threads of the core when the pool was created"""
+    _graphs: OrderedDict[Hashable, WarmGraph]
+    _building: Dict[Hashable, threading.Lock]
+    _lock: threading.Lock
+
+    def __init__(self, max_graphs: int = 8) -> None:
+        self.max_graphs = max_graphs
+        self.threads = core.num_threads
+        self._graphs = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def get(self, clip: vs.VideoNode, preset: Preset, tff: bool, input_type: InputType,
+            settings: Mapping[str, Mapping[str, Any]]) -> WarmGraph:
+        assert clip.format
+        # The settings fingerprint catches every difference, including defaults changed by the setters
+        fingerprint = _configure(QTGMC(clip, preset, tff, input_type, log_info=False), settings).settings.fingerprint
+        key = (clip.format.id, clip.width, clip.height, clip.fps, tff, int(input_type), fingerprint)
+        with self._lock:
+            if (graph := self._warm(key, clip.num_frames)) is not None:
+                return graph
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Built by another job in the meantime
+            with self._lock:
+                if (graph := self._warm(key, clip.num_frames)) is not None:
+                    return graph
+            graph = WarmGraph(clip, preset, tff, input_type, settings, self.threads)
+            with self._lock:
+                if (split := graph.qtgmc.thread_split) is not None:
+                    core.num_threads = min(core.num_threads, split.core_threads)
+                self._graphs[key] = graph
+                self._graphs.move_to_end(key)
+                while len(self._graphs) > self.max_graphs:
+                    self._graphs.popitem(last=False)
+                self._building.pop(key, None)
+        return graph
+
+    def _warm(self, key: Hashable, num_frames: int) -> Optional[WarmGraph]:
+        """Pooled graph with room for the job, marked as most recently used. Called with the lock held"""
+        graph = self._graphs.get(key)
+        if graph is None or not graph.has_room(num_frames):
+            return None
+        self._graphs.move_to_end(key)
+        return graph
+
+
+def _load_source(spec: Mapping[str, Any]) -> vs.VideoNode:
+    func = getattr(getattr(core, spec['plugin']), spec['function'])
+    return func(**spec.get('args', {}))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: FrameServer
+
+    def handle(self) -> None:
+        try:
+            job = json.loads(self.rfile.readline())
+            source = _load_source(job['source'])
+            source = source[job.get('start', 0):job.get('end')]
+            graph = self.server.pool.get(
+                source, Preset[job.get('preset', 'slower').upper()], job.get('tff', True),
+                InputType(job.get('input_type', 0)), job.get('settings', {})
+            )
+            handle, frames = graph.bind(source)
+        except Exception as err:
+            self._reply(dict(error=f'{err.__class__.__name__}: {err}'))
+            return
+
+        try:
+            output = graph.output
+            self._reply(dict(
+                width=output.width, height=output.height, format=output.format.name if output.format else None,
+                num_frames=len(frames), frame_size=frame_bytes(output),
+                fps=[output.fps.numerator, output.fps.denominator]
+            ))
+            FrameWriter(output, window=self.server.window).write(self.wfile, frames)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            graph.release(handle)
+
+    def _reply(self, header: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(header).encode() + b'\n')
+        self.wfile.flush()
+
+
+class FrameServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    >>> with FrameServer('/tmp/qtgmc.sock') as server:
+    ...     server.serve_forever()
+    """
+    daemon_threads = True
+    pool: GraphPool
+    window: int
+
+    def __init__(self, path: str, max_graphs: int = 8, window: Optional[int] = None) -> None:
+        """
+        :param path:        Path of the Unix socket
+        :param max_graphs:  Number of warm graphs kept
+        :param window:      Frames requested ahead for each job. Defaults to the number of threads of the core
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        self.pool = GraphPool(max_graphs)
+        self.window = window or core.num_threads
+        super().__init__(path, _Handler)
+
+
+def submit(path: str, job: Mapping[str, Any], out: BinaryIO) -> Dict[str, Any]:
+    """
+    Send a job to a `FrameServer` and copy the output frames to `out`
+
+    :return:    Header of the reply
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(job).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            header: Dict[str, Any] = json.loads(f.readline())
+            if 'error' in header:
+                raise ValueError(header['error'])
+            remaining = header['num_frames'] * header['frame_size']
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    raise ConnectionError('submit: server closed the connection early')
+                out.write(chunk)
+                remaining -= len(chunk)
+    return header
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('socket', help='Path of the Unix socket')
+    parser.add_argument('--max-graphs', type=int, default=8)
+    parser.add_argument('--window', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with FrameServer(args.socket, args.max_graphs, args.window) as server:
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
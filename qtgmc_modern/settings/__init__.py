@@ -1,5 +1,5 @@
 # flake8: noqa
 
-from ._parse import load_preset
+from ._parse import compile_presets, load_preset
 from ._presets import NNEDI3Preset, EEDI3Preset, Preset, NoisePreset
 from ._interface import *
@@ -0,0 +1,7 @@
+"""
+Precompile the presets: `python -m qtgmc_modern.settings`
+"""
+
+from ._parse import compile_presets
+
+print(compile_presets())
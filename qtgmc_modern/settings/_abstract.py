@@ -2,7 +2,7 @@
 from abc import ABC
 from typing import Any, Dict, Iterator, MutableMapping, NoReturn
 
-from ..logger import log_update
+from ..logger import logger
 
 
 class LoggedSettings(MutableMapping[str, Any], ABC):
@@ -16,9 +16,9 @@ class LoggedSettings(MutableMapping[str, Any], ABC):
         return self._data.__getitem__(k)
 
     def __setitem__(self, k: str, v: Any) -> None:
+        if logger.enabled and self._data.get(k) != v:
+            logger.record(self.__class__.__name__, k, v)
         self._data.__setitem__(k, v)
-        if self._data.__getitem__(k) != v:
-            log_update((self.__class__.__name__, k), v)
 
     def __delitem__(self, v: str) -> NoReturn:
         raise NotImplementedError
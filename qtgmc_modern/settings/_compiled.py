@@ -0,0 +1,505 @@
+# Generated by `python -m qtgmc_modern.settings`. Do not edit.
+from typing import Any, Dict, Tuple
+
+PRESETS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    'placebo': (
+        '38bb267f90537974ee43000d21e85ee2fefdc14a0ecc6b9c8468190a98a1f9b5',
+        {'core': {'motion_search': {'tr': 2, 'rep': 4},
+                  'initial_output': {'tr': 2, 'rep': 0},
+                  'final_output': {'tr': 3, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 3,
+                             'subpel': 2,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 5,
+                             'search_param': 2,
+                             'pelsearch': 2,
+                             'chroma_motion': True,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 10.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 3, 'ovs': 0, 'vthin': 0.0, 'bb': 3},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                          'refined_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': {'mode': 2,
+                   'denoiser': {'name': 'fft3d', 'args': None},
+                   'use_mc': False,
+                   'tr': 1,
+                   'strength': 2.0,
+                   'chroma': False,
+                   'restore_before_final': 0.3,
+                   'restore_after_final': 0.1,
+                   'deint': {'name': 'doubleweave', 'args': None},
+                   'stabilise': False},
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'veryslow': (
+        'f54b3019135a83e820e0fcb3d4a070488f4fa21748170b8e92552d7972342172',
+        {'core': {'motion_search': {'tr': 2, 'rep': 4},
+                  'initial_output': {'tr': 2, 'rep': 0},
+                  'final_output': {'tr': 2, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 3,
+                             'subpel': 2,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 2,
+                             'chroma_motion': True,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 10.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 1},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                          'refined_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 2}},
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': {'mode': 2,
+                   'denoiser': {'name': 'fft3d', 'args': None},
+                   'use_mc': False,
+                   'tr': 1,
+                   'strength': 2.0,
+                   'chroma': False,
+                   'restore_before_final': 0.3,
+                   'restore_after_final': 0.1,
+                   'deint': {'name': 'doubleweave', 'args': None},
+                   'stabilise': False},
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'slower': (
+        'c6338a4e58ccce9471dc72980d4f6462821c81223081046db3558fce1bb16a3e',
+        {'core': {'motion_search': {'tr': 2, 'rep': 4},
+                  'initial_output': {'tr': 2, 'rep': 0},
+                  'final_output': {'tr': 1, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 3,
+                             'subpel': 2,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 2,
+                             'chroma_motion': True,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 10.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 1},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                          'refined_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'slow': (
+        '201c261efd3cc733f5f05935ea8c042e58568dda38b583e2558f558803aeeb03',
+        {'core': {'motion_search': {'tr': 2, 'rep': 4},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 1, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 3,
+                             'subpel': 2,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 2,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 10.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                          'refined_deint': {'name': 'znedi', 'args': {'nsize': 1, 'nns': 1}},
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'medium': (
+        'fb5ed2797e168b1914c86414d942a0e626fee3a473e3adf90291020bcea3d50a',
+        {'core': {'motion_search': {'tr': 2, 'rep': 3},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 1, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 5, 'nns': 1}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 3,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 10.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 5, 'nns': 1}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'fast': (
+        '6b8689826a964f9c35e556533141988ef233ac64b5d7e9a8e4ff9cbc4f7f8338',
+        {'core': {'motion_search': {'tr': 2, 'rep': 3},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 5, 'nns': 0}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 2,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 16,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 5, 'nns': 0}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'faster': (
+        'd5d1da32c10e0313ff929163d44b831d8d6c5283e17b508a8ad07a581a948ff0',
+        {'core': {'motion_search': {'tr': 1, 'rep': 0},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 2,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 32,
+                             'overlap': 16,
+                             'search': 4,
+                             'search_param': 2,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'veryfast': (
+        '850741be0f5a37f8632ece6d2a284cb8a9b4dbcf26ad3a03371f78beeccb6cd4',
+        {'core': {'motion_search': {'tr': 1, 'rep': 0},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 4}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 2,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 32,
+                             'overlap': 8,
+                             'search': 4,
+                             'search_param': 1,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 2, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'superfast': (
+        '9cf3e545d15bfdc6bd4ffc352867dd82009fa72622b6f26fdf6fab2e43b04158',
+        {'core': {'motion_search': {'tr': 1, 'rep': 0},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 3}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 1,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 32,
+                             'overlap': 8,
+                             'search': 0,
+                             'search_param': 1,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 0, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'ultrafast': (
+        '9cf3e545d15bfdc6bd4ffc352867dd82009fa72622b6f26fdf6fab2e43b04158',
+        {'core': {'motion_search': {'tr': 1, 'rep': 0},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 3}},
+         'interpolation': {'deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                           'deint_chroma': None,
+                           'ref': None},
+         'motion_analysis': {'searchpre': 1,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 32,
+                             'overlap': 8,
+                             'search': 0,
+                             'search_param': 1,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 1.0, 'mode': 2, 'lmode': 0, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'znedi', 'args': {'nsize': 4, 'nns': 0}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+    'draft': (
+        '22efd8362e16557fc129bae6a69662b5a385e0b91db2b1df6eb009165ef54fdb',
+        {'core': {'motion_search': {'tr': 0, 'rep': 0},
+                  'initial_output': {'tr': 1, 'rep': 0},
+                  'final_output': {'tr': 0, 'rep': 0}},
+         'interpolation': {'deint': {'name': 'bob', 'args': {'b': 0.0, 'c': 0.5}}, 'deint_chroma': None, 'ref': None},
+         'motion_analysis': {'searchpre': 0,
+                             'subpel': 1,
+                             'subpel_inter': 2,
+                             'blocksize': 32,
+                             'overlap': 8,
+                             'search': 0,
+                             'search_param': 1,
+                             'pelsearch': 1,
+                             'chroma_motion': False,
+                             'truemotion': False,
+                             'lambda_': None,
+                             'lsad': None,
+                             'pnew': None,
+                             'plevel': None,
+                             'globalmotion': True,
+                             'dct': 0,
+                             'thsad_initial_output': 640,
+                             'thsad_final_output': 256,
+                             'thscd1': 180,
+                             'thscd2': 98,
+                             'prog_sad_mask': 0.0,
+                             'precision': 0},
+         'sharpness': {'strength': 0.0, 'mode': 0, 'lmode': 0, 'lrad': 1, 'ovs': 0, 'vthin': 0.0, 'bb': 0},
+         'source_match': {'match': 0,
+                          'lossless': 0,
+                          'basic_deint': {'name': 'bob', 'args': {'b': 0.0, 'c': 0.5}},
+                          'refined_deint': None,
+                          'refined_tr': 1,
+                          'enhance': 0.5},
+         'noise': None,
+         'motion_blur': {'fps_divisor': 1,
+                         'shutter_blur': 0,
+                         'shutter_angle_src': 180,
+                         'shutter_angle_out': 180,
+                         'blur_limit': 4}}
+    ),
+}
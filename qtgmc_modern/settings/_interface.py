@@ -225,6 +225,13 @@ if TYPE_CHECKING:
         Reasonable range about 2.0 to 20.0, or 0.0 for no blending.
         Old "ProgSADMask".
         """
+        precision: int
+        """
+        Bit depth of the motion search, between 8 and 16, or 0 to search at the depth of the clip.
+        Vectors searched at a lower depth are rescored on the full depth search clip with `mv.Recalculate`,
+        so compensation and degraining still run at full depth. Float clips are always searched as float.
+        New.
+        """
 
 
     class SharpnessSettings(TypedDict):
@@ -1,7 +1,9 @@
-from typing import TYPE_CHECKING, List, Type
-
-import yaml
-# from pkg_resources import resource_filename
+import copy
+import hashlib
+from importlib import resources
+from pprint import pformat
+from textwrap import indent
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
 
 from ._abstract import LoggedSettings
 from ._interface import (CoreParam, CoreSettings, InterpolationSettings,
@@ -9,14 +11,48 @@ from ._interface import (CoreParam, CoreSettings, InterpolationSettings,
                          SharpnessSettings, SourceMatchSettings)
 from ._presets import Preset
 
+_PRESETS: Dict[str, Dict[str, Any]] = {}
+"""Parsed presets of this process. Never handed out directly"""
 
-def load_preset(p: Preset) -> Settings:
+
+def _read_preset(name: str) -> bytes:
     try:
-        with open('D:/Documents/secret-project/qtgmc_modern/settings/yml/' + p.name + '.yml', 'r', encoding='utf-8') as f:
-        # with open(resource_filename('qtgmc_modern', p.value + '.yml'), 'r', encoding='utf-8') as f:
-            config = yaml.load(f, Loader=yaml.CLoader)
+        return (resources.files(__package__) / 'yml' / f'{name}.yml').read_bytes()
     except FileNotFoundError as file_err:
-        raise ValueError from file_err
+        raise ValueError(f'load_preset: preset "{name}" not found') from file_err
+
+
+def _compiled_presets() -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    try:
+        from ._compiled import PRESETS
+    except ImportError:
+        return {}
+    return PRESETS
+
+
+def _parse_preset(name: str) -> Dict[str, Any]:
+    source = _read_preset(name)
+    # The precompiled preset is used as long as its YAML file hasn't been edited since
+    digest, config = _compiled_presets().get(name, ('', {}))
+    if digest == hashlib.sha256(source).hexdigest():
+        return config
+
+    # Imported here so importing qtgmc_modern doesn't pull in the YAML machinery
+    import yaml
+    return yaml.load(source, Loader=yaml.CLoader)
+
+
+def _raw_preset(name: str) -> Dict[str, Any]:
+    try:
+        return _PRESETS[name]
+    except KeyError:
+        config = _PRESETS[name] = _parse_preset(name)
+        return config
+
+
+def load_preset(p: Preset) -> Settings:
+    # The cached preset is copied since the settings are mutated by every QTGMC instance
+    config = copy.deepcopy(_raw_preset(p.name))
 
     if not TYPE_CHECKING:
         keys: List[str] = [
@@ -36,7 +72,8 @@ def load_preset(p: Preset) -> Settings:
             NoiseSettings
         ]
         for key, classe in zip(keys, classes):
-            config[key] = classe(**config[key])
+            if config[key] is not None:
+                config[key] = classe(**config[key])
         config['core']['motion_search'] = CoreParam(**config['core']['motion_search'])
         config['core']['initial_output'] = CoreParam(**config['core']['initial_output'])
         config['core']['final_output'] = CoreParam(**config['core']['final_output'])
@@ -44,6 +81,34 @@ def load_preset(p: Preset) -> Settings:
     return config
 
 
+def compile_presets(path: Optional[str] = None) -> str:
+    """
+    Precompile every preset of `settings/yml` into a Python module so YAML is never parsed
+    when loading a preset. A preset whose YAML file changed afterwards is parsed again.
+
+    :param path:    Where to write the module. Defaults to `settings/_compiled.py` in the package
+    :return:        Path of the module
+    """
+    import yaml
+
+    presets: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for p in Preset:
+        source = _read_preset(p.name)
+        presets[p.name] = (hashlib.sha256(source).hexdigest(), yaml.load(source, Loader=yaml.CLoader))
+
+    if path is None:
+        path = str(resources.files(__package__) / '_compiled.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# Generated by `python -m qtgmc_modern.settings`. Do not edit.\n')
+        f.write('from typing import Any, Dict, Tuple\n\n')
+        f.write('PRESETS: Dict[str, Tuple[str, Dict[str, Any]]] = {\n')
+        for name, (digest, config) in presets.items():
+            f.write(f'    {name!r}: (\n        {digest!r},\n')
+            f.write(indent(pformat(config, width=110, sort_dicts=False), ' ' * 8) + '\n    ),\n')
+        f.write('}\n')
+    return path
+
+
 # class _Settings(LoggedSettings):
 #     ...
 
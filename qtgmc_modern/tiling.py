@@ -0,0 +1,352 @@
+"""
+Spatial tiling for UHD sources.\n
+The frame is split in overlapping tiles, each processed by its own `QTGMC` graph, in this process
+or in worker processes, and the outputs are stitched back with a linear cross-fade in the middle
+of every overlap.
+
+The rendered area of every tile starts on the block grid of the motion search, up to the coarsest
+hierarchical level whose block step stays within the overlap (see `block_align`), so a block of a tile
+interior covers the same pixels as in an untiled render. Tile interiors are close to an untiled render,
+not bit-identical: the coarser search levels, which seed the finer ones, see the tile instead of the frame,
+and the scene-change test (`thscd2`, the share of changed blocks) and the global motion estimate are
+decided per tile. With motion over `max_motion` pixels per frame (see `tile_overlap`), blocks near a tile
+edge may find other vectors than in an untiled render too. Inside the cross-fade bands the output is
+a weighted average of two tiles, so a seam shows as a soft transition over the band instead of an edge.
+
+Seam tolerance, with motion under `max_motion` and no scene change seen by only some of the tiles:
+every pixel of a tile interior stays within `INTERIOR_TOLERANCE` (4/255 of the full scale, i.e. 4 code
+values at 8 bits) of an untiled render, and every pixel of a cross-fade band within `SEAM_TOLERANCE` (8/255).
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'Tile', 'TiledRenderer',
+    'block_align', 'split_tiles', 'stitch', 'tile_overlap',
+    'INTERIOR_TOLERANCE', 'SEAM_TOLERANCE'
+]
+
+import ctypes
+import mmap
+import os
+import shutil
+import tempfile
+from math import lcm
+from typing import BinaryIO, List, NamedTuple, Optional, Sequence, Tuple
+
+import vapoursynth as vs
+
+from .chunked import QTGMCFactory, SourceFactory
+from .graph import core
+from .memory import frame_bytes
+from .qtgmc import QTGMC
+from .writer import FrameWriter, WriterStats
+
+# Largest difference from an untiled render, in fractions of the full scale, within the conditions of the module docstring
+INTERIOR_TOLERANCE = 4 / 255
+SEAM_TOLERANCE = 8 / 255
+
+# (start, end, pad_start, pad_end) along one axis
+_Span = Tuple[int, int, int, int]
+
+
+class Tile(NamedTuple):
+    x0: int
+    """First column owned by the tile"""
+    y0: int
+    """First row owned by the tile"""
+    x1: int
+    """Column after the last one owned by the tile"""
+    y1: int
+    """Row after the last one owned by the tile"""
+    pad_x0: int
+    """First column rendered, including the overlap"""
+    pad_y0: int
+    """First row rendered, including the overlap"""
+    pad_x1: int
+    """Column after the last one rendered, including the overlap"""
+    pad_y1: int
+    """Row after the last one rendered, including the overlap"""
+
+    def crop(self, clip: vs.VideoNode) -> vs.VideoNode:
+        """Rendered area of the tile"""
+        return core.std.Crop(
+            clip, self.pad_x0, clip.width - self.pad_x1, self.pad_y0, clip.height - self.pad_y1
+        )
+
+
+def tile_overlap(qtgmc: QTGMC, max_motion: int = 32) -> int:
+    """
+    Overlap on each side of a tile, in pixels, for tile interiors to stay close to an untiled render.
+
+    :param qtgmc:       Configured `QTGMC`
+    :param max_motion:  Largest motion per frame expected in the source, in pixels
+    """
+    ma = qtgmc.motion_analysis
+    sharp = qtgmc.sharpness
+    # Blocks straddling the edge, then the farthest a vector reaches over the temporal radius of the graph
+    motion = 2 * ma['blocksize'] + max(max_motion, ma['search_param']) * max(qtgmc.max_tr(), 1)
+    # Edge-directed interpolation (up to 32 pixels wide kernels), sharpness limiting and smoothing passes
+    spatial = 16 + 2 * sharp['lrad'] + 8
+    return motion + spatial
+
+
+def block_align(qtgmc: QTGMC, size: int, overlap: int) -> int:
+    """
+    Alignment of the rendered area of the tiles along an axis for the block grids of the motion search
+    to match those of an untiled frame, from the finest hierarchical level up to the coarsest one
+    whose block step stays within the overlap, so aligning costs at most as much as the overlap itself
+
+    :param qtgmc:       Configured `QTGMC`
+    :param size:        Width or height of a tile
+    :param overlap:     Pixels rendered on each side of a tile
+    """
+    ma = qtgmc.motion_analysis
+    # Blocks of every level are laid out every `step` pixels of that level, i.e. `step << level` pixels of the frame
+    step = ma['blocksize'] - ma['overlap']
+    align = step
+    level = 1
+    # Levels are added by MAnalyse as long as a block fits in the downscaled frame
+    while ((size >> level) - ma['overlap']) // step and step << level <= overlap:
+        align = step << level
+        level += 1
+    return align
+
+
+def _split_axis(size: int, parts: int, overlap: int, align: int, grid: int) -> List[_Span]:
+    bounds = sorted({size * i // parts // align * align for i in range(parts)} | {size})
+    end_overlap = -(-overlap // align) * align
+    return [
+        (start, end, max((start - overlap) // grid * grid, 0), min(end + end_overlap, size))
+        for start, end in zip(bounds, bounds[1:])
+    ]
+
+
+def split_tiles(width: int, height: int, columns: int, rows: int, overlap: int,
+                align_x: int = 1, align_y: int = 1, grid_x: int = 1, grid_y: int = 1) -> List[Tile]:
+    """
+    Split a frame in a grid of overlapping tiles, row by row
+
+    :param overlap:     Pixels rendered on each side of a tile, rounded up to the alignment
+    :param align_x:     Every horizontal boundary is a multiple of `align_x`
+    :param align_y:     Every vertical boundary is a multiple of `align_y`
+    :param grid_x:      Every `pad_x0` is a multiple of `grid_x`, itself a multiple of `align_x`
+    :param grid_y:      Every `pad_y0` is a multiple of `grid_y`, itself a multiple of `align_y`
+    """
+    return [
+        Tile(x0, y0, x1, y1, pad_x0, pad_y0, pad_x1, pad_y1)
+        for y0, y1, pad_y0, pad_y1 in _split_axis(height, rows, overlap, align_y, grid_y)
+        for x0, x1, pad_x0, pad_x1 in _split_axis(width, columns, overlap, align_x, grid_x)
+    ]
+
+
+def _crop_axis(clip: vs.VideoNode, vertical: bool, start: int, end: int) -> vs.VideoNode:
+    if vertical:
+        return core.std.Crop(clip, top=start, bottom=clip.height - end)
+    return core.std.Crop(clip, left=start, right=clip.width - end)
+
+
+def _cross_fade(a: vs.VideoNode, b: vs.VideoNode, vertical: bool) -> vs.VideoNode:
+    fmt = a.format
+    assert fmt
+    coord = 'Y' if vertical else 'X'
+    exprs = []
+    for plane in range(fmt.num_planes):
+        size = a.height if vertical else a.width
+        if plane:
+            size >>= fmt.subsampling_h if vertical else fmt.subsampling_w
+        exprs.append(f'x {size} {coord} - 0.5 - * y {coord} 0.5 + * + {size} /')
+    return core.std.Expr([a, b], exprs)
+
+
+def _stitch_axis(segments: Sequence[Tuple[vs.VideoNode, _Span]], vertical: bool,
+                 blend: int, align: int) -> vs.VideoNode:
+    # Half width of the band on each boundary, within what both neighbours rendered
+    halves = [
+        min(blend // 2, pad_end - end, end - nxt_pad_start) // align * align
+        for (_, (_, end, _, pad_end)), (_, (_, _, nxt_pad_start, _)) in zip(segments, segments[1:])
+    ]
+    pieces: List[vs.VideoNode] = []
+    for i, (clip, (start, end, pad_start, pad_end)) in enumerate(segments):
+        keep_start = start + halves[i - 1] if i > 0 else pad_start
+        keep_end = end - halves[i] if i < len(halves) else pad_end
+        pieces.append(_crop_axis(clip, vertical, keep_start - pad_start, keep_end - pad_start))
+        if i < len(halves) and halves[i]:
+            nxt, (_, _, nxt_pad_start, _) = segments[i + 1]
+            band_start, band_end = end - halves[i], end + halves[i]
+            pieces.append(_cross_fade(
+                _crop_axis(clip, vertical, band_start - pad_start, band_end - pad_start),
+                _crop_axis(nxt, vertical, band_start - nxt_pad_start, band_end - nxt_pad_start),
+                vertical
+            ))
+    if len(pieces) == 1:
+        return pieces[0]
+    return core.std.StackVertical(pieces) if vertical else core.std.StackHorizontal(pieces)
+
+
+def stitch(tiles: Sequence[Tile], clips: Sequence[vs.VideoNode], blend: int = 16, align: int = 4) -> vs.VideoNode:
+    """
+    Stitch the processed tiles of `split_tiles` back into a frame
+
+    :param tiles:       Tiles, row by row
+    :param clips:       Processed rendered area of each tile
+    :param blend:       Width of the cross-fade band centred on each boundary, 0 for hard cuts.
+                        Narrowed to what the overlap of both tiles covers
+    :param align:       Alignment of the band edges, to keep the chroma planes aligned
+    """
+    rows: List[Tuple[vs.VideoNode, _Span]] = []
+    row: List[Tuple[vs.VideoNode, _Span]] = []
+    for i, (tile, clip) in enumerate(zip(tiles, clips)):
+        row.append((clip, (tile.x0, tile.x1, tile.pad_x0, tile.pad_x1)))
+        if i + 1 == len(tiles) or tiles[i + 1].y0 != tile.y0:
+            rows.append((_stitch_axis(row, False, blend, align), (tile.y0, tile.y1, tile.pad_y0, tile.pad_y1)))
+            row = []
+    return _stitch_axis(rows, True, blend, align)
+
+
+def _raw_clip(path: str, template: vs.VideoNode) -> vs.VideoNode:
+    """Clip reading the raw planar frames written by `FrameWriter` for `template`"""
+    size = frame_bytes(template)
+    with open(path, 'rb') as f:
+        # Copy-on-write so ctypes can address it, the file itself is never modified
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    base = ctypes.addressof(ctypes.c_char.from_buffer(data))
+    blank = core.std.BlankClip(template)
+
+    # The mmap stays alive as long as the callback, i.e. the node
+    def _read(n: int, f: vs.VideoFrame, _data: mmap.mmap = data) -> vs.VideoFrame:
+        fout = f.copy()
+        offset = base + n * size
+        for plane in range(fout.format.num_planes):
+            width = fout.width >> fout.format.subsampling_w if plane else fout.width
+            height = fout.height >> fout.format.subsampling_h if plane else fout.height
+            row = width * fout.format.bytes_per_sample
+            stride = fout.get_stride(plane)
+            dst = fout.get_write_ptr(plane).value
+            assert dst
+            if stride == row:
+                ctypes.memmove(dst, offset, row * height)
+            else:
+                for y in range(height):
+                    ctypes.memmove(dst + y * stride, offset + y * row, row)
+            offset += row * height
+        return fout
+
+    return core.std.ModifyFrame(blank, blank, _read)
+
+
+def _render_tile(source: SourceFactory, qtgmc: QTGMCFactory, tile: Tile, threads: int, path: str) -> int:
+    vs.core.num_threads = threads
+    instance = qtgmc(tile.crop(source()))
+    instance.thread_budget = threads
+    output = instance.process()
+    # The worker owns its core, so the split of an auto denoiser can be applied
+    if instance.thread_split is not None:
+        vs.core.num_threads = instance.thread_split.core_threads
+    try:
+        with open(path, 'wb') as out:
+            return FrameWriter(output, window=threads).write(out).frames
+    finally:
+        if instance.vector_cache is not None:
+            instance.vector_cache.close()
+
+
+class TiledRenderer:
+    """
+    Render a `QTGMC` graph tile by tile.
+
+    >>> renderer = TiledRenderer(load_source, configure_qtgmc, columns=2, rows=2)
+    >>> clip = renderer.process()           # single process
+    >>> with open('out.y4m', 'wb') as f:    # one worker process per tile
+    ...     renderer.render(f, y4m=True)
+    """
+    source: SourceFactory
+    qtgmc: QTGMCFactory
+    columns: int
+    rows: int
+    overlap: Optional[int]
+    blend: int
+    workers: int
+
+    def __init__(self, source: SourceFactory, qtgmc: QTGMCFactory, columns: int = 2, rows: int = 2,
+                 overlap: Optional[int] = None, blend: int = 16, workers: Optional[int] = None) -> None:
+        """
+        :param source:      Picklable callable returning the source clip
+        :param qtgmc:       Picklable callable returning a configured `QTGMC` for the given clip
+        :param columns:     Number of tile columns
+        :param rows:        Number of tile rows
+        :param overlap:     Pixels rendered on each side of a tile. Defaults to `tile_overlap`
+        :param blend:       Width of the cross-fade band on each boundary, 0 for hard cuts
+        :param workers:     Number of worker processes of `render`. Defaults to one per tile
+        """
+        self.source = source
+        self.qtgmc = qtgmc
+        self.columns = columns
+        self.rows = rows
+        self.overlap = overlap
+        self.blend = blend
+        self.workers = workers or columns * rows
+
+    def _align(self, clip: vs.VideoNode) -> Tuple[int, int]:
+        assert clip.format
+        # Chroma siting, and field parity of the rows
+        return 1 << clip.format.subsampling_w, 2 << clip.format.subsampling_h
+
+    def plan(self) -> List[Tile]:
+        clip = self.source()
+        qtgmc = self.qtgmc(clip)
+        overlap = self.overlap if self.overlap is not None else tile_overlap(qtgmc)
+        align_x, align_y = self._align(clip)
+        grid_x = lcm(align_x, block_align(qtgmc, clip.width // self.columns, overlap))
+        grid_y = lcm(align_y, block_align(qtgmc, clip.height // self.rows, overlap))
+        return split_tiles(
+            clip.width, clip.height, self.columns, self.rows, overlap, align_x, align_y, grid_x, grid_y
+        )
+
+    def process(self) -> vs.VideoNode:
+        """Tiled graph in this process"""
+        clip = self.source()
+        tiles = self.plan()
+        outputs = [self.qtgmc(tile.crop(clip)).process() for tile in tiles]
+        return stitch(tiles, outputs, self.blend, max(self._align(clip)))
+
+    def render(self, out: BinaryIO | int, y4m: bool = False) -> WriterStats:
+        """
+        Render every tile in a worker process, then stitch and write the frames in order to `out`.
+        Needs temporary disk space for the raw output of every tile, about the size of the raw output
+        plus the overlaps.
+
+        :param out:     Binary file object or file descriptor
+        :param y4m:     Write a YUV4MPEG2 stream instead of raw planes
+        """
+        # Only the parent process of a tiled render needs multiprocessing
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        clip = self.source()
+        tiles = self.plan()
+        threads = max((os.cpu_count() or 1) // self.workers, 1)
+        tmpdir = tempfile.mkdtemp(prefix='qtgmc_tiles_')
+        try:
+            paths = [os.path.join(tmpdir, f'{i:03d}.raw') for i in range(len(tiles))]
+            # A forked worker would inherit the core of `plan`, without its thread pool
+            with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [
+                    pool.submit(_render_tile, self.source, self.qtgmc, tile, threads, path)
+                    for tile, path in zip(tiles, paths)
+                ]
+                for future in futures:
+                    future.result()
+
+            # Graphs are only built here to read the format and length of every tile
+            instances = [self.qtgmc(tile.crop(clip)) for tile in tiles]
+            outputs = [_raw_clip(path, instance.process()) for path, instance in zip(paths, instances)]
+            stitched = stitch(tiles, outputs, self.blend, max(self._align(clip)))
+            try:
+                return FrameWriter(stitched, y4m).write(out)
+            finally:
+                for instance in instances:
+                    if instance.vector_cache is not None:
+                        instance.vector_cache.close()
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
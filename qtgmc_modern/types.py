@@ -1,18 +1,60 @@
+from __future__ import annotations
+
+from hashlib import sha256
+from types import MappingProxyType
 from typing import Any, Dict, Iterator, Mapping, final
+from weakref import WeakValueDictionary
+
+_INTERNED: WeakValueDictionary[str, SettingsView] = WeakValueDictionary()
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return SettingsView(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _token(value: Any) -> str:
+    if isinstance(value, SettingsView):
+        return value.fingerprint
+    if isinstance(value, tuple):
+        return '(' + ','.join(_token(v) for v in value) + ')'
+    return repr(value)
 
 
 @final
 class SettingsView(Mapping[str, Any]):
+    """
+    Frozen and hashable snapshot of a settings mapping.\n
+    Nested mappings are frozen too, and views of equal content are interned,
+    so two snapshots differing by one section share every other section.
+    The fingerprint is a sha256 of the content, stable across processes.
+    """
+    __slots__ = ('__data', '__fingerprint', '__weakref__')
     __data: Mapping[str, Any]
+    __fingerprint: str
 
-    def __init__(self, mapping: Mapping[str, Any]) -> None:
-        copied: Dict[str, Any] = {}
-        for k, v in mapping.items():
-            if isinstance(v, dict):
-                copied[k] = SettingsView(v)
-            else:
-                copied[k] = v
-        self.__data = copied
+    def __new__(cls, mapping: Mapping[str, Any]) -> SettingsView:
+        if isinstance(mapping, SettingsView):
+            return mapping
+        data: Dict[str, Any] = {k: _freeze(v) for k, v in mapping.items()}
+        fingerprint = sha256(
+            ';'.join(f'{k!r}:{_token(v)}' for k, v in sorted(data.items())).encode()
+        ).hexdigest()
+        if (interned := _INTERNED.get(fingerprint)) is not None:
+            return interned
+
+        self = super().__new__(cls)
+        self.__data = MappingProxyType(data)
+        self.__fingerprint = fingerprint
+        _INTERNED[fingerprint] = self
+        return self
+
+    @property
+    def fingerprint(self) -> str:
+        return self.__fingerprint
 
     def __getitem__(self, k: str) -> Any:
         return self.__data.__getitem__(k)
@@ -22,3 +64,14 @@ class SettingsView(Mapping[str, Any]):
 
     def __len__(self) -> int:
         return self.__data.__len__()
+
+    def __hash__(self) -> int:
+        return hash(self.__fingerprint)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SettingsView):
+            return self.__fingerprint == other.__fingerprint
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self.__data)!r})'
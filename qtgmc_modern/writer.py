@@ -0,0 +1,243 @@
+"""
+Pipelined Y4M/raw output.\n
+Frames are requested with a bounded window of `get_frame_async` futures while a dedicated thread
+writes the finished ones in order, so VapourSynth keeps rendering while the encoder reads the pipe.
+When the encoder is slower, the window fills up and no more frames are requested.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'FrameWriter', 'WriterStats',
+    'y4m_header'
+]
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue
+from typing import BinaryIO, Callable, Iterable, List, NamedTuple, Optional, Union
+
+import vapoursynth as vs
+
+from .graph import core
+
+Output = Union[BinaryIO, int]
+"""Binary file object, or file descriptor written with `os.writev`"""
+
+# Linux and macOS IOV_MAX
+_MAX_BUFFERS = 1024
+
+
+class WriterStats(NamedTuple):
+    frames: int
+    """Frames written"""
+    bytes: int
+    """Bytes written, headers included"""
+    elapsed: float
+    """Seconds since the first request"""
+    frame_wait: float
+    """Seconds the writer thread waited for VapourSynth. High when the graph is the bottleneck"""
+    output_wait: float
+    """Seconds spent waiting on a full window. High when the encoder is the bottleneck"""
+
+    @property
+    def fps(self) -> float:
+        """Sustained frames per second"""
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f'{self.frames} frames in {self.elapsed:.2f}s ({self.fps:.2f} fps), '
+            f'waited {self.frame_wait:.2f}s for frames and {self.output_wait:.2f}s for the output'
+        )
+
+
+ProgressCallback = Callable[[WriterStats], None]
+
+
+def y4m_header(clip: vs.VideoNode, num_frames: Optional[int] = None) -> bytes:
+    """YUV4MPEG2 stream header of `clip`, in the same form as vspipe"""
+    fmt = clip.format
+    if fmt is None or fmt.color_family not in {vs.GRAY, vs.YUV} or fmt.sample_type != vs.INTEGER:
+        raise ValueError('y4m_header: only constant integer GRAY and YUV formats are supported')
+
+    if fmt.color_family == vs.GRAY:
+        colorspace = 'mono' + (str(fmt.bits_per_sample) if fmt.bits_per_sample > 8 else '')
+    else:
+        subsampling = {
+            (1, 1): '420', (1, 0): '422', (0, 0): '444', (2, 2): '410', (2, 0): '411', (0, 1): '440'
+        }.get((fmt.subsampling_w, fmt.subsampling_h))
+        if subsampling is None:
+            raise ValueError('y4m_header: unsupported subsampling')
+        colorspace = subsampling + (f'p{fmt.bits_per_sample}' if fmt.bits_per_sample > 8 else '')
+
+    length = clip.num_frames if num_frames is None else num_frames
+    return (
+        f'YUV4MPEG2 C{colorspace} W{clip.width} H{clip.height} '
+        f'F{clip.fps.numerator}:{clip.fps.denominator} Ip A0:0 XLENGTH={length}\n'
+    ).encode()
+
+
+class _Sink:
+    """Gathers plane buffers and writes them in large batches"""
+    written: int
+    _out: Output
+    _buffer_size: int
+    _buffers: List[memoryview]
+    _size: int
+
+    def __init__(self, out: Output, buffer_size: int) -> None:
+        self.written = 0
+        self._out = out
+        self._buffer_size = buffer_size
+        self._buffers = []
+        self._size = 0
+
+    def write(self, data: bytes | memoryview) -> None:
+        view = memoryview(data)
+        # Planes with padded rows have to be packed
+        view = view.cast('B') if view.c_contiguous else memoryview(view.tobytes())
+        self._buffers.append(view)
+        self._size += view.nbytes
+        if self._size >= self._buffer_size or len(self._buffers) >= _MAX_BUFFERS:
+            self.flush()
+
+    def write_frame(self, frame: vs.VideoFrame) -> None:
+        for plane in range(frame.format.num_planes):
+            self.write(frame[plane])
+
+    def flush(self) -> None:
+        buffers, self._buffers = self._buffers, []
+        self.written += self._size
+        self._size = 0
+        if isinstance(self._out, int):
+            _writev(self._out, buffers)
+        else:
+            for buffer in buffers:
+                self._out.write(buffer)
+            self._out.flush()
+
+
+def _writev(fd: int, buffers: List[memoryview]) -> None:
+    if not hasattr(os, 'writev'):
+        for buffer in buffers:
+            while buffer:
+                buffer = buffer[os.write(fd, buffer):]
+        return
+    while buffers:
+        written = os.writev(fd, buffers)
+        # Partial writes are common on pipes
+        while buffers and written >= buffers[0].nbytes:
+            written -= buffers[0].nbytes
+            buffers.pop(0)
+        if written:
+            buffers[0] = buffers[0][written:]
+
+
+class FrameWriter:
+    """
+    Write the frames of a clip as Y4M or raw planes, in order, with rendering and writing overlapped.
+
+    >>> writer = FrameWriter(qtgmc.process(), y4m=True, progress=print)
+    >>> stats = writer.write(sys.stdout.fileno())
+    """
+    clip: vs.VideoNode
+    y4m: bool
+    window: int
+    buffer_size: int
+    progress: Optional[ProgressCallback]
+    interval: float
+
+    def __init__(self, clip: vs.VideoNode, y4m: bool = False, window: Optional[int] = None,
+                 buffer_size: int = 16 << 20, progress: Optional[ProgressCallback] = None,
+                 interval: float = 1.0) -> None:
+        """
+        :param clip:            Clip to write
+        :param y4m:             Write a YUV4MPEG2 stream instead of raw planes
+        :param window:          Frames requested ahead of the writer. Defaults to the number of threads of the core.
+                                Bounds the memory held by frames that are rendered but not written yet.
+        :param buffer_size:     Bytes gathered before each write to the output
+        :param progress:        Called from the writer thread every `interval` seconds and once at the end
+        :param interval:        Seconds between progress reports
+        """
+        self.clip = clip
+        self.y4m = y4m
+        self.window = max(window or core.num_threads, 1)
+        self.buffer_size = buffer_size
+        self.progress = progress
+        self.interval = interval
+
+    def write(self, out: Output, frames: Optional[Iterable[int]] = None) -> WriterStats:
+        """
+        Render and write the frames
+
+        :param out:         Binary file object, or file descriptor (written with `os.writev`, fewer copies)
+        :param frames:      Frame numbers to write. Defaults to the whole clip
+        :return:            Final statistics
+        """
+        numbers = range(self.clip.num_frames) if frames is None else frames
+        if not isinstance(numbers, range):
+            numbers = list(numbers)
+        sink = _Sink(out, self.buffer_size)
+        # One slot less as the writer thread holds a future too
+        pending: Queue[Optional[Future[vs.VideoFrame]]] = Queue(max(self.window - 1, 1))
+        errors: List[BaseException] = []
+        # frames, frame_wait, output_wait
+        counters = [0, 0.0, 0.0]
+        start = time.perf_counter()
+
+        def _stats() -> WriterStats:
+            return WriterStats(
+                counters[0], sink.written, time.perf_counter() - start, counters[1], counters[2]
+            )
+
+        def _run() -> None:
+            last_report = start
+            while (fut := pending.get()) is not None:
+                if errors:
+                    # Keep draining so the producer never blocks
+                    continue
+                try:
+                    wait_start = time.perf_counter()
+                    frame = fut.result()
+                    counters[1] += time.perf_counter() - wait_start
+                    if self.y4m:
+                        sink.write(b'FRAME\n')
+                    sink.write_frame(frame)
+                    del frame
+                    counters[0] += 1
+                    if self.progress is not None and (now := time.perf_counter()) - last_report >= self.interval:
+                        last_report = now
+                        self.progress(_stats())
+                except BaseException as err:  # noqa: B902
+                    errors.append(err)
+            if not errors:
+                try:
+                    sink.flush()
+                except BaseException as err:  # noqa: B902
+                    errors.append(err)
+
+        thread = threading.Thread(target=_run, name='qtgmc-writer', daemon=True)
+        thread.start()
+        try:
+            if self.y4m:
+                sink.write(y4m_header(self.clip, len(numbers)))
+            for n in numbers:
+                if errors:
+                    break
+                fut = self.clip.get_frame_async(n)
+                wait_start = time.perf_counter()
+                pending.put(fut)
+                counters[2] += time.perf_counter() - wait_start
+        finally:
+            pending.put(None)
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        stats = _stats()
+        if self.progress is not None:
+            self.progress(stats)
+        return stats
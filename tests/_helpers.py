@@ -0,0 +1,34 @@
+"""
+Shared helpers of the tests
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    'render', 'skip_missing_plugins'
+]
+
+import io
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+import pytest
+import vapoursynth as vs
+
+from qtgmc_modern import FrameWriter
+
+
+@contextmanager
+def skip_missing_plugins() -> Iterator[None]:
+    """Skip the test when building the graph needs a plugin that isn't installed"""
+    try:
+        yield
+    except AttributeError as err:
+        pytest.skip(f'missing plugin: {err}')
+
+
+def render(clip: vs.VideoNode, frames: Optional[Iterable[int]] = None) -> bytes:
+    """Raw planes of the frames of `clip`, in order"""
+    out = io.BytesIO()
+    FrameWriter(clip).write(out, frames)
+    return out.getvalue()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import functools
+import io
+
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+
+from benchmarks._common import synthetic_source  # noqa: E402
+from qtgmc_modern import QTGMC, ChunkedRenderer  # noqa: E402
+from qtgmc_modern.chunked import split_chunks  # noqa: E402
+from qtgmc_modern.settings import Preset  # noqa: E402
+
+from ._helpers import render, skip_missing_plugins  # noqa: E402
+
+# Module level, so the spawned workers can unpickle it
+SOURCE = functools.partial(synthetic_source, 320, 240, 'yuv420p8', 48)
+
+
+def test_split_chunks_ignores_distant_cuts() -> None:
+    chunks = split_chunks(1000, 4, [10, 990], pad=0)
+    assert [c.start for c in chunks] == [0, 250, 500, 750]
+
+
+def test_split_chunks_snaps_to_close_cuts() -> None:
+    chunks = split_chunks(1000, 4, [240, 530], pad=8)
+    assert [(c.start, c.end) for c in chunks] == [(0, 240), (240, 530), (530, 750), (750, 1000)]
+    assert [(c.pad_start, c.pad_end) for c in chunks] == [(0, 248), (232, 538), (522, 758), (742, 1000)]
+
+
+@pytest.mark.parametrize('preset', [Preset.FAST, Preset.SLOWER])
+def test_chunked_matches_whole_render(preset: Preset) -> None:
+    factory = functools.partial(QTGMC, preset=preset, log_info=False)
+    with skip_missing_plugins():
+        whole = render(factory(SOURCE()).process())
+
+    out = io.BytesIO()
+    written = ChunkedRenderer(SOURCE, factory, workers=2, num_chunks=3, scene_cuts=[]).render(out)
+    assert written == SOURCE().num_frames * 2
+    assert out.getvalue() == whole
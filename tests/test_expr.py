@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+
+from benchmarks._common import synthetic_source  # noqa: E402
+from qtgmc_modern.expr import make_diff, merge, merge_diff  # noqa: E402
+from qtgmc_modern.graph import core  # noqa: E402
+
+from ._helpers import render  # noqa: E402
+
+FORMATS = ['yuv420p8', 'yuv420p16', 'yuv420ps']
+
+
+def _sources(fmt: str) -> Tuple[vs.VideoNode, vs.VideoNode, vs.VideoNode]:
+    source = synthetic_source(320, 240, fmt, length=4)
+    # Large differences, so the intermediate results of the chain overflow and get clamped
+    return source, core.std.BoxBlur(source, hradius=3, vradius=3), core.std.Invert(source)
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_fused_chain_matches_nodes(fmt: str) -> None:
+    source, blurred, other = _sources(fmt)
+
+    sharpened = merge_diff(source, make_diff(source, blurred))
+    fused = make_diff(merge(sharpened, other, [0.3, 0.7]), blurred, [0]).node()
+
+    sharpened_node = core.std.MergeDiff(source, core.std.MakeDiff(source, blurred))
+    reference = core.std.MakeDiff(core.std.Merge(sharpened_node, other, [0.3, 0.7]), blurred, [0])
+
+    assert render(fused) == render(reference)
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('weight', [0.0, 0.25, 0.5, 1.0])
+def test_fused_merge_matches_node(fmt: str, weight: float) -> None:
+    source, blurred, other = _sources(fmt)
+
+    fused = merge(make_diff(source, other), blurred, weight).node()
+    reference = core.std.Merge(core.std.MakeDiff(source, other), blurred, weight)
+
+    assert render(fused) == render(reference)
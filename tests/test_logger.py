@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+from typing import List
+
+import pytest
+
+pytest.importorskip('vapoursynth')
+
+from qtgmc_modern.logger import SettingsEvent, SettingsLogger  # noqa: E402
+
+
+def _failing(event: SettingsEvent) -> None:
+    raise RuntimeError('handler failure')
+
+
+def test_failing_handler_does_not_stop_delivery(caplog: pytest.LogCaptureFixture) -> None:
+    logger = SettingsLogger()
+    received: List[SettingsEvent] = []
+    delivered = threading.Event()
+
+    def collect(event: SettingsEvent) -> None:
+        received.append(event)
+        if len(received) == 2:
+            delivered.set()
+
+    logger.add_handler(_failing)
+    logger.add_handler(collect)
+
+    logger.record('SharpnessSettings', 'strength', 0.8)
+    logger.flush()
+    assert [e.value for e in received] == [0.8]
+    assert logger.failed == 1
+    assert 'handler failure' in caplog.text
+
+    # The background thread keeps running after a handler raised
+    logger.record('SharpnessSettings', 'strength', 1.0)
+    assert delivered.wait(5)
+    assert [e.value for e in received] == [0.8, 1.0]
+    assert logger.failed == 2
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+
+from benchmarks._common import synthetic_source  # noqa: E402
+from qtgmc_modern.graph import core  # noqa: E402
+from qtgmc_modern.qtgmc import luma_rebuild  # noqa: E402
+
+
+def _max_luma_diff(a: vs.VideoNode, b: vs.VideoNode) -> float:
+    diff = core.std.PlaneStats(core.std.Expr([a, b], ['x y - abs', '']))
+    return max(float(f.props['PlaneStatsMax']) for f in diff.frames(close=True))
+
+
+def test_luma_rebuild_float_matches_integer() -> None:
+    source = synthetic_source(320, 240, 'yuv420p8', length=4)
+    # Float code values over 255, the scale the legacy DitherLumaRebuild float constants assume
+    as_float = core.resize.Point(source, format=vs.YUV420PS, range_in_s='full', range_s='full')
+
+    rebuilt_float = luma_rebuild(as_float, s0=1)
+    rebuilt_integer = core.resize.Point(
+        luma_rebuild(source, s0=1), format=vs.YUV420PS, range_in_s='full', range_s='full'
+    )
+    # Only the rounding of the 8 bit output
+    assert _max_luma_diff(rebuilt_float, rebuilt_integer) <= 0.5 / 255 + 1e-6
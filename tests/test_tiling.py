@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import functools
+from typing import List, Tuple
+
+import pytest
+
+vs = pytest.importorskip('vapoursynth')
+
+from benchmarks._common import synthetic_source  # noqa: E402
+from qtgmc_modern import QTGMC, TiledRenderer  # noqa: E402
+from qtgmc_modern.graph import core  # noqa: E402
+from qtgmc_modern.settings import Preset  # noqa: E402
+from qtgmc_modern.tiling import INTERIOR_TOLERANCE, SEAM_TOLERANCE, split_tiles  # noqa: E402
+
+from ._helpers import skip_missing_plugins  # noqa: E402
+
+SOURCE = functools.partial(synthetic_source, 640, 480, 'yuv420p8', 12)
+
+# (left, top, right, bottom)
+_Rect = Tuple[int, int, int, int]
+
+
+def _max_diff(diff: vs.VideoNode, rect: _Rect) -> float:
+    left, top, right, bottom = rect
+    area = core.std.Crop(diff, left, diff.width - right, top, diff.height - bottom)
+    return max(float(f.props['PlaneStatsMax']) for f in core.std.PlaneStats(area).frames(close=True))
+
+
+def _regions(renderer: TiledRenderer, width: int, height: int) -> Tuple[List[_Rect], List[_Rect]]:
+    """Interiors of the tiles, and cross-fade bands"""
+    half = renderer.blend // 2
+    tiles = renderer.plan()
+    interiors = [
+        (t.x0 + half if t.x0 else 0, t.y0 + half if t.y0 else 0,
+         t.x1 - half if t.x1 < width else width, t.y1 - half if t.y1 < height else height)
+        for t in tiles
+    ]
+    bands = [(x - half, 0, x + half, height) for x in sorted({t.x0 for t in tiles} - {0})]
+    bands += [(0, y - half, width, y + half) for y in sorted({t.y0 for t in tiles} - {0})]
+    return interiors, bands
+
+
+def test_split_tiles_aligns_rendered_area() -> None:
+    tiles = split_tiles(3840, 2160, 2, 2, 200, 2, 4, 128, 128)
+    assert [(t.x0, t.x1) for t in tiles[:2]] == [(0, 1920), (1920, 3840)]
+    assert all(t.pad_x0 % 128 == 0 and t.pad_y0 % 128 == 0 for t in tiles)
+    assert all(t.x0 - t.pad_x0 >= 200 or t.pad_x0 == 0 for t in tiles)
+    assert all(t.y0 - t.pad_y0 >= 200 or t.pad_y0 == 0 for t in tiles)
+
+
+@pytest.mark.parametrize('preset', [Preset.FAST, Preset.SLOWER])
+def test_tiled_within_tolerance(preset: Preset) -> None:
+    factory = functools.partial(QTGMC, preset=preset, log_info=False)
+    renderer = TiledRenderer(SOURCE, factory, columns=2, rows=2)
+    with skip_missing_plugins():
+        whole = factory(SOURCE()).process()
+        tiled = renderer.process()
+
+    assert (tiled.width, tiled.height, tiled.num_frames) == (whole.width, whole.height, whole.num_frames)
+    # Luma difference over the full scale, per pixel
+    as_float = functools.partial(core.resize.Point, format=vs.GRAYS, range_in_s='full', range_s='full')
+    diff = core.std.Expr([as_float(whole), as_float(tiled)], 'x y - abs')
+
+    interiors, bands = _regions(renderer, whole.width, whole.height)
+    for rect in interiors:
+        assert _max_diff(diff, rect) <= INTERIOR_TOLERANCE, rect
+    for rect in bands:
+        assert _max_diff(diff, rect) <= SEAM_TOLERANCE, rect